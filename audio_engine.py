@@ -0,0 +1,156 @@
+"""
+Long-lived audio service for PomodoroBlocker notifications.
+
+With the optional `miniaudio` package (pip install miniaudio) every sound
+file is decoded once into an in-memory PCM buffer and streamed from that
+buffer through one playback device that stays open for the life of the app.
+Repeats cost no decoding and no new player process, and stop() silences the
+current clip immediately.
+
+Without miniaudio it falls back to playsound: one thread per playback, as
+before, and a clip that has started cannot be interrupted (stop() only
+suppresses its completion callback).
+"""
+import threading
+
+PCM_SAMPLE_RATE = 44100
+PCM_CHANNELS = 2
+
+_miniaudio = None
+_miniaudio_checked = False
+
+
+def _load_miniaudio():
+    global _miniaudio, _miniaudio_checked
+    if not _miniaudio_checked:
+        _miniaudio_checked = True
+        try:
+            import miniaudio
+            _miniaudio = miniaudio
+        except ImportError:
+            print("Info: miniaudio not found; using playsound for notifications (pip install miniaudio for instant stop).")
+    return _miniaudio
+
+
+class AudioService:
+    def __init__(self, dispatch, load_fallback_player=None):
+        """
+        dispatch(fn) runs fn on the UI thread (e.g. a root.after wrapper).
+        load_fallback_player() returns a playsound-style callable or None.
+        """
+        self.dispatch = dispatch
+        self.load_fallback_player = load_fallback_player
+        self._pcm_cache = {}     # path string -> decoded sound
+        self._device = None
+        self._token = 0          # Bumped by every play()/stop(); stale streams check it and end
+        self._lock = threading.Lock()
+
+    # --- Decoding ---
+    def _decoded(self, path_str):
+        with self._lock:
+            sound = self._pcm_cache.get(path_str)
+        if sound is None:
+            miniaudio = _load_miniaudio()
+            sound = miniaudio.decode_file(path_str, output_format=miniaudio.SampleFormat.SIGNED16,
+                                          nchannels=PCM_CHANNELS, sample_rate=PCM_SAMPLE_RATE)
+            with self._lock:
+                self._pcm_cache[path_str] = sound
+        return sound
+
+    def preload(self, sound_paths):
+        """Decodes the given files on a background thread so the first notification starts instantly."""
+        def decode_all():
+            if _load_miniaudio() is None:
+                return
+            for path in sound_paths:
+                try:
+                    if path.exists():
+                        self._decoded(str(path))
+                except Exception as e:
+                    print(f"Could not pre-decode sound '{path}': {e}")
+        threading.Thread(target=decode_all, name="AudioPreload", daemon=True).start()
+
+    # --- Playback ---
+    def _pcm_stream(self, sound, token, on_finish):
+        """Playback generator: sent the number of frames wanted, yields that many frames from the buffer."""
+        samples = sound.samples
+        position = 0
+        required_frames = yield b""
+        while position < len(samples):
+            if token != self._token:
+                return # Stopped or replaced by a newer play()
+            count = required_frames * PCM_CHANNELS
+            chunk = samples[position:position + count]
+            position += count
+            required_frames = yield chunk
+        if token == self._token:
+            self._deliver(on_finish)
+
+    def _deliver(self, on_finish):
+        if on_finish:
+            try:
+                self.dispatch(on_finish)
+            except Exception as e: # e.g. the Tk root is already gone
+                print(f"AudioService: could not deliver completion callback: {e}")
+
+    def play(self, sound_path, on_finish=None):
+        """Plays a sound without blocking; on_finish is dispatched when it ends or fails (not when stopped)."""
+        with self._lock:
+            self._token += 1
+            token = self._token
+        sound_file_str = str(sound_path)
+        if not sound_path.exists():
+            print(f"Sound file not found: {sound_file_str}")
+            self._deliver(on_finish)
+            return
+
+        miniaudio = _load_miniaudio()
+        if miniaudio is None:
+            self._play_with_fallback(sound_file_str, token, on_finish)
+            return
+        try:
+            sound = self._decoded(sound_file_str)
+            if self._device is None:
+                self._device = miniaudio.PlaybackDevice(output_format=miniaudio.SampleFormat.SIGNED16,
+                                                        nchannels=PCM_CHANNELS, sample_rate=PCM_SAMPLE_RATE)
+            stream = self._pcm_stream(sound, token, on_finish)
+            next(stream) # Generators must be primed before miniaudio sends frame counts
+            self._device.stop()
+            self._device.start(stream)
+            print(f"Playing sound: {sound_file_str}")
+        except Exception as e:
+            print(f"Error playing sound '{sound_file_str}': {e}")
+            self._deliver(on_finish)
+
+    def _play_with_fallback(self, sound_file_str, token, on_finish):
+        playsound = self.load_fallback_player() if self.load_fallback_player else None
+        if playsound is None:
+            self._deliver(on_finish) # Sounds disabled: let callers' logic proceed
+            return
+
+        def play_and_callback():
+            try:
+                print(f"Playing sound: {sound_file_str}")
+                playsound(sound_file_str) # Blocking within this thread
+            except Exception as e:
+                print(f"Error playing sound '{sound_file_str}': {e}")
+            finally:
+                if token == self._token:
+                    self._deliver(on_finish)
+        threading.Thread(target=play_and_callback, daemon=True).start()
+
+    def stop(self):
+        """Cuts off the current sound (immediately with miniaudio) and cancels its completion callback."""
+        with self._lock:
+            self._token += 1
+        if self._device is not None:
+            try:
+                self._device.stop()
+            except Exception as e:
+                print(f"Error stopping sound playback: {e}")
+
+    def close(self):
+        self.stop()
+        if self._device is not None:
+            self._device.close()
+            self._device = None
@@ -0,0 +1,79 @@
+"""
+Block list storage benchmark: plain-text rewrite vs. snapshot + journal.
+
+For a list of N domains this measures
+  - startup: parsing the text file into a set (old) vs. mapping the snapshot
+    and replaying the journal (BlockListStore.load),
+  - one edit: sorting and rewriting the whole text file (old
+    _save_block_list_to_file) vs. appending one journal line,
+  - close(), which leaves a short journal for the next load to replay.
+
+    python benchmarks/bench_blocklist_store.py [--entries 1000000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from blocklist_store import BlockListStore
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def legacy_load(path):
+    sites = set()
+    with open(path, "r", encoding='utf-8') as f:
+        for line in f:
+            site = line.strip()
+            if site: sites.add(site)
+    return sites
+
+
+def legacy_save(path, sites):
+    with open(path, "w", encoding='utf-8') as f:
+        for site in sorted(list(sites)):
+            f.write(site + "\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Block list storage benchmark.")
+    parser.add_argument("--entries", type=int, default=1_000_000)
+    parser.add_argument("--edits", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        text_path = os.path.join(tmp, ".website_blocker_list.txt")
+        with open(text_path, "w", encoding='utf-8') as f:
+            f.writelines(f"site{i}.example{i % 997}.com\n" for i in range(args.entries))
+
+        sites, legacy_load_s = timed(lambda: legacy_load(text_path))
+        _, legacy_save_s = timed(lambda: legacy_save(text_path, sites | {"new.example.org"}))
+        del sites
+
+        store = BlockListStore(text_path)
+        _, migrate_s = timed(store.load) # First run: parses the text and writes the snapshot in the background
+        store.close()
+
+        store = BlockListStore(text_path)
+        _, load_s = timed(store.load)
+        _, edits_s = timed(lambda: [store.add(f"edit{i}.example.net") for i in range(args.edits)])
+        _, close_s = timed(store.close)
+
+    print(f"{args.entries} domains")
+    print(f"startup   text -> set          {legacy_load_s * 1000:9.1f} ms")
+    print(f"startup   snapshot + journal   {load_s * 1000:9.1f} ms   (first-run migration {migrate_s * 1000:.1f} ms)")
+    print(f"one edit  full text rewrite    {legacy_save_s * 1000:9.1f} ms")
+    print(f"one edit  journal append       {edits_s / args.edits * 1000:9.3f} ms   (fsync included)")
+    print(f"close                          {close_s * 1000:9.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""
+Browser bridge round-trip benchmark with a scripted stand-in extension.
+
+Starts a BrowserBridge on a free port and connects a fake extension (a
+plain-socket WebSocket client holding a list of simulated tabs). Each push
+of blocked domains must come back as an ack naming exactly the tabs on
+those domains or their subdomains. Also checks that a connection with a
+web-page Origin is refused, and (with a short idle timeout) that the
+extension's keepalive pings hold its connection open while a client that
+goes silent, like a stopped MV3 service worker, is dropped. Reports push ->
+ack latency; exits 1 on any wrong tab or failed check.
+
+    python benchmarks/bench_browser_bridge.py [--pushes 500]
+"""
+import argparse
+import base64
+import json
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from browser_bridge import BrowserBridge, encode_frame, domain_matches, websocket_accept_key
+
+TABS = ["https://www.reddit.com/r/python", "https://old.reddit.com/", "https://news.ycombinator.com/",
+        "https://docs.python.org/3/", "https://m.youtube.com/watch?v=1", "https://notreddit.com/",
+        "https://example.org/", "https://video.example.org/live"]
+
+
+def open_websocket(address, origin=None):
+    """Returns a connected socket after the upgrade, or None if the server refused it."""
+    sock = socket.create_connection(address)
+    key = base64.b64encode(os.urandom(16)).decode('ascii')
+    request = (f"GET / HTTP/1.1\r\nHost: {address[0]}:{address[1]}\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+               f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n")
+    if origin:
+        request += f"Origin: {origin}\r\n"
+    sock.sendall((request + "\r\n").encode('ascii'))
+    response = b""
+    while b"\r\n\r\n" not in response:
+        chunk = sock.recv(4096)
+        if not chunk:
+            break
+        response += chunk
+    if not response.startswith(b"HTTP/1.1 101") or websocket_accept_key(key).encode('ascii') not in response:
+        sock.close()
+        return None
+    return sock
+
+
+def recv_exactly(sock, count):
+    data = b""
+    while len(data) < count:
+        chunk = sock.recv(count - len(data))
+        if not chunk:
+            raise ConnectionError("bridge closed the connection")
+        data += chunk
+    return data
+
+
+def recv_text(sock):
+    first, second = recv_exactly(sock, 2)
+    length = second & 0x7F
+    if length == 126:
+        length = int.from_bytes(recv_exactly(sock, 2), "big")
+    elif length == 127:
+        length = int.from_bytes(recv_exactly(sock, 8), "big")
+    return json.loads(recv_exactly(sock, length))
+
+
+def send_text(sock, message):
+    sock.sendall(encode_frame(json.dumps(message).encode('utf-8'), mask_key=os.urandom(4)))
+
+
+IDLE_TIMEOUT_S = 0.5
+KEEPALIVE_S = 0.15
+
+
+class FakeExtension(threading.Thread):
+    """Answers every block message like background.js does (pinging every keepalive seconds), recording which tabs it would touch."""
+
+    def __init__(self, sock, keepalive=KEEPALIVE_S):
+        super().__init__(daemon=True)
+        self.sock = sock
+        self.keepalive = keepalive
+        self.touched = {}           # message id -> tab URLs
+        self._send_lock = threading.Lock()
+
+    def send(self, message):
+        with self._send_lock:
+            send_text(self.sock, message)
+
+    def _ping(self):
+        try:
+            while True:
+                time.sleep(self.keepalive)
+                self.send({"type": "ping"})
+        except OSError:
+            pass
+
+    def run(self):
+        self.send({"type": "hello", "client": "bench-extension", "version": 1})
+        if self.keepalive:
+            threading.Thread(target=self._ping, daemon=True).start()
+        try:
+            while True:
+                message = recv_text(self.sock)
+                if message.get("type") != "block":
+                    continue
+                tabs = [url for url in TABS if domain_matches(url.split("/")[2], message["domains"])]
+                self.touched[message["id"]] = tabs
+                self.send({"type": "ack", "id": message["id"], "tabs": len(tabs)})
+        except (ConnectionError, OSError):
+            pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Browser bridge round trip with a stand-in extension.")
+    parser.add_argument("--pushes", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    bridge = BrowserBridge(port=0, idle_timeout=IDLE_TIMEOUT_S)
+    bridge.start()
+    failures = []
+    if open_websocket(bridge.address, origin="https://evil.example.com") is not None:
+        failures.append("a web-page origin was accepted")
+
+    extension = FakeExtension(open_websocket(bridge.address, origin="chrome-extension://abcdef"))
+    extension.start()
+    deadline = time.monotonic() + 5
+    while not bridge.client_count and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+    cases = [(["reddit.com"], TABS[:2]), (["example.org", "youtube.com"], [TABS[4], TABS[6], TABS[7]]), (["nothing.test"], [])]
+    for i in range(args.pushes):
+        domains, expected = cases[i % len(cases)]
+        acks_before = bridge.stats["acks"]
+        if bridge.push_blocked(domains) != 1:
+            failures.append("push did not reach the extension")
+            break
+        ack_deadline = time.monotonic() + 5
+        while bridge.stats["acks"] == acks_before and time.monotonic() < ack_deadline:
+            time.sleep(0.0002)
+
+    # A stopped service worker just goes quiet: it must be dropped, the pinging extension kept.
+    silent = open_websocket(bridge.address, origin="chrome-extension://stopped")
+    send_text(silent, {"type": "hello", "client": "stopped-worker", "version": 1})
+    time.sleep(IDLE_TIMEOUT_S * 3)
+    if bridge.client_count != 1 or bridge.stats["idle_drops"] != 1:
+        failures.append(f"after {IDLE_TIMEOUT_S * 3:.1f} s: {bridge.client_count} clients connected, "
+                        f"{bridge.stats['idle_drops']} dropped as idle (expected 1 and 1)")
+    bridge.stop()
+
+    for message_id, tabs in extension.touched.items():
+        expected = cases[(message_id - 1) % len(cases)][1]
+        if tabs != expected:
+            failures.append(f"push {message_id} touched {tabs}, expected {expected}")
+    latencies = sorted(bridge.ack_latencies_ms)
+    print(f"{bridge.stats['pushes']} pushes, {bridge.stats['acks']} acks, {bridge.stats['tabs']} tabs, {bridge.stats['rejected']} refused connections, {bridge.stats['idle_drops']} idle drops")
+    if latencies:
+        print(f"push -> ack   p50 {statistics.median(latencies):.2f} ms   p99 {latencies[int(len(latencies) * 0.99) - 1]:.2f} ms (last {len(latencies)})")
+    for failure in failures[:10]:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+"""
+Canvas redraw benchmark: Tcl calls issued per timer tick and per XP bar redraw.
+
+Every Tcl command the main window sends is counted through a proxy around
+root.tk, then the benchmark drives
+  - N timer ticks (countdown text, progress ring, status label),
+  - N XP bar redraws with unchanged and with changing progress,
+  - a burst of <Configure> events on the XP canvas,
+and reports calls per operation and wall time. A settings/hosts sandbox is
+used (temporary HOME and hosts file), so nothing on the system is touched.
+Needs a display; skipped otherwise.
+
+    python benchmarks/bench_canvas_calls.py [--ticks 1500]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class CountingTk:
+    """Forwards everything to the real tkapp and counts call() invocations."""
+
+    def __init__(self, tkapp):
+        self._tkapp = tkapp
+        self.calls = 0
+
+    def call(self, *args):
+        self.calls += 1
+        return self._tkapp.call(*args)
+
+    def __getattr__(self, name):
+        return getattr(self._tkapp, name)
+
+
+def measure(counter, root, label, count, operation):
+    root.update()
+    before = counter.calls
+    start = time.perf_counter()
+    for i in range(count):
+        operation(i)
+    root.update_idletasks()
+    elapsed = time.perf_counter() - start
+    calls = counter.calls - before
+    print(f"{label:<34} {calls / count:8.2f} calls/op   {elapsed / count * 1e6:9.1f} us/op")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ticks", type=int, default=1500, help="timer ticks / redraws to simulate (default 1500)")
+    args = parser.parse_args(argv)
+
+    sandbox = tempfile.mkdtemp(prefix="pomodoro-bench-")
+    os.environ["HOME"] = sandbox # Settings and block list paths are derived from HOME at import
+    hosts_path = os.path.join(sandbox, "hosts")
+    with open(hosts_path, "w") as f:
+        f.write("127.0.0.1\tlocalhost\n")
+
+    sys.path.insert(0, REPO_ROOT)
+    import tkinter as tk
+    import pomodoro_app
+
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        print(f"No display available ({e}); skipping.")
+        return 0
+    counter = CountingTk(root.tk)
+    root.tk = counter # Widgets copy master.tk when created, so this must happen before the app builds its UI
+
+    pomodoro_app.HOSTS_FILE_PATH = hosts_path
+    pomodoro_app.PomodoroWebsiteBlocker._is_admin = lambda self: True
+    app = pomodoro_app.PomodoroWebsiteBlocker(root)
+
+    engine = app.engine
+    engine.timer_running = True
+    engine.current_state = "Focus"
+    engine.total_seconds = args.ticks
+
+    def tick(i):
+        engine.remaining_seconds = args.ticks - i
+        app._update_timer_display()
+
+    def xp_progress(i):
+        app.pomodoro_count = i % (app.pomodoros_for_full_xp + 1)
+        app._draw_xp_bar()
+
+    def configure_burst(i):
+        for _ in range(20):
+            app.xp_bar_canvas.event_generate("<Configure>")
+        root.update()
+
+    measure(counter, root, "timer tick", args.ticks, tick)
+    measure(counter, root, "XP bar redraw (unchanged)", args.ticks, lambda i: app._draw_xp_bar())
+    measure(counter, root, "XP bar redraw (progress changes)", args.ticks, xp_progress)
+    measure(counter, root, "20x <Configure> burst + update", max(1, args.ticks // 50), configure_burst)
+    print(f"canvas items: timer={len(app.timer_canvas.find_all())} xp={len(app.xp_bar_canvas.find_all())}")
+
+    engine.timer_running = False
+    app.hosts_worker.stop(5)
+    app.audio.close()
+    root.destroy()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
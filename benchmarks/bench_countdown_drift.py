@@ -0,0 +1,128 @@
+"""
+Countdown drift simulation.
+
+Drives a fake event loop with an injected clock through DEFAULT_SEQUENCE,
+repeated until 8 hours of sessions have been scheduled. Every timer callback
+fires late by a random 2-40 ms, with an occasional 400 ms stall to stand in
+for a slow hosts write or browser reload. The script compares:
+  - legacy:    remaining -= 1 and re-arm after(1000)   (pre-SessionCountdown behaviour)
+  - monotonic: SessionCountdown deadline + ms_until_next_tick()
+  - paused:    the same, with the user pausing for 1 s - 10 min at random
+               moments (mid-second included), handled the way PomodoroEngine
+               does: pause cancels the pending tick, resume ticks at once and
+               re-arms from ms_until_next_tick()
+
+Exits with status 1 if a monotonic session (paused or not) ends more than
+one second off start + duration + time spent paused, if the accumulated
+paused time is wrong, or if the displayed countdown ever skips or repeats a
+whole second.
+
+Run from the repository root:  python benchmarks/bench_countdown_drift.py
+"""
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from session_timer import SessionCountdown  # noqa: E402
+
+# Mirrors DEFAULT_SEQUENCE / default durations in pomodoro_app.py (kept here so no Tk import is needed).
+DURATIONS_MINUTES = {"Focus": 25, "Short Break": 5, "Long Break": 15, "Eating Break": 30}
+DEFAULT_SEQUENCE_TYPES = ["Focus", "Short Break", "Focus", "Short Break", "Focus", "Short Break",
+                          "Focus", "Long Break", "Focus", "Eating Break", "Focus"]
+SIMULATED_HOURS = 8
+PAUSE_PROBABILITY = 1 / 300  # Per tick: about five pauses in a 25-minute focus session
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def callback_latency(rng):
+    latency = rng.uniform(0.002, 0.040)
+    if rng.random() < 0.01:
+        latency += 0.4
+    return latency
+
+
+def run_legacy(clock, rng, total_seconds, failures):
+    remaining = total_seconds
+    start = clock.now
+    while True:
+        if remaining == 0:
+            return clock.now - start, 0.0
+        remaining -= 1
+        clock.now += 1.0 + callback_latency(rng)
+
+
+def run_monotonic(clock, rng, total_seconds, failures, pause_probability=0.0):
+    """Returns (elapsed, paused) wall-clock seconds; appends to failures if the display skips or repeats a second."""
+    countdown = SessionCountdown(clock=clock)
+    countdown.start(total_seconds)
+    start = clock.now
+    paused = 0.0
+    shown = [countdown.remaining_seconds()]
+    next_tick = clock.now + countdown.ms_until_next_tick() / 1000 + callback_latency(rng)
+    while shown[-1] > 0:
+        if rng.random() < pause_probability:
+            clock.now += rng.uniform(0.0, next_tick - clock.now) # Somewhere before the pending tick fires
+            countdown.pause()                                    # ... which pause() cancels
+            pause_for = rng.uniform(1.0, 600.0)
+            clock.now += pause_for
+            paused += pause_for
+            countdown.resume()                                   # resume() ticks at once
+        else:
+            clock.now = next_tick
+        value = countdown.remaining_seconds()
+        if value != shown[-1]:
+            if value != shown[-1] - 1:
+                failures.append(f"{total_seconds} s session: display went {shown[-1]} -> {value} at t+{clock.now - start:.3f}")
+            shown.append(value)
+        next_tick = clock.now + countdown.ms_until_next_tick() / 1000 + callback_latency(rng)
+    if abs(countdown.paused_total - paused) > 1e-6:
+        failures.append(f"{total_seconds} s session: paused_total {countdown.paused_total:.3f} s, actually paused {paused:.3f} s")
+    return clock.now - start, paused
+
+
+def run_paused(clock, rng, total_seconds, failures):
+    return run_monotonic(clock, rng, total_seconds, failures, PAUSE_PROBABILITY)
+
+
+def simulate(runner, seed, failures):
+    clock = FakeClock()
+    rng = random.Random(seed)
+    planned = actual = paused_total = worst = 0.0
+    while planned < SIMULATED_HOURS * 3600:
+        for session_type in DEFAULT_SEQUENCE_TYPES:
+            total = DURATIONS_MINUTES[session_type] * 60
+            elapsed, paused = runner(clock, rng, total, failures)
+            planned += total
+            actual += elapsed - paused
+            paused_total += paused
+            worst = max(worst, abs(elapsed - paused - total)) # Should end at start + duration + paused
+            if planned >= SIMULATED_HOURS * 3600:
+                break
+    return planned, actual, paused_total, worst
+
+
+def main():
+    print(f"{'scheduler':>10} {'planned h':>10} {'paused h':>9} {'overrun s':>10} {'worst session s':>16}")
+    failures = []
+    for name, runner in (("legacy", run_legacy), ("monotonic", run_monotonic), ("paused", run_paused)):
+        checked = [] if runner is run_legacy else failures
+        planned, actual, paused, worst = simulate(runner, 42, checked)
+        print(f"{name:>10} {planned / 3600:>10.2f} {paused / 3600:>9.2f} {actual - planned:>10.2f} {worst:>16.3f}")
+        if runner is not run_legacy and worst > 1.0:
+            failures.append(f"{name} countdown ended a session {worst:.3f} s off start + duration + paused time")
+    for failure in failures[:10]:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
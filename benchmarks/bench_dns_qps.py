@@ -0,0 +1,155 @@
+"""
+DNS blocker benchmark and self-check against a local fake upstream.
+
+Starts a fake upstream resolver (answers every A query with UPSTREAM_IP) and
+a DnsBlocker in front of it, both on ephemeral loopback ports, then:
+  - checks blocked names, their subdomains, unrelated names, AAAA queries
+    and an unblock round-trip return the expected answers, and that a listed
+    subdomain stays blocked when its parent is unblocked;
+  - measures queries per second for blocked (answered locally) and
+    forwarded (relayed upstream) names with a window of in-flight queries.
+Exits 1 if any answer is wrong.
+
+    python benchmarks/bench_dns_qps.py [--queries 20000] [--window 64]
+"""
+import argparse
+import asyncio
+import os
+import socket
+import struct
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dns_blocker import DnsBlocker, parse_question, QTYPE_A
+
+UPSTREAM_IP = "93.184.216.34"
+QTYPE_AAAA = 28
+
+
+def build_query(query_id, name, qtype=QTYPE_A):
+    question = b"".join(bytes([len(label)]) + label.encode('ascii') for label in name.split(".")) + b"\x00"
+    return struct.pack("!HHHHHH", query_id, 0x0100, 1, 0, 0, 0) + question + struct.pack("!HH", qtype, 1)
+
+
+def answer_ips(response):
+    """A-record addresses in a response (answers follow the echoed question)."""
+    ancount = struct.unpack_from("!H", response, 6)[0]
+    pos = 12
+    while response[pos] != 0:
+        pos += response[pos] + 1
+    pos += 5
+    ips = []
+    for _ in range(ancount):
+        pos += 2 # Name pointer
+        rtype, _, _, rdlength = struct.unpack_from("!HHIH", response, pos)
+        pos += 10
+        if rtype == QTYPE_A:
+            ips.append(socket.inet_ntoa(response[pos:pos + rdlength]))
+        pos += rdlength
+    return ips
+
+
+class FakeUpstream(asyncio.DatagramProtocol):
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        name, qtype, question_end = parse_question(data)
+        answer = b""
+        if qtype == QTYPE_A:
+            answer = struct.pack("!HHHIH", 0xC00C, QTYPE_A, 1, 300, 4) + socket.inet_aton(UPSTREAM_IP)
+        header = struct.pack("!HHHHHH", struct.unpack_from("!H", data)[0], 0x8180, 1, 1 if answer else 0, 0, 0)
+        self.transport.sendto(header + data[12:question_end] + answer, addr)
+
+
+class Client(asyncio.DatagramProtocol):
+    def __init__(self):
+        self.waiters = {}
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        waiter = self.waiters.pop(struct.unpack_from("!H", data)[0], None)
+        if waiter and not waiter.done():
+            waiter.set_result(data)
+
+    async def resolve(self, query_id, name, qtype=QTYPE_A, timeout=3.0):
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters[query_id] = waiter
+        self.transport.sendto(build_query(query_id, name, qtype))
+        return await asyncio.wait_for(waiter, timeout)
+
+
+async def run(args):
+    loop = asyncio.get_running_loop()
+    upstream_transport, _ = await loop.create_datagram_endpoint(FakeUpstream, local_addr=("127.0.0.1", 0))
+    upstream_address = upstream_transport.get_extra_info('sockname')
+
+    blocker = DnsBlocker(listen_port=0, upstream=upstream_address)
+    blocker.start()
+    blocker.block(["reddit.com", "www.youtube.com"])
+    _, client = await loop.create_datagram_endpoint(Client, remote_addr=blocker.listen_address)
+
+    failures = 0
+    checks = [
+        ("reddit.com", QTYPE_A, ["127.0.0.1"]),
+        ("old.reddit.com", QTYPE_A, ["127.0.0.1"]),
+        ("m.youtube.com", QTYPE_A, ["127.0.0.1"]),
+        ("youtube.com", QTYPE_A, ["127.0.0.1"]),
+        ("reddit.com", QTYPE_AAAA, []),
+        ("notreddit.com", QTYPE_A, [UPSTREAM_IP]),
+        ("example.org", QTYPE_A, [UPSTREAM_IP]),
+    ]
+    for i, (name, qtype, expected) in enumerate(checks):
+        got = answer_ips(await client.resolve(i + 1, name, qtype))
+        status = "ok" if got == expected else "FAIL"
+        failures += got != expected
+        print(f"{status:4} {name:<16} type {qtype:<3} -> {got}")
+    blocker.unblock(["reddit.com"])
+    got = answer_ips(await client.resolve(100, "old.reddit.com"))
+    failures += got != [UPSTREAM_IP]
+    print(f"{'ok' if got == [UPSTREAM_IP] else 'FAIL':4} old.reddit.com after unblock -> {got}")
+    blocker.block(["reddit.com"])
+
+    # A profile switch from {example.com, a.example.com} to {a.example.com} only unblocks the parent.
+    blocker.block(["example.com", "a.example.com"])
+    blocker.unblock(["example.com"])
+    for i, (name, expected) in enumerate((("a.example.com", ["127.0.0.1"]), ("x.a.example.com", ["127.0.0.1"]),
+                                          ("example.com", [UPSTREAM_IP]), ("b.example.com", [UPSTREAM_IP]))):
+        got = answer_ips(await client.resolve(200 + i, name))
+        failures += got != expected
+        print(f"{'ok' if got == expected else 'FAIL':4} {name:<16} after unblocking its parent -> {got}")
+    blocker.unblock(["a.example.com"])
+
+    for label, names in (("blocked", ["reddit.com", "old.reddit.com", "m.youtube.com"]),
+                         ("forwarded", ["example.org", "python.org", "news.example.net"])):
+        semaphore = asyncio.Semaphore(args.window)
+
+        async def one(i):
+            async with semaphore:
+                await client.resolve(i % 0xFFFF + 1, names[i % len(names)])
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(args.queries)))
+        elapsed = time.perf_counter() - start
+        print(f"{label:<10} {args.queries / elapsed:10.0f} queries/s  ({args.queries} queries, window {args.window})")
+
+    print(f"blocker stats: {blocker.stats}")
+    blocker.stop()
+    upstream_transport.close()
+    return 1 if failures else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="DNS blocker correctness check and qps benchmark.")
+    parser.add_argument("--queries", type=int, default=20000)
+    parser.add_argument("--window", type=int, default=64, help="queries in flight at once")
+    args = parser.parse_args(argv)
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
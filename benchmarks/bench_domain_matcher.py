@@ -0,0 +1,96 @@
+"""
+Domain matcher benchmark: memory and lookup speed against a plain set.
+
+For 10k, 100k and 1M synthetic domains (about 1 in 10 a subdomain of
+another entry, as in public block lists) this reports:
+  - memory held by a set of str (strings included) vs. DomainMatcher
+    (tracemalloc),
+  - build time and entries left after collapsing redundant subdomains,
+  - lookups per second for "is this host or any parent blocked" on a mix of
+    blocked subdomains and unlisted hosts. For the set that means one
+    membership test per parent domain, as it would have to be done with it.
+
+    python benchmarks/bench_domain_matcher.py [--sizes 10000 100000 1000000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from domain_matcher import DomainMatcher
+
+TLDS = ["com", "net", "org", "io", "co.uk", "de", "ru", "info"]
+ALPHABET = "abcdefghijklmnopqrstuvwxyz0123456789-"
+
+
+def synthetic_domains(count, rng):
+    domains = []
+    for i in range(count):
+        if domains and i % 10 == 0:
+            domains.append(f"{rng.choice(['ads', 'cdn', 'm', 'old', 'track'])}.{rng.choice(domains)}")
+        else:
+            name = "".join(rng.choice(ALPHABET[:26]) for _ in range(rng.randint(5, 14)))
+            domains.append(f"{name}{i}.{rng.choice(TLDS)}")
+    return domains
+
+
+def set_matches(blocked, host):
+    labels = host.split(".")
+    return any(".".join(labels[i:]) in blocked for i in range(len(labels)))
+
+
+def measure_memory(build):
+    tracemalloc.start()
+    obj = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, current
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="DomainMatcher memory and lookup benchmark.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--lookups", type=int, default=100_000)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(42)
+    print(f"{'entries':>9} {'set MB':>8} {'matcher MB':>11} {'kept':>9} {'build s':>8} "
+          f"{'set lookup/s':>13} {'matcher lookup/s':>17}")
+    for size in args.sizes:
+        domains = synthetic_domains(size, rng)
+        hosts = []
+        for i in range(args.lookups):
+            if i % 2:
+                hosts.append(f"www.{rng.choice(domains)}")
+            else:
+                hosts.append(f"host{i}.example{i % 1000}.com")
+
+        # Fresh str objects, so the set is charged for its strings as it would be after reading a file.
+        blocked_set, set_bytes = measure_memory(lambda: {(d + ".")[:-1] for d in domains})
+        _, matcher_bytes = measure_memory(lambda: DomainMatcher(domains, collapse=True))
+        start = time.perf_counter()
+        matcher = DomainMatcher(domains, collapse=True)
+        build_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        set_hits = sum(set_matches(blocked_set, host) for host in hosts)
+        set_rate = len(hosts) / (time.perf_counter() - start)
+        start = time.perf_counter()
+        matcher_hits = sum(matcher.matches(host) for host in hosts)
+        matcher_rate = len(hosts) / (time.perf_counter() - start)
+        if set_hits != matcher_hits:
+            print(f"MISMATCH at {size}: set {set_hits} hits, matcher {matcher_hits} hits")
+            return 1
+
+        print(f"{size:>9} {set_bytes / 1e6:>8.1f} {matcher_bytes / 1e6:>11.1f} {len(matcher):>9} {build_seconds:>8.2f} "
+              f"{set_rate:>13.0f} {matcher_rate:>17.0f}")
+        del blocked_set, matcher
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
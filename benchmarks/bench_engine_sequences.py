@@ -0,0 +1,74 @@
+"""
+Headless engine throughput and block/unblock ordering check.
+
+Runs complete DEFAULT_SEQUENCE cycles through PomodoroEngine on a
+SimulatedScheduler (no Tk, no display, no root) with auto_advance on, and
+checks the hosts-relevant events come in a valid order:
+  - every focus session is blocked when it starts and unblocked when it ends,
+  - a pre-focus block only happens during a break that is followed by focus.
+
+Run from the repository root:  python benchmarks/bench_engine_sequences.py [sequences]
+"""
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pomodoro_engine import PomodoroEngine, SimulatedScheduler, DEFAULT_SEQUENCE  # noqa: E402
+
+DURATIONS_MINUTES = {"Focus": 25, "Short Break": 5, "Long Break": 15, "Eating Break": 30}
+
+
+def run_sequence():
+    scheduler = SimulatedScheduler()
+    engine = PomodoroEngine(scheduler.schedule, scheduler.cancel, DURATIONS_MINUTES.get, clock=scheduler.clock)
+    engine.sequence = list(DEFAULT_SEQUENCE)
+    engine.auto_advance = True
+    log = []
+    engine.subscribe("session_started", lambda session: log.append(("start", session['state'])))
+    engine.subscribe("block_requested", lambda profile: log.append(("block",)))
+    engine.subscribe("unblock_requested", lambda profile: log.append(("unblock",)))
+    engine.subscribe("pre_focus_block", lambda profile: log.append(("pre_block", engine.current_state)))
+    engine.subscribe("session_completed", lambda session: log.append(("complete", session['state'])))
+    engine.subscribe("sequence_finished", lambda: log.append(("finished",)))
+    engine.start_sequence()
+    scheduler.run()
+    return log, scheduler.now
+
+
+def check_ordering(log):
+    blocked = False
+    state = None
+    for entry in log:
+        kind = entry[0]
+        if kind == "start":
+            state = entry[1]
+        elif kind == "block":
+            assert state == "Focus", f"block outside focus: {log}"
+            blocked = True
+        elif kind == "pre_block":
+            assert entry[1] == "Break", f"pre-focus block outside a break: {log}"
+            blocked = True
+        elif kind == "unblock":
+            blocked = False
+        elif kind == "complete" and entry[1] == "Focus":
+            assert not blocked, f"focus completed without unblock first: {log}"
+    assert log[-1] == ("finished",), f"sequence did not finish: {log[-3:]}"
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):  # the engine logs progress with print()
+        for _ in range(count):
+            log, simulated_seconds = run_sequence()
+            check_ordering(log)
+    elapsed = time.perf_counter() - start
+    print(f"{count} sequences ({simulated_seconds / 3600:.1f} simulated hours each) in {elapsed:.2f}s "
+          f"-> {count / elapsed:.0f} sequences/s, ordering OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Hosts helper round-trip benchmark.
+
+Starts hosts_helper.py as a separate process on a temp socket and temp
+hosts file, then times block/unblock transitions through HelperClient
+against the alternative of starting a privileged process per transition
+(measured without the sudo/pkexec prompt, so it is a lower bound).
+Exits 1 if the hosts file does not end up as expected or the helper is not
+faster.
+
+    python benchmarks/bench_hosts_helper.py [--transitions 200] [--hosts 100]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from hosts_engine import HostsFileEngine
+from hosts_helper import HelperClient, connect_helper
+from resolver_cache import percentile
+
+SPAWN_SCRIPT = ("import sys; sys.path.insert(0, sys.argv[1]); from hosts_engine import HostsFileEngine; "
+                "hosts = sys.argv[4:]; engine = HostsFileEngine(sys.argv[2]); "
+                "engine.apply(block_hosts=hosts) if sys.argv[3] == 'block' else engine.apply(unblock_hosts=hosts)")
+
+
+def report(label, latencies):
+    print(f"{label:<22} p50 {percentile(latencies, 0.50) * 1000:8.2f} ms   p99 {percentile(latencies, 0.99) * 1000:8.2f} ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Hosts helper round trips vs a process per transition.")
+    parser.add_argument("--transitions", type=int, default=200)
+    parser.add_argument("--spawn-transitions", type=int, default=20)
+    parser.add_argument("--hosts", type=int, default=100)
+    args = parser.parse_args(argv)
+
+    hosts = [f"site{i}.example.com" for i in range(args.hosts)]
+    with tempfile.TemporaryDirectory() as tmp:
+        hosts_path = os.path.join(tmp, "hosts")
+        socket_path = os.path.join(tmp, "helper.sock")
+        with open(hosts_path, "w") as f:
+            f.write("127.0.0.1\tlocalhost\n::1\tlocalhost\n")
+
+        daemon = subprocess.Popen([sys.executable, os.path.join(ROOT, "hosts_helper.py"),
+                                   "--socket", socket_path, "--hosts-file", hosts_path], stdout=subprocess.DEVNULL)
+        try:
+            client = None
+            deadline = time.monotonic() + 10
+            while client is None and time.monotonic() < deadline:
+                client = connect_helper(socket_path)
+                if client is None:
+                    time.sleep(0.05)
+            if client is None:
+                print("FAIL: helper did not start")
+                return 1
+
+            helper_latencies = []
+            for i in range(args.transitions):
+                start = time.perf_counter()
+                if i % 2 == 0:
+                    added, _ = client.apply(block_hosts=hosts)
+                    assert len(added) == len(hosts), added
+                else:
+                    _, removed = client.apply(unblock_hosts=hosts)
+                    assert len(removed) == len(hosts), removed
+                helper_latencies.append(time.perf_counter() - start)
+            status = client.status()
+            second = HelperClient(socket_path) # Another session sharing the same daemon
+            batched = second.request([{"op": "block", "hosts": hosts[:10]}, {"op": "unblock", "hosts": hosts[:5]},
+                                      {"op": "status"}])
+            second.close()
+            client.apply(unblock_hosts=hosts)
+            client.close()
+        finally:
+            daemon.terminate()
+            daemon.wait(10)
+
+        spawn_latencies = []
+        for i in range(args.spawn_transitions):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, "-c", SPAWN_SCRIPT, ROOT, hosts_path, "block" if i % 2 == 0 else "unblock"] + hosts,
+                           check=True)
+            spawn_latencies.append(time.perf_counter() - start)
+
+        leftover = HostsFileEngine(hosts_path).managed_hosts()
+
+    print(f"{args.hosts} hosts per transition; helper served {status['requests']} requests")
+    report(f"helper ({args.transitions}x)", helper_latencies)
+    report(f"spawn ({args.spawn_transitions}x)", spawn_latencies)
+    print(f"batched request from a second client: blocked_count {batched[2]['blocked_count']} after block 10 / unblock 5")
+    if batched[2]['blocked_count'] != 5 or leftover:
+        print("FAIL: unexpected hosts file contents")
+        return 1
+    if percentile(helper_latencies, 0.50) >= percentile(spawn_latencies, 0.50):
+        print("FAIL: helper round trips are not faster than spawning")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
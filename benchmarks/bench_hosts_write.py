@@ -0,0 +1,113 @@
+"""
+Hosts write cost benchmark.
+
+Times one block + unblock transition of a 50-domain block list against
+hosts files of 1k, 10k and 100k lines, for:
+  - legacy:  read every line, filter, rewrite the whole file in place (pre-engine behaviour)
+  - splice:  HostsFileEngine(atomic=False), region rewritten in place
+  - atomic:  HostsFileEngine(atomic=True), temp file + fsync + rename + backup
+            (the default: crash-safe, but every transition writes the whole file)
+
+Also reports the bytes each engine mode writes per transition and how its
+time grows from the smallest to the largest file: splice should stay flat
+(it scales with the block list) while atomic grows with the hosts file.
+Exits 1 if the bytes a splice writes grow with the hosts file or the two
+modes leave different files.
+
+Run from the repository root:  python benchmarks/bench_hosts_write.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from hosts_engine import HostsFileEngine, REDIRECT_IP, POMODORO_COMMENT  # noqa: E402
+
+LINE_COUNTS = [1_000, 10_000, 100_000]
+BLOCKED = [f"distraction{i}.example" for i in range(50)]
+ROUNDS = 20
+
+
+def make_hosts_file(path, line_count):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("127.0.0.1\tlocalhost\n::1\tlocalhost\n\n# ad/tracker list\n")
+        for i in range(line_count):
+            f.write(f"0.0.0.0\ttracker{i}.ads.example\n")
+
+
+def legacy_transition(path, hosts, block):
+    with open(path, "r", encoding="utf-8") as f:
+        lines = f.readlines()
+    wanted = set(hosts)
+    kept = []
+    for line in lines:
+        parts = line.strip().split(None, 2)
+        if len(parts) >= 2 and parts[0] == REDIRECT_IP and parts[1] in wanted:
+            continue
+        if line.strip():
+            kept.append(line.strip() + "\n")
+    if block:
+        kept.extend(f"{REDIRECT_IP}\t{h}\t{POMODORO_COMMENT}\n" for h in sorted(wanted))
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(kept)
+
+
+def time_rounds(transition):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        transition(True)
+        transition(False)
+    return (time.perf_counter() - start) / (ROUNDS * 2) * 1000
+
+
+def main():
+    print(f"{'lines':>8} {'file KB':>8} {'legacy ms':>10} {'splice ms':>10} {'atomic ms':>10} "
+          f"{'splice KB/tr':>13} {'atomic KB/tr':>13}")
+    timings = {"splice": [], "atomic": []}
+    splice_written = []
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in LINE_COUNTS:
+            results = []
+            path = os.path.join(tmp, f"hosts_{count}")
+
+            make_hosts_file(path, count)
+            file_kb = os.path.getsize(path) / 1024
+            results.append(time_rounds(lambda block: legacy_transition(path, BLOCKED, block)))
+
+            written_kb = {}
+            final = {}
+            for atomic in (False, True):
+                make_hosts_file(path, count)
+                engine = HostsFileEngine(path, atomic=atomic)
+                engine.apply(unblock_hosts=BLOCKED)  # warm the cache like a running app would
+                engine.apply(block_hosts=BLOCKED)
+                prefix = engine._region_offset
+                # A splice writes from the region start on; an atomic write writes the whole file.
+                written_kb[atomic] = (os.path.getsize(path) - (0 if atomic else prefix)) / 1024
+                engine.apply(unblock_hosts=BLOCKED)
+                results.append(time_rounds(
+                    lambda block: engine.apply(block_hosts=BLOCKED) if block else engine.apply(unblock_hosts=BLOCKED)))
+                with open(path, "rb") as f:
+                    final[atomic] = f.read()
+            if final[False] != final[True]:
+                failures.append(f"{count} lines: splice and atomic left different files")
+            timings["splice"].append(results[1])
+            timings["atomic"].append(results[2])
+            splice_written.append(written_kb[False])
+
+            print(f"{count:>8} {file_kb:>8.0f} {results[0]:>10.2f} {results[1]:>10.2f} {results[2]:>10.2f} "
+                  f"{written_kb[False]:>13.1f} {written_kb[True]:>13.1f}")
+
+    growth = {mode: values[-1] / values[0] for mode, values in timings.items()}
+    print(f"time growth {LINE_COUNTS[0]} -> {LINE_COUNTS[-1]} lines: splice x{growth['splice']:.1f}, atomic x{growth['atomic']:.1f}")
+    if splice_written[-1] > splice_written[0] * 1.5:
+        failures.append("splice writes grew with the hosts file")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""
+Pre-staged (two-phase) hosts commit benchmark.
+
+Times the work left at a session boundary for a block list of --sites
+domains on a hosts file of --lines foreign lines: HostsFileEngine.apply
+(render, write, fsync, rename at the boundary) against commit() of an
+image prepared by prepare() earlier in the session (one rename). Then
+runs the same transitions through a HostsWorker with stage() and reports
+the deadline-to-commit latency it logs. Exits 1 if the two paths leave
+different hosts files or pre-staging (direct or through the worker)
+is not faster.
+
+    python benchmarks/bench_prestaged_commit.py [--sites 20000] [--lines 10000] [--rounds 20]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hosts_engine import HostsFileEngine, HostsWorker, managed_variants
+from resolver_cache import percentile
+
+
+def make_hosts(path, lines):
+    with open(path, "w") as f:
+        f.write("127.0.0.1\tlocalhost\n")
+        for i in range(lines):
+            f.write(f"10.0.{i // 256 % 256}.{i % 256}\tinternal{i}.corp.example\n")
+
+
+def report(label, seconds):
+    print(f"{label:<34} p50 {percentile(seconds, 0.50) * 1000:7.2f} ms   p99 {percentile(seconds, 0.99) * 1000:7.2f} ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Boundary cost of apply() vs a pre-staged commit().")
+    parser.add_argument("--sites", type=int, default=20000)
+    parser.add_argument("--lines", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args(argv)
+    hosts = managed_variants(f"site{i}.example.com" for i in range(args.sites))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        direct_path, staged_path, worker_path = (os.path.join(tmp, name) for name in ("direct", "staged", "worker"))
+        for path in (direct_path, staged_path, worker_path):
+            make_hosts(path, args.lines)
+        direct = HostsFileEngine(direct_path, owner="bench")
+        staged = HostsFileEngine(staged_path, owner="bench")
+
+        direct_seconds, staged_seconds, prepare_seconds = [], [], []
+        for i in range(args.rounds * 2):
+            request = {"block_hosts": hosts} if i % 2 == 0 else {"unblock_hosts": hosts}
+            start = time.perf_counter()
+            direct.apply(**request)
+            direct_seconds.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            image = staged.prepare(**request) # During the session, off the boundary
+            prepare_seconds.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            result = staged.commit(image)
+            staged_seconds.append(time.perf_counter() - start)
+            if result is None:
+                print("FAIL: staged image reported stale")
+                return 1
+            with open(direct_path, "rb") as a, open(staged_path, "rb") as b:
+                if a.read() != b.read():
+                    print(f"FAIL: hosts files differ after round {i}")
+                    return 1
+
+        # Through the worker, the way the app uses it: stage at session start, submit with the deadline.
+        worker = HostsWorker(HostsFileEngine(worker_path, owner="bench"))
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i in range(args.rounds * 2):
+                request = {"block_hosts": hosts} if i % 2 == 0 else {"unblock_hosts": hosts}
+                worker.stage(**request)
+                worker.flush()
+                worker.submit(deadline=time.monotonic(), **request)
+                worker.flush()
+            worker.stop()
+        leftovers = [name for name in os.listdir(tmp) if name.endswith(".tmp")]
+
+    print(f"{len(hosts)} managed entries, {args.lines} foreign hosts lines, {args.rounds * 2} transitions")
+    report("apply() at the boundary", direct_seconds)
+    report("prepare() during the session", prepare_seconds)
+    report("commit() at the boundary", staged_seconds)
+    report("worker deadline -> commit", [ms / 1000 for ms in worker.commit_latencies_ms])
+    if leftovers:
+        print(f"FAIL: staged temp files left behind: {leftovers}")
+        return 1
+    if percentile(staged_seconds, 0.50) >= percentile(direct_seconds, 0.50):
+        print("FAIL: the pre-staged commit is not faster than apply()")
+        return 1
+    if percentile(worker.commit_latencies_ms, 0.50) / 1000 >= percentile(direct_seconds, 0.50):
+        print("FAIL: the worker did not commit the pre-staged images")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""
+Block profile transition benchmark.
+
+Drives a sequence whose items use overlapping block profiles through
+PomodoroEngine on a SimulatedScheduler and applies each transition to a
+temp hosts file two ways: a full unblock followed by a full block (the old
+behaviour), and one set-difference update. Reports hosts file writes,
+entries touched and time for each; exits 1 if both do not end with the
+same hosts file after every transition.
+
+    python benchmarks/bench_profile_transitions.py [--profile-size 5000] [--overlap 0.8]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hosts_engine import HostsFileEngine, managed_variants
+from pomodoro_engine import PomodoroEngine, SimulatedScheduler, block_profile_domains
+
+
+def make_profiles(size, overlap):
+    shared = [f"shared{i}.example.com" for i in range(int(size * overlap))]
+    own = size - len(shared)
+    return {
+        "Deep Work": shared + [f"deep{i}.example.com" for i in range(own)],
+        "Light Admin": shared + [f"admin{i}.example.com" for i in range(own)],
+        "Break": shared[:len(shared) // 2],
+    }
+
+
+SEQUENCE = [
+    {'type': "Focus", 'name': "Deep 1", 'profile': "Deep Work"},
+    {'type': "Short Break", 'name': "Break 1", 'profile': "Break"},
+    {'type': "Focus", 'name': "Deep 2", 'profile': "Deep Work"},
+    {'type': "Short Break", 'name': "Break 2", 'profile': "Break"},
+    {'type': "Focus", 'name': "Admin", 'profile': "Light Admin"},
+    {'type': "Long Break", 'name': "Long Break"},
+    {'type': "Focus", 'name': "Main list"},
+]
+
+
+class Strategy:
+    def __init__(self, path, diff):
+        self.engine = HostsFileEngine(path, owner="bench")
+        self.diff = diff
+        self.active = set()
+        self.writes = self.entries = 0
+        self.seconds = 0.0
+
+    def apply(self, target):
+        start = time.perf_counter()
+        steps = ([(target - self.active, self.active - target)] if self.diff
+                 else [((), self.active), (target, ())])
+        for block, unblock in steps:
+            added, removed = self.engine.apply(block_hosts=block, unblock_hosts=unblock)
+            if added or removed:
+                self.writes += 1
+                self.entries += len(added) + len(removed)
+        self.seconds += time.perf_counter() - start
+        self.active = target
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Full unblock+block vs set-difference profile transitions.")
+    parser.add_argument("--profile-size", type=int, default=5000)
+    parser.add_argument("--overlap", type=float, default=0.8)
+    args = parser.parse_args(argv)
+    profiles = make_profiles(args.profile_size, args.overlap)
+    main_list = [f"main{i}.example.com" for i in range(args.profile_size)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        strategies = {}
+        for name, diff in (("full", False), ("diff", True)):
+            path = os.path.join(tmp, f"hosts-{name}")
+            with open(path, "w") as f:
+                f.write("127.0.0.1\tlocalhost\n")
+            strategies[name] = Strategy(path, diff)
+
+        scheduler = SimulatedScheduler()
+        engine = PomodoroEngine(scheduler.schedule, scheduler.cancel, lambda item_type: 1, clock=scheduler.clock)
+        engine.sequence = list(SEQUENCE)
+        engine.auto_advance = True
+        mismatches = []
+
+        def on_transition(profile):
+            target = managed_variants(block_profile_domains(profile, profiles, main_list))
+            for strategy in strategies.values():
+                strategy.apply(target)
+            if strategies["full"].engine.managed_hosts() != strategies["diff"].engine.managed_hosts():
+                mismatches.append(profile)
+
+        for event in ("block_requested", "unblock_requested", "pre_focus_block"):
+            engine.subscribe(event, on_transition)
+        with contextlib.redirect_stdout(io.StringIO()): # the engine logs progress with print()
+            engine.start_sequence()
+            scheduler.run()
+
+    print(f"{len(SEQUENCE)} sessions, profiles of {args.profile_size} domains, {args.overlap:.0%} shared")
+    for name, strategy in strategies.items():
+        print(f"{name:<5} {strategy.writes:3d} writes  {strategy.entries:7d} entries touched  {strategy.seconds * 1000:8.1f} ms")
+    if mismatches:
+        print(f"FAIL: hosts files differ after transitions to {mismatches}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""
+Redirect verification benchmark: one-by-one vs. bounded thread pool.
+
+A fake resolver answers each name after a random 1-20 ms delay (as a
+recursive lookup through a cache miss might). A few names "leak" (still
+resolve to a real address), one never answers. verify_redirects() checks
+all of them on VERIFY_WORKERS threads with the per-query timeout; the
+serial loop is what checking them one by one through getaddrinfo costs.
+Exits 1 unless exactly the leaking names are reported and the hanging one
+times out.
+
+    python benchmarks/bench_redirect_verify.py [--hosts 500]
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hosts_engine import REDIRECT_IP
+from resolver_cache import verify_redirects, VERIFY_WORKERS
+
+HANG_NAME = "hang.example.com"
+
+
+def make_resolver(leaks, seed=1):
+    rng = random.Random(seed)
+    delays = {}
+    release = threading.Event()
+
+    def resolve(name):
+        if name == HANG_NAME:
+            release.wait(5) # Never answers within the query timeout
+            return []
+        delay = delays.setdefault(name, rng.uniform(0.001, 0.020))
+        time.sleep(delay)
+        return ["93.184.216.34"] if name in leaks else [REDIRECT_IP]
+    return resolve, release
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serial vs. pooled redirect verification.")
+    parser.add_argument("--hosts", type=int, default=500)
+    parser.add_argument("--timeout", type=float, default=0.5, help="per-query timeout")
+    args = parser.parse_args(argv)
+
+    hosts = [f"site{i}.example.com" for i in range(args.hosts)]
+    leaks = set(hosts[::97])
+    resolve, release = make_resolver(leaks)
+
+    start = time.perf_counter()
+    serial_leaks = {host for host in hosts if resolve(host) != [REDIRECT_IP]}
+    serial_seconds = time.perf_counter() - start
+
+    result = verify_redirects(hosts + [HANG_NAME], resolve=resolve, timeout=args.timeout)
+    release.set()
+
+    print(f"{args.hosts} hosts, {len(leaks)} leaking, 1 hanging")
+    print(f"one by one            {serial_seconds * 1000:8.0f} ms")
+    print(f"pool of {VERIFY_WORKERS:<3}           {result['seconds'] * 1000:8.0f} ms   "
+          f"p50 {result['p50_ms']:.1f} ms  p99 {result['p99_ms']:.1f} ms  timed out {result['timed_out']}")
+    if set(result['leaked']) != leaks or serial_leaks != leaks or result['timed_out'] != [HANG_NAME]:
+        print(f"FAIL: leaked {sorted(result['leaked'])}, timed out {result['timed_out']}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
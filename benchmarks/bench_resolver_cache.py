@@ -0,0 +1,99 @@
+"""
+Resolver cache flush benchmark with a fake caching resolver.
+
+A FakeCachingResolver stands in for systemd-resolved/nscd: it answers from
+its cache (the real addresses, with a TTL) until the entry expires or it is
+flushed, and only then sees the "hosts file" redirect. ResolverCacheManager
+is run with and without a flusher for it, and the measured time-to-effect
+is reported for both; exits 1 if the flushed run is not effective at once
+or the unflushed run does not wait for the TTL. The unflushed run must also
+report every name as leaked: redirect verification runs alongside the
+time-to-effect polling, so it sees the stale cache instead of waiting
+until the TTL has run out.
+
+    python benchmarks/bench_resolver_cache.py [--ttl 1.5] [--names 20]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hosts_engine import REDIRECT_IP
+from resolver_cache import ResolverCacheManager
+
+
+class FakeCachingResolver:
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.blocked = set()        # What the hosts file says now
+        self.cache = {}             # name -> (addresses, expiry)
+        self.lock = threading.Lock()
+
+    def resolve(self, name):
+        now = time.monotonic()
+        with self.lock:
+            cached = self.cache.get(name)
+            if cached and cached[1] > now:
+                return cached[0]
+            addresses = [REDIRECT_IP] if name in self.blocked else ["93.184.216.34"]
+            self.cache[name] = (addresses, now + self.ttl)
+            return addresses
+
+
+class FakeFlusher:
+    def __init__(self, resolver):
+        self.name = "fake-cache"
+        self.resolver = resolver
+
+    def available(self):
+        return True
+
+    def flush(self):
+        with self.resolver.lock:
+            self.resolver.cache.clear()
+
+
+def run(names, ttl, flush):
+    resolver = FakeCachingResolver(ttl)
+    for name in names:
+        resolver.resolve(name) # Warm the cache with the real addresses, as browsing before the session did
+    manager = ResolverCacheManager(flushers=[FakeFlusher(resolver)] if flush else [], resolve=resolver.resolve,
+                                   sample_size=len(names), timeout=ttl * 3)
+    resolver.blocked.update(names) # The hosts file commit
+    manager.after_commit(names)
+    manager.wait()
+    return manager.results[-1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Resolver cache flush time-to-effect.")
+    parser.add_argument("--ttl", type=float, default=1.5)
+    parser.add_argument("--names", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    names = [f"site{i}.example.com" for i in range(args.names)]
+    flushed_result = run(names, args.ttl, flush=True)
+    unflushed_result = run(names, args.ttl, flush=False)
+    flushed, unflushed = flushed_result['time_to_effect'], unflushed_result['time_to_effect']
+    if None in flushed.values() or None in unflushed.values():
+        print("FAIL: some names never redirected")
+        return 1
+    worst_flushed = max(flushed.values())
+    worst_unflushed = max(unflushed.values())
+    print(f"{args.names} names, cache TTL {args.ttl:.1f} s")
+    print(f"with flush     time-to-effect max {worst_flushed * 1000:8.1f} ms")
+    print(f"without flush  time-to-effect max {worst_unflushed * 1000:8.1f} ms")
+    if worst_flushed > 0.1 or worst_unflushed < args.ttl * 0.9:
+        print("FAIL: unexpected time-to-effect")
+        return 1
+    if flushed_result['verify_block']['leaked'] or len(unflushed_result['verify_block']['leaked']) != len(names):
+        print("FAIL: redirect verification did not run alongside the time-to-effect polling")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""
+Session history benchmark.
+
+Records several years of synthetic sessions (start, a pause/resume pair on
+some, then stop or completion) through SessionHistory.record(), then times
+the queries the statistics views need. Reports the cost of record() on the
+caller's thread, the batched write throughput (events plus rollups), query
+latency over the events, and what opening the Statistics window reads from
+the rollups instead; exits 1 if the event totals, the rollups and what was
+recorded disagree.
+
+    python benchmarks/bench_session_history.py [--years 10] [--sessions-per-day 16]
+"""
+import argparse
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from session_history import (SessionHistory, week_start, EVENT_STARTED, EVENT_PAUSED, EVENT_RESUMED,
+                             EVENT_STOPPED, EVENT_COMPLETED)
+
+TYPES = [("Focus", 25 * 60), ("Short Break", 5 * 60), ("Long Break", 15 * 60)]
+
+
+def record_history(history, years, sessions_per_day):
+    """Returns ({day: expected focus minutes}, rows recorded, seconds spent inside record())."""
+    expected = {}
+    rows = 0
+    spent = 0.0
+    today = datetime.date.today()
+    for day_offset in range(years * 365, -1, -1):
+        day = today - datetime.timedelta(days=day_offset)
+        ts = time.mktime(day.timetuple()) + 8 * 3600
+        for i in range(sessions_per_day):
+            session_type, seconds = TYPES[0] if i % 2 == 0 else TYPES[1 + (i % 8 == 7)]
+            session = {'type': session_type, 'name': session_type, 'index': i, 'total_seconds': seconds}
+            stopped = (day_offset + i) % 11 == 0
+            elapsed = seconds // 3 if stopped else seconds
+            events = [(EVENT_STARTED, 0)]
+            if i % 5 == 0:
+                events += [(EVENT_PAUSED, 60), (EVENT_RESUMED, 60)]
+            events.append((EVENT_STOPPED if stopped else EVENT_COMPLETED, elapsed))
+            start = time.perf_counter()
+            for event, event_elapsed in events:
+                history.record(event, session, event_elapsed, ts=ts)
+            spent += time.perf_counter() - start
+            rows += len(events)
+            ts += seconds
+            if session_type == "Focus":
+                expected[day.isoformat()] = expected.get(day.isoformat(), 0) + elapsed / 60.0
+    return expected, rows, spent
+
+
+def timed_ms(fn, repeat=20):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Session history write and query benchmark.")
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--sessions-per-day", type=int, default=16)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        history = SessionHistory(os.path.join(tmp, "history.sqlite3"))
+        start = time.perf_counter()
+        expected, rows, record_seconds = record_history(history, args.years, args.sessions_per_day)
+        history.flush()
+        write_seconds = time.perf_counter() - start
+        if history.error:
+            print(f"FAIL: {history.error}")
+            return 1
+
+        per_day, year_ms = timed_ms(lambda: history.focus_minutes_per_day(365))
+        _, month_ms = timed_ms(lambda: history.focus_minutes_per_day(30))
+        today = datetime.date.today()
+        _, counts_ms = timed_ms(lambda: history.completed_counts((today - datetime.timedelta(days=364)).isoformat(),
+                                                                 today.isoformat()))
+        yesterday = (today - datetime.timedelta(days=1)).isoformat()
+
+        def open_statistics_window():
+            # Same reads as StatisticsWindow.refresh() with a cached heatmap
+            this_week = week_start(today)
+            history.daily_rollups(yesterday, today.isoformat())
+            history.daily_rollups((today - datetime.timedelta(days=6)).isoformat(), today.isoformat())
+            history.weekly_rollups((this_week - datetime.timedelta(weeks=52)).isoformat(), this_week.isoformat())
+            return history.item_rollups()
+        _, window_ms = timed_ms(open_statistics_window)
+        yearly, heatmap_ms = timed_ms(lambda: history.daily_rollups((today - datetime.timedelta(days=364)).isoformat(),
+                                                                    today.isoformat()))
+        history.close()
+
+    print(f"{rows} rows ({args.years} years, {args.sessions_per_day} sessions/day)")
+    print(f"record()                          {record_seconds / rows * 1e6:8.2f} us/event on the caller's thread")
+    print(f"batched writes                    {rows / write_seconds:8.0f} rows/s")
+    print(f"focus minutes per day, 365 days   {year_ms:8.2f} ms")
+    print(f"focus minutes per day, 30 days    {month_ms:8.2f} ms")
+    print(f"completed counts, 365 days        {counts_ms:8.2f} ms")
+    print(f"statistics window open (rollups)  {window_ms:8.2f} ms")
+    print(f"heatmap first render (rollups)    {heatmap_ms:8.2f} ms")
+    mismatched = [day for day, minutes in per_day.items() if abs(minutes - expected.get(day, 0)) > 1e-6]
+    mismatched += [day for day, row in yearly.items() if abs(row['focus_seconds'] / 60 - expected.get(day, 0)) > 1e-6]
+    if mismatched or len(per_day) != 365:
+        print(f"MISMATCH: {len(mismatched)} days differ, {len(per_day)} days returned")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
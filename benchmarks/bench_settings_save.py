@@ -0,0 +1,75 @@
+"""
+Settings save benchmark: rewrite-everything vs. SettingsStore.
+
+Simulates a burst of hot-state changes (XP count, current session) such as
+a session completing, with a sequence of N items in the cold config. The
+old path dumps the whole settings dict with indent=4 into the truncated
+file on every change. SettingsStore writes only the dirty section, once per
+coalescing window, atomically. Reports bytes written and time per burst.
+
+    python benchmarks/bench_settings_save.py [--sequence-items 40] [--changes 5]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from settings_store import SettingsStore
+
+
+def legacy_save(path, settings):
+    with open(path, "w", encoding='utf-8') as f:
+        json.dump(settings, f, indent=4)
+    return os.path.getsize(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Settings save benchmark.")
+    parser.add_argument("--sequence-items", type=int, default=40)
+    parser.add_argument("--changes", type=int, default=5, help="changes per burst")
+    parser.add_argument("--bursts", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    config = {"focus_duration_minutes": 25, "short_break_duration_minutes": 5, "long_break_duration_minutes": 15,
+              "eating_break_duration_minutes": 30, "blocking_backend": "hosts", "dns_listen_port": None, "dns_upstream": None,
+              "custom_sequence": [{'type': "Focus" if i % 2 == 0 else "Short Break", 'name': f"Session {i}"}
+                                  for i in range(args.sequence_items)]}
+    state = {"pomodoro_count": 0, "unlocked_achievements": ["heart", "smiley"], "current_art_piece_id": "star",
+             "current_art_progress": 2, "last_xp_full_date_str": "2026-01-01", "current_session": None}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, "legacy.json")
+        legacy_bytes = 0
+        start = time.perf_counter()
+        for burst in range(args.bursts):
+            for change in range(args.changes):
+                legacy_bytes += legacy_save(legacy_path, {**config, **state, "pomodoro_count": burst * args.changes + change})
+        legacy_seconds = time.perf_counter() - start
+
+        pending = []
+        store = SettingsStore(os.path.join(tmp, "settings.json"), os.path.join(tmp, "state.json"),
+                              schedule=lambda ms, fn: pending.append(fn) or fn, cancel=lambda handle: None)
+        store.update("config", config)
+        store.flush()
+        store_bytes = 0
+        start = time.perf_counter()
+        for burst in range(args.bursts):
+            for change in range(args.changes):
+                store.update("config", config) # Unchanged: not dirty
+                store.update("state", dict(state, pomodoro_count=burst * args.changes + change))
+            pending.pop()() # The coalescing timer fires once per burst
+            store_bytes += os.path.getsize(os.path.join(tmp, "state.json"))
+        store_seconds = time.perf_counter() - start
+
+    print(f"{args.bursts} bursts of {args.changes} changes, {args.sequence_items}-item sequence")
+    print(f"rewrite everything, in place   {legacy_bytes / args.bursts:9.0f} bytes/burst  {legacy_seconds / args.bursts * 1000:7.2f} ms/burst  (not crash-safe)")
+    print(f"SettingsStore, dirty + atomic  {store_bytes / args.bursts:9.0f} bytes/burst  {store_seconds / args.bursts * 1000:7.2f} ms/burst  (fsync included)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+"""
+Startup-time benchmark.
+
+Measures, for the working tree and optionally a git revision to compare with:
+  - import cost of pomodoro_app from `python -X importtime` (cumulative, ms),
+    plus the slowest top-level imports;
+  - time-to-first-frame: process launch until a Tk root with the app icon
+    has been drawn once (needs a display; skipped otherwise). The full
+    PomodoroWebsiteBlocker window needs root, so the icon + first update is
+    used as the first-frame proxy.
+
+Run from the repository root:
+    python benchmarks/bench_startup.py                 # current tree
+    python benchmarks/bench_startup.py --compare HEAD~1  # before/after
+"""
+import argparse
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+FIRST_FRAME_SNIPPET = """
+import sys
+sys.path.insert(0, {tree!r})
+import tkinter as tk
+import pomodoro_app
+root = tk.Tk()
+if hasattr(pomodoro_app, "_load_app_icon"):
+    icon = pomodoro_app._load_app_icon(root)
+root.update()
+print("FIRST_FRAME", flush=True)
+root.destroy()
+"""
+
+
+def import_times(tree, runs):
+    """Best cumulative import time of pomodoro_app and of each module it imports directly (ms)."""
+    totals = []
+    direct_imports = {}
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import pomodoro_app"],
+                                cwd=tree, capture_output=True, text=True)
+        children = {}
+        # importtime prints children before their parent; a parent's direct children are one level deeper.
+        for line in result.stderr.splitlines():
+            match = IMPORTTIME_LINE.match(line)
+            if not match:
+                continue
+            cumulative_us, depth, name = int(match.group(2)), len(match.group(3)), match.group(4)
+            if depth == 3:
+                children[name] = cumulative_us
+            elif depth == 1:
+                if name == "pomodoro_app":
+                    totals.append(cumulative_us)
+                    for child, us in children.items():
+                        direct_imports[child] = min(direct_imports.get(child, us), us)
+                children = {}
+    return (min(totals) / 1000 if totals else float("nan")), direct_imports
+
+
+def first_frame_ms(tree, runs):
+    if sys.platform.startswith("linux") and not os.environ.get("DISPLAY"):
+        return None
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = subprocess.Popen([sys.executable, "-c", FIRST_FRAME_SNIPPET.format(tree=tree)],
+                                cwd=tree, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        for line in proc.stdout:
+            if line.startswith("FIRST_FRAME"):
+                samples.append((time.perf_counter() - start) * 1000)
+                break
+        proc.wait()
+    return min(samples) if samples else None
+
+
+def report(label, tree, runs):
+    total_ms, direct_imports = import_times(tree, runs)
+    frame_ms = first_frame_ms(tree, runs)
+    frame_text = f"{frame_ms:.0f} ms" if frame_ms is not None else "n/a (no display)"
+    print(f"{label}: import pomodoro_app {total_ms:.1f} ms, time-to-first-frame {frame_text}")
+    for name, us in sorted(direct_imports.items(), key=lambda kv: -kv[1])[:8]:
+        print(f"    {us / 1000:8.1f} ms  {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--compare", metavar="REV", help="also measure this git revision (e.g. HEAD~1)")
+    parser.add_argument("--runs", type=int, default=5, help="best-of-N runs (default 5)")
+    args = parser.parse_args()
+
+    if args.compare:
+        worktree = tempfile.mkdtemp(prefix="pomodoro-bench-")
+        shutil.rmtree(worktree)
+        subprocess.run(["git", "worktree", "add", "--detach", worktree, args.compare],
+                       cwd=REPO_ROOT, check=True, capture_output=True)
+        try:
+            report(f"before ({args.compare})", worktree, args.runs)
+        finally:
+            subprocess.run(["git", "worktree", "remove", "--force", worktree], cwd=REPO_ROOT, capture_output=True)
+    report("after (working tree)", REPO_ROOT, args.runs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Streaming import of external block lists.
+
+Accepts, mixed freely within one file:
+    0.0.0.0 ads.example.com tracker.example.net    hosts format
+    ads.example.com                                 plain domains
+    ||ads.example.com^$third-party                  Adblock-style network rules
+Comments (#, !), Adblock headers, exception (@@) and cosmetic (##) rules
+and entries like localhost are skipped.
+
+The file is never loaded whole. Small files are parsed line by line on the
+calling thread in batches. Large files are split into byte ranges that
+worker processes parse independently; only the resulting domains travel
+back. Progress is published on the ImportJob, which the UI polls.
+"""
+import concurrent.futures
+import multiprocessing
+import os
+import threading
+
+from domain_matcher import IPV4_RE, normalize_domain
+
+PARALLEL_IMPORT_MIN_BYTES = 16 * 1024 * 1024   # Below this, process start-up costs more than it saves
+PARALLEL_CHUNK_BYTES = 8 * 1024 * 1024
+IMPORT_BATCH_LINES = 50000
+
+
+def parse_line(line):
+    """Domains named by one line of a hosts, plain or Adblock-style list (usually zero or one)."""
+    line = line.strip()
+    if not line or line[0] in "#!" or line[0] == "[":
+        return []
+    if line.startswith("||"):
+        # ||example.com^ or ||example.com^$options; rules with paths or wildcards are not domain blocks.
+        rule = line[2:].split("$", 1)[0]
+        if rule.endswith("^"):
+            rule = rule[:-1]
+        if not rule or "/" in rule or "*" in rule or "^" in rule:
+            return []
+        domain = normalize_domain(rule)
+        return [domain] if domain else []
+    if line.startswith("@@") or "##" in line or "#@#" in line:
+        return []
+    parts = line.split("#", 1)[0].split()
+    if not parts:
+        return []
+    if len(parts) > 1 and (IPV4_RE.match(parts[0]) or ":" in parts[0]): # hosts format, IPv4 or IPv6
+        candidates = parts[1:]
+    else:
+        candidates = parts[:1]
+    domains = []
+    for candidate in candidates:
+        domain = normalize_domain(candidate)
+        if domain:
+            domains.append(domain)
+    return domains
+
+
+def parse_lines(lines):
+    domains = set()
+    for line in lines:
+        domains.update(parse_line(line))
+    return domains
+
+
+def parse_byte_range(path, start, end):
+    """Worker entry point: domains on the lines that start within [start, end) of path."""
+    domains = set()
+    with open(path, "rb") as f:
+        if start > 0:
+            f.seek(start - 1)
+            f.readline() # Finish the line that straddles start; the previous range owns it
+        position = f.tell()
+        while position < end:
+            line = f.readline()
+            if not line:
+                break
+            position += len(line)
+            domains.update(parse_line(line.decode('utf-8', errors='replace')))
+    return domains
+
+
+class ImportJob:
+    """
+    Parses one list file on a background thread. Poll `bytes_done`,
+    `total_bytes`, `domains` and `done`; `error` is set if the import failed
+    and `cancel()` stops it early. The caller commits `domains` itself, once.
+    """
+
+    def __init__(self, path, workers=None, parallel_min_bytes=PARALLEL_IMPORT_MIN_BYTES):
+        self.path = path
+        self.workers = workers or os.cpu_count() or 1
+        self.parallel_min_bytes = parallel_min_bytes
+        self.total_bytes = os.path.getsize(path)
+        self.bytes_done = 0
+        self.lines_done = 0
+        self.domains = set()
+        self.done = False
+        self.cancelled = False
+        self.error = None
+        self._thread = threading.Thread(target=self._run, name="BlocklistImport", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self.cancelled = True
+
+    def wait(self, timeout=None):
+        self._thread.join(timeout)
+        return self.done
+
+    def _run(self):
+        try:
+            if self.workers > 1 and self.total_bytes >= self.parallel_min_bytes:
+                self._run_parallel()
+            else:
+                self._run_streaming()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+
+    def _run_streaming(self):
+        batch = []
+        with open(self.path, "rb") as f:
+            for raw_line in f:
+                batch.append(raw_line)
+                if len(batch) >= IMPORT_BATCH_LINES:
+                    self._consume_batch(batch)
+                    batch = []
+                    if self.cancelled:
+                        return
+            self._consume_batch(batch)
+
+    def _consume_batch(self, batch):
+        self.domains |= parse_lines(line.decode('utf-8', errors='replace') for line in batch)
+        self.bytes_done += sum(len(line) for line in batch)
+        self.lines_done += len(batch)
+
+    def _run_parallel(self):
+        ranges = [(start, min(start + PARALLEL_CHUNK_BYTES, self.total_bytes))
+                  for start in range(0, self.total_bytes, PARALLEL_CHUNK_BYTES)]
+        # spawn: forking a process that runs Tk and other threads is not safe on every platform.
+        context = multiprocessing.get_context("spawn")
+        with concurrent.futures.ProcessPoolExecutor(max_workers=self.workers, mp_context=context) as pool:
+            futures = {pool.submit(parse_byte_range, self.path, start, end): end - start for start, end in ranges}
+            for future in concurrent.futures.as_completed(futures):
+                if self.cancelled:
+                    for pending in futures:
+                        pending.cancel()
+                    return
+                self.domains |= future.result()
+                self.bytes_done += futures[future]
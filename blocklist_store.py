@@ -0,0 +1,334 @@
+"""
+On-disk block list: a compact sorted snapshot plus an append-only journal.
+
+    ~/.website_blocker_list.snapshot  DomainMatcher blob (reversed, sorted domains), memory-mapped
+    ~/.website_blocker_list.journal   "#snapshot count=N text=SIG" header, then one "+domain" or
+                                      "-domain" line per edit since the snapshot was written
+    ~/.website_blocker_list.txt       plain-text export, one domain per line (the old format)
+
+Loading maps the snapshot and replays the journal, so startup neither parses
+the whole list nor builds a Python object per domain. An edit appends a
+single journal line. Once the journal grows past a fraction of the list, a
+background thread merges it into a new snapshot and refreshes the plain-text
+export (so the .txt file trails the journal by at most that many edits); the
+result is swapped in through `dispatch` on the caller's thread. export_text()
+writes the current list in the plain-text format on demand.
+
+The plain-text file stays authoritative for anyone editing it by hand: if
+it changed since the last export, it is re-imported on load and the journal
+is replayed on top.
+"""
+import mmap
+import os
+import threading
+from pathlib import Path
+
+from domain_matcher import DomainMatcher, merge_blob, iter_blob_keys, domain_from_key, reversed_key
+from hosts_engine import atomic_write_bytes
+from pomodoro_engine import BLOCK_LIST_FILE_PATH
+
+JOURNAL_HEADER = "#snapshot"
+JOURNAL_COMPACT_MIN_LINES = 256
+JOURNAL_COMPACT_FRACTION = 8  # Compact once the journal holds more lines than 1/8 of the list
+BULK_EDIT_MIN_DOMAINS = 256   # Larger bulk adds rebuild the snapshot instead of journaling each domain
+
+
+def _file_signature(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return "-"
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+def _map_file(path):
+    """Read-only mmap of path, or b"" for an empty file (which cannot be mapped)."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class BlockListStore:
+    def __init__(self, text_path=BLOCK_LIST_FILE_PATH, dispatch=None, read_only=False):
+        """
+        dispatch(fn) runs fn on the thread that owns `domains` (e.g. a
+        root.after wrapper); without one, results are installed from the
+        compaction thread under the store's lock. read_only stores never
+        write any file.
+        """
+        self.text_path = Path(text_path)
+        self.snapshot_path = self.text_path.with_suffix(".snapshot")
+        self.journal_path = self.text_path.with_suffix(".journal")
+        self.dispatch = dispatch or (lambda fn: fn())
+        self.read_only = read_only
+        self.domains = DomainMatcher(collapse=False, auto_compact=False)
+        self._mapped = None         # mmap backing the current snapshot
+        self._journal = None        # Append handle
+        self._journal_lines = 0
+        self._generation = 0        # Bumped when `domains` is replaced wholesale
+        self._compaction = None     # Running compaction thread
+        self._compact_again = False
+        self._since_copy = None     # Edits journaled while a compaction runs, replayed onto its result
+        self._merge = None          # Running bulk-add merge thread
+        self._merge_queue = []      # (domains, on_done) bulk adds waiting for it
+        self._merge_result = None   # (blob, count, on_done) built but not yet installed
+        self._since_merge = None    # Edits journaled while a merge runs, replayed onto its result
+        self._closed = False
+        self._lock = threading.RLock()
+
+    # --- Loading ---
+    def _read_journal(self):
+        """Returns (header dict or None, [(op, domain), ...]); a torn last line is ignored."""
+        try:
+            with open(self.journal_path, "r", encoding='utf-8') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None, []
+        header = None
+        ops = []
+        for line in data.split("\n")[:-1]:
+            if line.startswith(JOURNAL_HEADER):
+                header = dict(field.split("=", 1) for field in line.split()[1:] if "=" in field)
+            elif line[:1] in ("+", "-") and len(line) > 1:
+                ops.append((line[0], line[1:]))
+        return header, ops
+
+    def load(self):
+        """Loads the block list into `domains` and returns it. Raises OSError if a file cannot be read."""
+        header, ops = self._read_journal()
+        snapshot_current = (header is not None and self.snapshot_path.exists()
+                            and header.get("text") == _file_signature(self.text_path))
+        if snapshot_current:
+            self._mapped = _map_file(self.snapshot_path)
+            self.domains = DomainMatcher(collapse=False, auto_compact=False, blob=self._mapped,
+                                         count=int(header.get("count", 0)))
+        else:
+            # First run with this format, or the text file was edited by hand since the last export.
+            try:
+                with open(self.text_path, "r", encoding='utf-8') as f:
+                    self.domains = DomainMatcher((line.strip() for line in f), collapse=False, auto_compact=False)
+            except FileNotFoundError:
+                self.domains = DomainMatcher(collapse=False, auto_compact=False)
+        for op, domain in ops:
+            self._apply_op(op, domain)
+        self._journal_lines = len(ops)
+        self._generation += 1
+
+        if not self.read_only:
+            self._journal = open(self.journal_path, "a", encoding='utf-8')
+            if not snapshot_current:
+                self.compact()
+            else:
+                self._maybe_compact()
+        return self.domains
+
+    def _apply_op(self, op, domain):
+        if op == "+":
+            self.domains.add(domain)
+        else:
+            self.domains.discard(domain)
+
+    # --- Editing ---
+    def _append(self, op, domain):
+        self._append_many([(op, domain)])
+
+    def _append_many(self, edits):
+        """Journals edits with one write and one fsync."""
+        self._journal.write("".join(f"{op}{domain}\n" for op, domain in edits))
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+        self._journal_lines += len(edits)
+        if self._since_copy is not None:
+            self._since_copy.extend(edits)
+        if self._since_merge is not None:
+            self._since_merge.extend(edits)
+
+    def add(self, domain):
+        """Adds domain and journals it; returns False if it was already listed. Raises OSError."""
+        with self._lock:
+            if not self.domains.add(domain):
+                return False
+            self._append("+", domain)
+            self._maybe_compact()
+            return True
+
+    def discard(self, domain):
+        with self._lock:
+            if not self.domains.discard(domain):
+                return False
+            self._append("-", domain)
+            self._maybe_compact()
+            return True
+
+    def discard_many(self, domains):
+        """Removes several domains with a single journal write; returns those that were listed. Raises OSError."""
+        with self._lock:
+            removed = [domain for domain in dict.fromkeys(domains) if self.domains.discard(domain)]
+            if removed:
+                self._append_many([("-", domain) for domain in removed])
+                self._maybe_compact()
+            return removed
+
+    def add_many(self, domains, on_done=None):
+        """
+        Adds many domains at once; on_done(new_count) runs on the owner's
+        thread when they are in. Small batches are journaled before this
+        returns. Big batches skip the journal: the merged list is built on a
+        background thread, swapped in through `dispatch` and then compacted.
+        """
+        domains = list(domains)
+        if len(domains) < BULK_EDIT_MIN_DOMAINS:
+            added = sum(1 for domain in domains if self.add(domain))
+            if on_done:
+                on_done(added)
+            return
+        with self._lock:
+            self._merge_queue.append((domains, on_done))
+            if self._merge is None:
+                self._start_merge()
+
+    def _start_merge(self):
+        domains, on_done = self._merge_queue.pop(0)
+        blob, added, removed = self.domains.state()
+        self._since_merge = []
+
+        def run():
+            keys = {reversed_key(domain) for domain in domains if domain and domain.strip()}
+            self._merge_result = (*merge_blob(blob, added | keys, removed, collapse=False), on_done)
+            try:
+                self.dispatch(self._finish_merge)
+            except Exception as e: # e.g. the Tk root is already gone; close() installs it
+                print(f"BlockListStore: could not deliver merged block list: {e}")
+
+        self._merge = threading.Thread(target=run, name="BlockListMerge", daemon=True)
+        self._merge.start()
+
+    def _finish_merge(self, notify=True):
+        with self._lock:
+            if self._merge_result is None:
+                return # Already installed by close()
+            blob, count, on_done = self._merge_result
+            self._merge_result = None
+            self._merge = None
+            before = len(self.domains)
+            self.domains = DomainMatcher(collapse=False, auto_compact=False, blob=blob, count=count)
+            for op, domain in self._since_merge:
+                self._apply_op(op, domain)
+            self._since_merge = None
+            added = len(self.domains) - before
+            self._generation += 1
+            if self._merge_queue and notify:
+                self._start_merge()
+            else:
+                self.compact()
+        if on_done and notify:
+            on_done(added)
+
+    # --- Compaction ---
+    def _maybe_compact(self):
+        if self._journal_lines > max(JOURNAL_COMPACT_MIN_LINES, len(self.domains) // JOURNAL_COMPACT_FRACTION):
+            self.compact()
+
+    def _write_snapshot(self, blob, added, removed):
+        """Merges and writes the snapshot and the text export. Safe to run off the owner's thread."""
+        new_blob, count = merge_blob(blob, added, removed, collapse=False)
+        text = "".join(f"{domain}\n" for domain in sorted(domain_from_key(key) for key in iter_blob_keys(new_blob)))
+        atomic_write_bytes(self.text_path, text.encode('utf-8'))
+        atomic_write_bytes(self.snapshot_path, new_blob)
+        return count, _file_signature(self.text_path)
+
+    def compact(self):
+        """Starts a background merge of the journal into a new snapshot (no-op for read-only stores)."""
+        if self.read_only:
+            return
+        with self._lock:
+            if self._compaction is not None:
+                self._compact_again = True
+                return
+            blob, added, removed = self.domains.state()
+            generation = self._generation
+            self._since_copy = []
+
+        def run():
+            result, error = None, None
+            try:
+                result = self._write_snapshot(blob, added, removed)
+            except Exception as e:
+                error = e
+            try:
+                self.dispatch(lambda: self._finish_compaction(generation, result, error))
+            except Exception as e: # e.g. the Tk root is already gone; close() compacts again
+                print(f"BlockListStore: could not deliver compaction result: {e}")
+
+        with self._lock:
+            self._compaction = threading.Thread(target=run, name="BlockListCompaction", daemon=True)
+            self._compaction.start()
+
+    def _finish_compaction(self, generation, result, error):
+        with self._lock:
+            if self._closed:
+                return # close() already wrote a final snapshot
+            self._compaction = None
+            since_copy, self._since_copy = self._since_copy or [], None
+            if error is not None:
+                print(f"Error compacting block list: {error}")
+            elif generation != self._generation:
+                self._compact_again = True # `domains` was replaced meanwhile; this snapshot is already stale
+            else:
+                self._install_snapshot(result, since_copy)
+            if self._compact_again:
+                self._compact_again = False
+                self.compact()
+
+    def _install_snapshot(self, result, since_copy):
+        count, text_signature = result
+        previous = self._mapped
+        self._mapped = _map_file(self.snapshot_path)
+        self.domains.reset(self._mapped, count)
+        for op, domain in since_copy:
+            self._apply_op(op, domain)
+        lines = [f"{JOURNAL_HEADER} count={count} text={text_signature}\n"]
+        lines.extend(f"{op}{domain}\n" for op, domain in since_copy)
+        self._journal.close()
+        atomic_write_bytes(self.journal_path, "".join(lines).encode('utf-8'))
+        self._journal = open(self.journal_path, "a", encoding='utf-8')
+        self._journal_lines = len(since_copy)
+        if isinstance(previous, mmap.mmap):
+            previous.close()
+        print(f"Block list compacted: {count} domains.")
+
+    # --- Export / shutdown ---
+    def export_text(self, path):
+        """Writes the list in the plain-text format (one domain per line, sorted) to path."""
+        text = "".join(f"{domain}\n" for domain in sorted(self.domains))
+        atomic_write_bytes(path, text.encode('utf-8'))
+
+    def close(self):
+        """
+        Waits for a running compaction (finishing it here, since its dispatch
+        may never run now) and closes the journal. A short journal is left for
+        the next load to replay rather than paying for a full merge at exit.
+        """
+        if self.read_only or self._journal is None:
+            return
+        merge = self._merge
+        if merge is not None:
+            merge.join()
+            self._finish_merge(notify=False) # Its dispatch may never run now
+        with self._lock:
+            for domains, _ in self._merge_queue: # Never started: fold in synchronously
+                self.domains = DomainMatcher([*self.domains, *domains], collapse=False, auto_compact=False)
+                self._compact_again = True
+            self._merge_queue = []
+            self._closed = True
+            compaction = self._compaction # Its result may never be delivered now
+        if compaction is not None:
+            compaction.join()
+        with self._lock:
+            self._compaction = None
+            self._since_copy = None
+            if compaction is not None or self._compact_again:
+                self._install_snapshot(self._write_snapshot(*self.domains.state()), [])
+            self._journal.close()
+            self._journal = None
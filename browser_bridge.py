@@ -0,0 +1,280 @@
+"""
+Local WebSocket bridge to the companion browser extension (browser_extension/).
+
+The extension connects to ws://127.0.0.1:BROWSER_BRIDGE_PORT. When domains
+become blocked, the app pushes them and the extension reloads (or closes)
+only the tabs showing one of those domains or a subdomain of it, without
+stealing focus or needing keystroke permissions. Messages are JSON text
+frames:
+
+    extension -> app   {"type": "hello", "client": "...", "version": 1}
+    app -> extension   {"type": "block", "id": 7, "domains": [...], "action": "reload" | "close"}
+    extension -> app   {"type": "ack", "id": 7, "tabs": 2}
+    extension -> app   {"type": "ping"}   (keepalive, ignored)
+
+MV3 stops an extension's service worker after about 30 s without events or
+WebSocket messages, so the extension pings every 20 s while connected
+(and re-connects from a chrome.alarms alarm if it was stopped anyway). A
+client silent for BRIDGE_IDLE_TIMEOUT_S is dropped, so a worker that was
+stopped without a close frame is not counted as connected.
+
+Only loopback connections are accepted, and browsers must present an
+extension origin: a web page could otherwise connect to the port and read
+the block list. Clients without an Origin header (scripts, the benchmark's
+stand-in extension) are allowed.
+
+A minimal RFC 6455 server (text, ping and close frames; no extensions) on
+an asyncio loop in a background thread, so no third-party package is needed.
+"""
+import asyncio
+import base64
+import hashlib
+import itertools
+import json
+import struct
+import threading
+import time
+
+BROWSER_BRIDGE_HOST = "127.0.0.1"
+BROWSER_BRIDGE_PORT = 47823
+BRIDGE_PROTOCOL_VERSION = 1
+TAB_ACTIONS = ("reload", "close")
+EXTENSION_ORIGIN_PREFIXES = ("chrome-extension://", "moz-extension://", "safari-web-extension://")
+MAX_MESSAGE_BYTES = 1024 * 1024
+BRIDGE_IDLE_TIMEOUT_S = 60  # Three missed extension keepalives
+
+_WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+OPCODE_CONTINUATION = 0x0
+OPCODE_TEXT = 0x1
+OPCODE_CLOSE = 0x8
+OPCODE_PING = 0x9
+OPCODE_PONG = 0xA
+
+
+def websocket_accept_key(key):
+    return base64.b64encode(hashlib.sha1((key + _WEBSOCKET_GUID).encode('ascii')).digest()).decode('ascii')
+
+
+def encode_frame(payload, opcode=OPCODE_TEXT, mask_key=None):
+    """One unfragmented frame. Servers send unmasked frames; clients pass a 4-byte mask_key."""
+    header = bytes([0x80 | opcode])
+    mask_bit = 0x80 if mask_key else 0
+    length = len(payload)
+    if length < 126:
+        header += bytes([mask_bit | length])
+    elif length < 1 << 16:
+        header += bytes([mask_bit | 126]) + struct.pack("!H", length)
+    else:
+        header += bytes([mask_bit | 127]) + struct.pack("!Q", length)
+    if mask_key:
+        payload = bytes(b ^ mask_key[i % 4] for i, b in enumerate(payload))
+        header += mask_key
+    return header + payload
+
+
+async def read_frame(reader):
+    """Returns (fin, opcode, payload) of the next frame, unmasking it if needed."""
+    first, second = await reader.readexactly(2)
+    length = second & 0x7F
+    if length == 126:
+        length = struct.unpack("!H", await reader.readexactly(2))[0]
+    elif length == 127:
+        length = struct.unpack("!Q", await reader.readexactly(8))[0]
+    if length > MAX_MESSAGE_BYTES:
+        raise ValueError(f"frame of {length} bytes is too large")
+    mask_key = await reader.readexactly(4) if second & 0x80 else None
+    payload = await reader.readexactly(length)
+    if mask_key:
+        payload = bytes(b ^ mask_key[i % 4] for i, b in enumerate(payload))
+    return bool(first & 0x80), first & 0x0F, payload
+
+
+def domain_matches(hostname, domains):
+    """True if hostname is one of domains or a subdomain of one (what the extension checks per tab)."""
+    hostname = hostname.lower().rstrip(".")
+    return any(hostname == domain or hostname.endswith("." + domain) for domain in domains)
+
+
+class _Client:
+    def __init__(self, writer, peer):
+        self.writer = writer
+        self.peer = peer
+        self.name = "?"
+
+
+class BrowserBridge:
+    """
+    Runs the WebSocket server on its own thread and event loop. push_blocked()
+    can be called from any thread and returns at once with the number of
+    connected extensions it was sent to (0 means the caller should fall
+    back to something else).
+    """
+
+    def __init__(self, host=BROWSER_BRIDGE_HOST, port=BROWSER_BRIDGE_PORT, idle_timeout=BRIDGE_IDLE_TIMEOUT_S):
+        self.address = (host, port) # Updated with the bound port after start()
+        self.idle_timeout = idle_timeout
+        self.stats = {"pushes": 0, "acks": 0, "tabs": 0, "rejected": 0, "idle_drops": 0}
+        self.ack_latencies_ms = []  # push -> ack round trips, most recent last
+        self._clients = set()
+        self._clients_lock = threading.Lock()
+        self._pending = {}          # message id -> monotonic send time
+        self._ids = itertools.count(1)
+        self._loop = None
+        self._server = None
+        self._thread = None
+
+    @property
+    def client_count(self):
+        with self._clients_lock:
+            return len(self._clients)
+
+    # --- Server lifecycle ---
+    def start(self, timeout=5.0):
+        """Binds the listen socket on a background thread. Raises OSError if it cannot (port in use)."""
+        if self._thread is not None:
+            return
+        started = threading.Event()
+        startup_error = []
+
+        def run():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            self._loop = loop
+            try:
+                self._server = loop.run_until_complete(asyncio.start_server(self._serve_client, *self.address))
+            except Exception as e:
+                startup_error.append(e)
+                started.set()
+                loop.close()
+                return
+            self.address = self._server.sockets[0].getsockname()[:2]
+            started.set()
+            try:
+                loop.run_forever()
+            finally:
+                self._server.close()
+                for client in list(self._clients):
+                    client.writer.close()
+                tasks = asyncio.all_tasks(loop) # Client handlers: the closed transports end their reads
+                if tasks:
+                    loop.run_until_complete(asyncio.wait(tasks, timeout=1.0))
+                loop.close()
+
+        self._thread = threading.Thread(target=run, name="BrowserBridge", daemon=True)
+        self._thread.start()
+        if not started.wait(timeout):
+            raise OSError(f"Browser bridge did not start within {timeout} seconds")
+        if startup_error:
+            self._thread = None
+            self._loop = None
+            raise startup_error[0]
+        print(f"Browser bridge listening on ws://{self.address[0]}:{self.address[1]}")
+
+    def stop(self, timeout=5.0):
+        if self._thread is None:
+            return
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+        self._thread = None
+        self._loop = None
+
+    # --- Pushing ---
+    def push_blocked(self, domains, action="reload"):
+        """Asks every connected extension to reload/close the tabs on domains; returns how many were asked."""
+        if action not in TAB_ACTIONS:
+            raise ValueError(f"unknown tab action {action!r}")
+        count = self.client_count
+        if not count or not domains or self._loop is None:
+            return 0
+        message_id = next(self._ids)
+        payload = json.dumps({"type": "block", "id": message_id, "domains": sorted(set(domains)), "action": action})
+        self._loop.call_soon_threadsafe(self._send_all, message_id, encode_frame(payload.encode('utf-8')))
+        return count
+
+    def _send_all(self, message_id, frame):
+        self._pending[message_id] = time.monotonic()
+        self.stats["pushes"] += 1
+        for client in list(self._clients):
+            client.writer.write(frame)
+
+    # --- Connections (event loop thread) ---
+    async def _handshake(self, reader, writer):
+        """Reads the HTTP upgrade request and answers it; returns False (after a 403/400) to refuse."""
+        request = await reader.readuntil(b"\r\n\r\n")
+        lines = request.decode('latin-1').split("\r\n")
+        headers = {}
+        for line in lines[1:]:
+            name, sep, value = line.partition(":")
+            if sep:
+                headers[name.strip().lower()] = value.strip()
+        origin = headers.get("origin", "")
+        key = headers.get("sec-websocket-key")
+        if not lines[0].startswith("GET ") or headers.get("upgrade", "").lower() != "websocket" or not key:
+            writer.write(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\n\r\n")
+            return False
+        if origin and not origin.startswith(EXTENSION_ORIGIN_PREFIXES):
+            writer.write(b"HTTP/1.1 403 Forbidden\r\nContent-Length: 0\r\n\r\n")
+            return False
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {websocket_accept_key(key)}\r\n\r\n").encode('ascii'))
+        return True
+
+    async def _serve_client(self, reader, writer):
+        peer = writer.get_extra_info('peername')
+        client = None
+        try:
+            if not peer or peer[0] not in ("127.0.0.1", "::1") or not await self._handshake(reader, writer):
+                self.stats["rejected"] += 1
+                return
+            client = _Client(writer, peer)
+            with self._clients_lock:
+                self._clients.add(client)
+            message = b""
+            while True:
+                try:
+                    fin, opcode, payload = await asyncio.wait_for(read_frame(reader), self.idle_timeout)
+                except asyncio.TimeoutError:
+                    self.stats["idle_drops"] += 1
+                    break
+                if opcode == OPCODE_CLOSE:
+                    writer.write(encode_frame(payload[:2], OPCODE_CLOSE))
+                    break
+                if opcode == OPCODE_PING:
+                    writer.write(encode_frame(payload, OPCODE_PONG))
+                    continue
+                if opcode not in (OPCODE_TEXT, OPCODE_CONTINUATION):
+                    continue
+                message += payload
+                if len(message) > MAX_MESSAGE_BYTES:
+                    break
+                if fin:
+                    self._handle_message(client, message)
+                    message = b""
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError, ValueError):
+            pass
+        finally:
+            if client is not None:
+                with self._clients_lock:
+                    self._clients.discard(client)
+                print(f"Browser bridge: {client.name} disconnected.")
+            writer.close()
+
+    def _handle_message(self, client, data):
+        try:
+            message = json.loads(data)
+        except ValueError:
+            return
+        if message.get("type") == "hello":
+            client.name = str(message.get("client", "extension"))
+            print(f"Browser bridge: {client.name} connected (protocol {message.get('version')}).")
+        elif message.get("type") == "ack":
+            sent = self._pending.get(message.get("id"))
+            self.stats["acks"] += 1
+            self.stats["tabs"] += int(message.get("tabs", 0))
+            if sent is not None:
+                latency_ms = (time.monotonic() - sent) * 1000
+                self.ack_latencies_ms = self.ack_latencies_ms[-99:] + [latency_ms]
+                print(f"Browser bridge: {client.name} handled {message.get('tabs', 0)} tab(s) in {latency_ms:.1f} ms.")
+            if len(self._pending) > 1000:
+                for stale in sorted(self._pending)[:-100]:
+                    del self._pending[stale]
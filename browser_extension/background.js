@@ -0,0 +1,77 @@
+// Companion extension for PomodoroBlocker (see browser_bridge.py).
+// Keeps a WebSocket open to the app; on a "block" message it reloads or
+// closes only the tabs whose host is a blocked domain or a subdomain of one,
+// then acknowledges with the number of tabs it touched.
+//
+// MV3 stops a service worker after ~30 s without events or WebSocket
+// messages, so a ping is sent every KEEPALIVE_MS while connected, and an
+// alarm restarts the worker (and reconnects) if it was stopped anyway.
+
+const BRIDGE_URL = "ws://127.0.0.1:47823";
+const PROTOCOL_VERSION = 1;
+const RECONNECT_MIN_MS = 1000;
+const RECONNECT_MAX_MS = 30000;
+const KEEPALIVE_MS = 20000;
+const RECONNECT_ALARM = "pomodoro-bridge-reconnect";
+
+let socket = null;
+let reconnectDelay = RECONNECT_MIN_MS;
+let keepalive = null;
+
+function hostMatches(hostname, domains) {
+    hostname = hostname.toLowerCase().replace(/\.$/, "");
+    return domains.some((domain) => hostname === domain || hostname.endsWith("." + domain));
+}
+
+async function handleBlock(message) {
+    const tabs = await chrome.tabs.query({});
+    const targets = tabs.filter((tab) => {
+        try {
+            return tab.url && hostMatches(new URL(tab.url).hostname, message.domains);
+        } catch (e) {
+            return false;
+        }
+    });
+    await Promise.all(targets.map((tab) => message.action === "close"
+        ? chrome.tabs.remove(tab.id)
+        : chrome.tabs.reload(tab.id, { bypassCache: true })));
+    socket.send(JSON.stringify({ type: "ack", id: message.id, tabs: targets.length }));
+}
+
+function connect() {
+    if (socket && (socket.readyState === WebSocket.CONNECTING || socket.readyState === WebSocket.OPEN)) {
+        return;
+    }
+    const ws = new WebSocket(BRIDGE_URL);
+    socket = ws;
+    ws.onopen = () => {
+        reconnectDelay = RECONNECT_MIN_MS;
+        ws.send(JSON.stringify({ type: "hello", client: navigator.userAgent, version: PROTOCOL_VERSION }));
+        clearInterval(keepalive);
+        keepalive = setInterval(() => ws.send(JSON.stringify({ type: "ping" })), KEEPALIVE_MS);
+    };
+    ws.onmessage = (event) => {
+        const message = JSON.parse(event.data);
+        if (message.type === "block") {
+            handleBlock(message).catch((e) => console.error("Pomodoro bridge:", e));
+        }
+    };
+    ws.onclose = () => {
+        clearInterval(keepalive);
+        keepalive = null;
+        // The app is not running (or restarted): retry with backoff.
+        setTimeout(connect, reconnectDelay);
+        reconnectDelay = Math.min(reconnectDelay * 2, RECONNECT_MAX_MS);
+    };
+}
+
+// Timers die with the worker; the alarm and startup events bring it back.
+chrome.alarms.create(RECONNECT_ALARM, { periodInMinutes: 0.5 });
+chrome.alarms.onAlarm.addListener((alarm) => {
+    if (alarm.name === RECONNECT_ALARM) {
+        connect();
+    }
+});
+chrome.runtime.onStartup.addListener(connect);
+
+connect();
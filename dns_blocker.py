@@ -0,0 +1,307 @@
+"""
+Local DNS stub resolver: an alternative blocking backend to the hosts file.
+
+A small asyncio DNS forwarder listens on a loopback UDP port. Queries for a
+blocked name, or for any subdomain of one (m.reddit.com, old.reddit.com,
+...), are answered directly with REDIRECT_IP. Everything else is relayed
+unchanged to an upstream resolver. Blocking and unblocking only edit an
+in-memory DomainMatcher: no file is written and no resolver cache has to
+notice.
+
+Point the system resolver at the listen address (e.g. `nameserver
+127.0.0.1` in /etc/resolv.conf, or DNS=127.0.0.1 for systemd-resolved) to
+use it. Port 53 needs root, as the hosts backend does.
+"""
+import asyncio
+import secrets
+import socket
+import struct
+import threading
+
+from domain_matcher import DomainMatcher
+from hosts_engine import REDIRECT_IP
+
+DNS_LISTEN_HOST = "127.0.0.1"
+DNS_LISTEN_PORT = 53
+DNS_UPSTREAM = ("1.1.1.1", 53)
+DNS_UPSTREAM_TIMEOUT = 2.0
+DNS_BLOCKED_TTL = 5  # Seconds; kept short so an unblock takes effect almost at once
+
+QTYPE_A = 1
+QTYPE_ANY = 255
+QCLASS_IN = 1
+RCODE_SERVFAIL = 2
+_HEADER = struct.Struct("!HHHHHH")
+
+
+def parse_question(packet):
+    """Returns (qname, qtype, question_end) of a standard query, or None if it is not one we handle."""
+    if len(packet) < _HEADER.size:
+        return None
+    _, flags, qdcount, _, _, _ = _HEADER.unpack_from(packet)
+    if flags & 0x8000 or (flags >> 11) & 0xF or qdcount != 1: # Responses, non-QUERY opcodes, multi-question
+        return None
+    labels = []
+    pos = _HEADER.size
+    while True:
+        if pos >= len(packet):
+            return None
+        length = packet[pos]
+        pos += 1
+        if length == 0:
+            break
+        if length & 0xC0: # Compression pointers never appear in a question we can answer
+            return None
+        labels.append(packet[pos:pos + length])
+        pos += length
+    if pos + 4 > len(packet):
+        return None
+    qtype, qclass = struct.unpack_from("!HH", packet, pos)
+    if qclass != QCLASS_IN:
+        return None
+    qname = b".".join(labels).decode('ascii', errors='replace').lower()
+    return qname, qtype, pos + 4
+
+
+def question_section_end(packet):
+    """End offset of the question section of any packet (every QDCOUNT entry), or None if it is malformed."""
+    if len(packet) < _HEADER.size:
+        return None
+    pos = _HEADER.size
+    for _ in range(struct.unpack_from("!H", packet, 4)[0]):
+        while True:
+            if pos >= len(packet):
+                return None
+            length = packet[pos]
+            if length & 0xC0 == 0xC0: # A compression pointer ends the name
+                pos += 2
+                break
+            pos += 1 + length
+            if length == 0:
+                break
+        pos += 4
+    return pos if pos <= len(packet) else None
+
+
+def build_blocked_response(query, question_end, qtype, redirect_ip=REDIRECT_IP, ttl=DNS_BLOCKED_TTL):
+    """
+    Answers the query locally: an A record with redirect_ip for A/ANY, and an
+    empty NOERROR answer for every other type (AAAA, HTTPS, ...) so clients
+    fall back to the A record instead of an upstream address.
+    """
+    query_id, query_flags = struct.unpack_from("!HH", query)
+    flags = 0x8000 | (query_flags & 0x0100) | 0x0080 # QR, copy RD, RA
+    answer = b""
+    if qtype in (QTYPE_A, QTYPE_ANY):
+        answer = struct.pack("!HHHIH", 0xC00C, QTYPE_A, QCLASS_IN, ttl, 4) + socket.inet_aton(redirect_ip)
+    header = _HEADER.pack(query_id, flags, 1, 1 if answer else 0, 0, 0)
+    return header + query[_HEADER.size:question_end] + answer
+
+
+def build_error_response(query, question_end, rcode=RCODE_SERVFAIL):
+    query_id, query_flags = struct.unpack_from("!HH", query)
+    flags = 0x8000 | (query_flags & 0x0100) | 0x0080 | rcode
+    return _HEADER.pack(query_id, flags, 1, 0, 0, 0) + query[_HEADER.size:question_end]
+
+
+def _base_domain(domain):
+    """Block list entries cover all their subdomains, so www.example.com is stored as example.com."""
+    domain = domain.strip().lower().rstrip(".")
+    return domain[4:] if domain.startswith("www.") else domain
+
+
+class _ClientProtocol(asyncio.DatagramProtocol):
+    def __init__(self, blocker):
+        self.blocker = blocker
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.blocker._handle_query(data, addr)
+
+
+class _UpstreamProtocol(asyncio.DatagramProtocol):
+    def __init__(self, blocker):
+        self.blocker = blocker
+
+    def datagram_received(self, data, addr):
+        self.blocker._handle_upstream_reply(data)
+
+    def error_received(self, exc):
+        print(f"DNS blocker: upstream error: {exc}")
+
+
+class DnsBlocker:
+    """
+    Runs the stub resolver on its own thread and event loop. apply(),
+    block() and unblock() mirror HostsFileEngine and can be called from any
+    thread; they only edit the in-memory DomainMatcher of blocked domains.
+    """
+
+    def __init__(self, listen_host=DNS_LISTEN_HOST, listen_port=DNS_LISTEN_PORT, upstream=DNS_UPSTREAM,
+                 redirect_ip=REDIRECT_IP, upstream_timeout=DNS_UPSTREAM_TIMEOUT):
+        self.listen_address = (listen_host, listen_port) # Updated with the bound port after start()
+        self.upstream = tuple(upstream)
+        self.redirect_ip = redirect_ip
+        self.upstream_timeout = upstream_timeout
+        self.stats = {"queries": 0, "blocked": 0, "forwarded": 0, "upstream_timeouts": 0, "mismatched_replies": 0}
+        # Not collapsed: a listed subdomain must stay blocked when its parent is unblocked
+        # (matches() checks every parent label anyway).
+        self._blocked = DomainMatcher(collapse=False)
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._client = None
+        self._upstream_transport = None
+        self._pending = {}          # upstream query id -> (client addr, original id, query, question_end, timeout handle)
+
+    # --- Blocking state ---
+    def is_blocked(self, name):
+        """True if name or any of its parent domains is blocked."""
+        with self._lock:
+            return self._blocked.matches(name)
+
+    def blocked_domains(self):
+        with self._lock:
+            return set(self._blocked)
+
+    def apply(self, block_hosts=(), unblock_hosts=()):
+        """
+        Same contract as HostsFileEngine.apply: returns (added, removed) base
+        domains whose answers actually changed. A domain covered by a blocked
+        parent is still stored (so it outlives the parent) but not reported
+        as added; one still covered after being unblocked is not reported as
+        removed.
+        """
+        unblock_set = {_base_domain(host) for host in unblock_hosts}
+        block_set = {_base_domain(host) for host in block_hosts} - unblock_set
+        with self._lock:
+            discarded = [domain for domain in unblock_set if self._blocked.discard(domain)]
+            added = []
+            for domain in block_set:
+                covered = self._blocked.matches(domain)
+                if self._blocked.add(domain) and not covered:
+                    added.append(domain)
+            removed = [domain for domain in discarded if not self._blocked.matches(domain)]
+        return sorted(added), sorted(removed)
+
+    def block(self, hosts):
+        return self.apply(block_hosts=hosts)[0]
+
+    def unblock(self, hosts):
+        return self.apply(unblock_hosts=hosts)[1]
+
+    # --- Server lifecycle ---
+    def start(self, timeout=5.0):
+        """Binds the listen socket on a background thread. Raises OSError if it cannot (e.g. port 53 without root)."""
+        if self._thread is not None:
+            return
+        started = threading.Event()
+        startup_error = []
+
+        def run():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            self._loop = loop
+            try:
+                loop.run_until_complete(self._open_endpoints())
+            except Exception as e:
+                startup_error.append(e)
+                started.set()
+                loop.close()
+                return
+            started.set()
+            try:
+                loop.run_forever()
+            finally:
+                self._close_endpoints()
+                loop.close()
+
+        self._thread = threading.Thread(target=run, name="DnsBlocker", daemon=True)
+        self._thread.start()
+        if not started.wait(timeout):
+            raise OSError(f"DNS blocker did not start within {timeout} seconds")
+        if startup_error:
+            self._thread = None
+            self._loop = None
+            raise startup_error[0]
+        print(f"DNS blocker listening on {self.listen_address[0]}:{self.listen_address[1]}, upstream {self.upstream[0]}:{self.upstream[1]}")
+
+    async def _open_endpoints(self):
+        loop = asyncio.get_running_loop()
+        client_transport, self._client = await loop.create_datagram_endpoint(
+            lambda: _ClientProtocol(self), local_addr=self.listen_address)
+        self.listen_address = client_transport.get_extra_info('sockname')[:2]
+        self._upstream_transport, _ = await loop.create_datagram_endpoint(
+            lambda: _UpstreamProtocol(self), remote_addr=self.upstream)
+
+    def _close_endpoints(self):
+        for _, _, _, _, handle in self._pending.values():
+            handle.cancel()
+        self._pending.clear()
+        if self._client and self._client.transport:
+            self._client.transport.close()
+        if self._upstream_transport:
+            self._upstream_transport.close()
+
+    def stop(self, timeout=5.0):
+        if self._thread is None:
+            return
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+        self._thread = None
+        self._loop = None
+
+    # --- Query handling (event loop thread) ---
+    def _handle_query(self, data, addr):
+        self.stats["queries"] += 1
+        question = parse_question(data)
+        if question is not None and self.is_blocked(question[0]):
+            self.stats["blocked"] += 1
+            self._client.transport.sendto(build_blocked_response(data, question[2], question[1], self.redirect_ip), addr)
+            return
+        if len(data) < _HEADER.size:
+            return
+        self._forward(data, addr, question[2] if question else None)
+
+    def _forward(self, data, addr, question_end):
+        if question_section_end(data) is None:
+            return # No well-formed question to match the reply against
+        if len(self._pending) >= 0xFFFF: # Every id in flight: drop the oldest query
+            self._pending.pop(next(iter(self._pending)))[4].cancel()
+        # A random unused id per query, so an off-path sender cannot predict which reply we will accept.
+        upstream_id = secrets.randbits(16)
+        while upstream_id in self._pending:
+            upstream_id = secrets.randbits(16)
+        original_id = struct.unpack_from("!H", data)[0]
+        handle = self._loop.call_later(self.upstream_timeout, self._upstream_timed_out, upstream_id)
+        self._pending[upstream_id] = (addr, original_id, data, question_end, handle)
+        self.stats["forwarded"] += 1
+        self._upstream_transport.sendto(struct.pack("!H", upstream_id) + data[2:])
+
+    def _handle_upstream_reply(self, data):
+        if len(data) < _HEADER.size:
+            return
+        upstream_id = struct.unpack_from("!H", data)[0]
+        pending = self._pending.get(upstream_id)
+        if pending is None:
+            return # Late reply to a query that already timed out
+        addr, original_id, query, _, handle = pending
+        question_end = question_section_end(query)
+        if data[4:6] != query[4:6] or data[_HEADER.size:question_end] != query[_HEADER.size:question_end]:
+            self.stats["mismatched_replies"] += 1
+            return # Not an answer to the question we forwarded (spoofed or stray); keep waiting for the real one
+        del self._pending[upstream_id]
+        handle.cancel()
+        self._client.transport.sendto(struct.pack("!H", original_id) + data[2:], addr)
+
+    def _upstream_timed_out(self, upstream_id):
+        pending = self._pending.pop(upstream_id, None)
+        if pending is None:
+            return
+        addr, _, query, question_end, _ = pending
+        self.stats["upstream_timeouts"] += 1
+        if question_end is not None:
+            self._client.transport.sendto(build_error_response(query, question_end), addr)
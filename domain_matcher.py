@@ -0,0 +1,283 @@
+"""
+Compact domain matcher for large block lists.
+
+Domains are stored with their labels reversed and a trailing dot
+("www.example.com" -> "com.example.www."), sorted, in one newline-separated
+bytes blob. In that form a domain's parents are exactly its prefixes that end
+at a label boundary, and they sort right before it. "Is this host or any of
+its parents blocked?" is therefore answered by binary searches over the blob.
+No per-entry Python objects are kept, so a million domains cost about as much
+memory as the text file they came from.
+
+With collapse=True, entries that are already covered by a listed parent are
+dropped (a.example.com is redundant next to example.com). In a collapsed blob
+no entry is a prefix of another, so a single binary search answers a lookup:
+the last entry sorting <= the host either is one of its parents or none is
+listed. That only suits a fixed list: once the parent is removed, the dropped
+child is gone with it. The block list store (edited by the user) and the DNS
+backend (changed at every transition) use collapse=False, which keeps every
+entry and checks each parent with its own search.
+
+Edits go into a small overlay of added/removed keys and are merged into the
+blob when the overlay grows past a fraction of the list.
+
+normalize_domain() holds the one definition of a blockable domain, shared by
+list imports, the profile editor and the hosts helper's request checks. It
+lives here because this module imports nothing heavy.
+"""
+import heapq
+import re
+
+COMPACT_MIN_OVERLAY = 1024
+COMPACT_OVERLAY_FRACTION = 8  # Merge once the overlay holds more than 1/8 of the entries
+
+_IGNORED_HOSTS = {"localhost", "localhost.localdomain", "local", "broadcasthost", "ip6-localhost",
+                  "ip6-loopback", "ip6-localnet", "ip6-mcastprefix", "ip6-allnodes", "ip6-allrouters",
+                  "ip6-allhosts", "0.0.0.0"}
+_DOMAIN_RE = re.compile(r"^(?=.{1,253}$)(?!-)[a-z0-9_-]{1,63}(?:\.(?!-)[a-z0-9_-]{1,63})+$")
+IPV4_RE = re.compile(r"^\d{1,3}(?:\.\d{1,3}){3}$")
+
+
+def normalize_domain(text):
+    """Reduces a URL/host token to a lower-case domain, or None if it is not a blockable domain."""
+    domain = text.strip().lower()
+    if "://" in domain:
+        domain = domain.split("://", 1)[1]
+    domain = domain.split("/", 1)[0].split(":", 1)[0].rstrip(".")
+    if domain.startswith("*."):
+        domain = domain[2:]
+    if domain in _IGNORED_HOSTS or IPV4_RE.match(domain) or not _DOMAIN_RE.match(domain):
+        return None
+    return domain
+
+
+def reversed_key(domain):
+    """'www.Example.com.' -> b'com.example.www.' (the sort/search key)."""
+    labels = domain.strip().lower().rstrip(".").split(".")
+    labels.reverse()
+    return (".".join(labels) + ".").encode('utf-8')
+
+
+def domain_from_key(key):
+    labels = key.decode('utf-8')[:-1].split(".")
+    labels.reverse()
+    return ".".join(labels)
+
+
+def _parent_keys(key):
+    """Keys of the domain and all its parents, shortest first: b'com.', b'com.example.', ..."""
+    end = key.find(b".")
+    while end != -1:
+        yield key[:end + 1]
+        end = key.find(b".", end + 1)
+
+
+def _floor_line(blob, key):
+    """(start, end) of the last line in the sorted blob that is <= key, or None."""
+    lo, hi = 0, len(blob)
+    best = None
+    while lo < hi:
+        mid = (lo + hi) // 2
+        start = blob.rfind(b"\n", lo, mid) + 1 or lo
+        end = blob.find(b"\n", mid)
+        if blob[start:end] <= key:
+            best = (start, end)
+            lo = end + 1
+        else:
+            hi = start
+    return best
+
+
+def _collapse(sorted_keys):
+    """Drops keys that have an earlier kept key as a prefix (i.e. subdomains of a listed domain)."""
+    last = None
+    for key in sorted_keys:
+        if last is not None and key.startswith(last):
+            continue
+        last = key
+        yield key
+
+
+def _dedupe(sorted_keys):
+    last = None
+    for key in sorted_keys:
+        if key != last:
+            last = key
+            yield key
+
+
+def iter_blob_keys(blob):
+    start = 0
+    while start < len(blob):
+        end = blob.find(b"\n", start)
+        yield blob[start:end]
+        start = end + 1
+
+
+def build_blob(sorted_keys, collapse):
+    """Returns (blob, count) for already sorted keys, dropping duplicates (and covered keys when collapsing)."""
+    keys = _collapse(sorted_keys) if collapse else _dedupe(sorted_keys)
+    lines = [key + b"\n" for key in keys]
+    return b"".join(lines), len(lines)
+
+
+def merge_blob(blob, added, removed, collapse):
+    """Returns (blob, count) with the added keys merged in and the removed keys left out."""
+    kept = (key for key in iter_blob_keys(blob) if key not in removed)
+    return build_blob(heapq.merge(kept, sorted(added)), collapse)
+
+
+class DomainMatcher:
+    """
+    Set-like container of domains (add/discard/remove/in/len/iter) with
+    subdomain matching through matches(). `blob` may be any bytes-like,
+    sorted, newline-terminated buffer of reversed keys (e.g. an mmap).
+    """
+
+    def __init__(self, domains=(), collapse=True, blob=None, count=None, auto_compact=True):
+        self.collapse = collapse
+        self.auto_compact = auto_compact  # False: the owner calls compact()/reset() itself (e.g. off the UI thread)
+        self._added = set()     # Keys added since the blob was built
+        self._removed = set()   # Blob keys removed since the blob was built
+        if blob is not None:
+            self._blob = blob
+            self._count = blob.count(b"\n") if count is None else count
+        else:
+            self._blob, self._count = build_blob(sorted({reversed_key(d) for d in domains if d and d.strip()}), collapse)
+
+    # --- Blob queries ---
+    def _blob_contains(self, key):
+        if not self._blob:
+            return False
+        found = _floor_line(self._blob, key)
+        return found is not None and self._blob[found[0]:found[1]] == key and key not in self._removed
+
+    def _blob_keys(self):
+        return iter_blob_keys(self._blob)
+
+    def _blob_keys_under(self, key):
+        """Blob keys that start with key (the domain and its subdomains), in order."""
+        blob = self._blob
+        found = _floor_line(blob, key)
+        start = 0 if found is None else found[0]
+        while start < len(blob):
+            end = blob.find(b"\n", start)
+            line = blob[start:end]
+            if line.startswith(key):
+                yield line
+            elif line > key:
+                return
+            start = end + 1
+
+    # --- Matching ---
+    def covering_key(self, key):
+        """The listed key that blocks key (key itself or a parent), or None."""
+        if self.collapse and self._blob:
+            found = _floor_line(self._blob, key)
+            if found is not None:
+                line = self._blob[found[0]:found[1]]
+                if key.startswith(line) and line not in self._removed:
+                    return line
+            for parent in _parent_keys(key):
+                if parent in self._added:
+                    return parent
+            return None
+        for parent in _parent_keys(key):
+            if parent in self._added or self._blob_contains(parent):
+                return parent
+        return None
+
+    def matches(self, host):
+        """True if host or any of its parent domains is listed."""
+        return self.covering_key(reversed_key(host)) is not None
+
+    def covering(self, host):
+        """The listed domain that blocks host (host itself or a parent), or None."""
+        key = self.covering_key(reversed_key(host))
+        return None if key is None else domain_from_key(key)
+
+    # --- Set protocol ---
+    def __contains__(self, domain):
+        key = reversed_key(domain)
+        return key in self._added or self._blob_contains(key)
+
+    def __len__(self):
+        return self._count - len(self._removed) + len(self._added)
+
+    def __iter__(self):
+        for key in heapq.merge((k for k in self._blob_keys() if k not in self._removed), sorted(self._added)):
+            yield domain_from_key(key)
+
+    def add(self, domain):
+        """Adds domain; returns False if it was already listed (or, when collapsing, covered by a parent)."""
+        key = reversed_key(domain)
+        if self.collapse:
+            if self.covering_key(key) is not None:
+                return False
+            # The new entry makes its listed subdomains redundant.
+            self._removed.update(k for k in self._blob_keys_under(key) if k not in self._removed)
+            self._added.difference_update([k for k in self._added if k.startswith(key)])
+        elif key in self._added or self._blob_contains(key):
+            return False
+        if key in self._removed:
+            self._removed.discard(key)
+        else:
+            self._added.add(key)
+        self._maybe_compact()
+        return True
+
+    def discard(self, domain):
+        """Removes domain if it is listed exactly; returns True if it was."""
+        key = reversed_key(domain)
+        if key in self._added:
+            self._added.discard(key)
+        elif self._blob_contains(key):
+            self._removed.add(key)
+        else:
+            return False
+        self._maybe_compact()
+        return True
+
+    def remove(self, domain):
+        if not self.discard(domain):
+            raise KeyError(domain)
+
+    def clear(self):
+        self._added.clear()
+        self._removed.clear()
+        self._blob = b""
+        self._count = 0
+
+    def update(self, domains):
+        for domain in domains:
+            self.add(domain)
+
+    # --- Maintenance ---
+    def needs_compaction(self):
+        return len(self._added) + len(self._removed) > max(COMPACT_MIN_OVERLAY, self._count // COMPACT_OVERLAY_FRACTION)
+
+    def _maybe_compact(self):
+        if self.auto_compact and self.needs_compaction():
+            self.compact()
+
+    def compact(self):
+        """Merges the overlay into a freshly built blob."""
+        if not self._added and not self._removed:
+            return
+        self.reset(*merge_blob(self._blob, self._added, self._removed, self.collapse))
+
+    def state(self):
+        """(blob, added keys, removed keys): enough to build the compacted blob elsewhere with merge_blob()."""
+        return self._blob, set(self._added), set(self._removed)
+
+    def reset(self, blob, count):
+        """Replaces the blob (e.g. with a freshly written, mmap'd snapshot) and empties the overlay."""
+        self._blob = blob
+        self._count = count
+        self._added = set()
+        self._removed = set()
+
+    def to_blob(self):
+        """The compacted, sorted, newline-separated reversed keys (suitable for writing to disk)."""
+        self.compact()
+        return bytes(self._blob)
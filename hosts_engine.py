@@ -0,0 +1,656 @@
+"""
+Hosts file engine for PomodoroBlocker.
+
+All entries written by the blocker live in one delimited region:
+
+    # BEGIN PomodoroBlocker
+    127.0.0.1	example.com
+    # END PomodoroBlocker
+
+Each entry records who holds it, so several people sharing a machine can
+block the same site independently:
+
+    127.0.0.1	example.com	# owners: alice,bob
+
+Blocking adds the caller's owner name to the entry and unblocking removes
+it; the line itself is only dropped once nobody holds it any more. Lines
+written before owners were recorded are held by LEGACY_OWNER, which any
+owner's unblock releases (the old behaviour).
+
+The region is kept at the end of the hosts file and every line outside it
+is left byte-for-byte as other tools wrote it. Only the region is ever
+rendered; the rest of the file is cached (and re-read only when its
+signature changes).
+
+Writes are atomic by default: the new file is written to a temp file in the
+same directory, fsynced and renamed over the original, so a crash can never
+leave a truncated hosts file behind. The previous versions are kept as
+rotating backups next to it. A rename needs the complete file, so an atomic
+transition writes the whole hosts file and its cost grows with it. With
+atomic=False the engine instead seeks to the region and rewrites only that,
+so a transition costs the size of the block list, not of the hosts file,
+but a crash mid-write can leave the region truncated. Crash safety is the
+default; benchmarks/bench_hosts_write.py compares the two modes.
+"""
+import errno
+import getpass
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+# Network
+HOSTS_FILE_PATH = "/etc/hosts"
+REDIRECT_IP = "127.0.0.1"
+POMODORO_COMMENT = "# Added by PomodoroBlocker"  # Tag used by older versions, one per entry
+REGION_BEGIN_MARKER = "# BEGIN PomodoroBlocker"
+REGION_END_MARKER = "# END PomodoroBlocker"
+HOSTS_BACKUP_SUFFIX = ".pomodoro-bak"
+STAGED_PREFIX = ".pomodoro-"  # Temp files beside the hosts file: .pomodoro-<pid>-<random>.tmp
+HOSTS_BACKUP_COUNT = 3
+OWNERS_TAG = "# owners:"
+LEGACY_OWNER = "*"  # Holder of entries that predate owner tags
+_OWNER_RE = re.compile(r"[^\s,#]+\Z")
+
+
+def default_owner():
+    """The person this process blocks for: the sudo caller if run through sudo, else the login name."""
+    owner = os.environ.get("SUDO_USER")
+    if not owner:
+        try:
+            owner = getpass.getuser()
+        except (KeyError, OSError):
+            owner = f"uid{os.getuid()}" if hasattr(os, "getuid") else "user"
+    return owner
+
+
+def domain_variants(domain):
+    """The hosts entries managed for one block list domain: itself plus its www./bare twin."""
+    domain_lower = domain.lower()
+    domains = {domain_lower}
+    if domain_lower.startswith("www."):
+        domains.add(domain_lower[4:])
+    else:
+        domains.add("www." + domain_lower)
+    return domains
+
+
+def managed_variants(domains):
+    all_managed_variants = set()
+    for domain_base in domains:
+        all_managed_variants.update(domain_variants(domain_base))
+    return all_managed_variants
+
+
+def _rotate_backups(path, backup_count):
+    """Shifts path.pomodoro-bak.N and links the current file in as .1 (falls back to a copy)."""
+    if backup_count <= 0 or not os.path.exists(path):
+        return
+    for i in range(backup_count - 1, 0, -1):
+        older = f"{path}{HOSTS_BACKUP_SUFFIX}.{i}"
+        if os.path.exists(older):
+            os.replace(older, f"{path}{HOSTS_BACKUP_SUFFIX}.{i + 1}")
+    newest = f"{path}{HOSTS_BACKUP_SUFFIX}.1"
+    if os.path.exists(newest):
+        os.remove(newest)
+    try:
+        # A hard link keeps the old inode alive after the rename, so the backup costs no copy.
+        os.link(path, newest)
+    except OSError:
+        shutil.copy2(path, newest)
+
+
+def _fsync_directory(directory):
+    try:
+        dir_fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+
+def atomic_write_bytes(path, data, backup_count=0):
+    """
+    Replaces path with data: temp file in the same directory, fsync, rename.
+    Mode and ownership of an existing file are preserved. If the rename is
+    refused because path is a mount point (e.g. /etc/hosts bind-mounted into a
+    container), the data is written in place and fsynced instead.
+    """
+    tmp_path = stage_bytes(path, data)
+    try:
+        install_staged(path, tmp_path, data, backup_count)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def stage_bytes(path, data):
+    """First half of atomic_write_bytes: writes and fsyncs data to a temp file beside path, with its mode and owner."""
+    path = os.path.realpath(path)  # /etc/hosts is a symlink on macOS
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        st = None
+    fd, tmp_path = tempfile.mkstemp(prefix=f"{STAGED_PREFIX}{os.getpid()}-", suffix=".tmp", dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        if st is not None:
+            os.chmod(tmp_path, st.st_mode & 0o7777)
+            try:
+                os.chown(tmp_path, st.st_uid, st.st_gid)
+            except (PermissionError, AttributeError):
+                pass
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return tmp_path
+
+
+def _pid_alive(pid):
+    if sys.platform == "win32":
+        return True # os.kill(pid, 0) would terminate it there
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError: # EPERM: alive, another user's
+        pass
+    return True
+
+
+def remove_stale_staged(path):
+    """
+    Removes temp files beside path whose writer is gone: a staged image a
+    crashed process never committed or discarded, or a write cut short.
+    Files of live processes (e.g. the helper's staged images) are kept.
+    Returns the removed paths.
+    """
+    directory = os.path.dirname(os.path.realpath(path))
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return []
+    removed = []
+    for name in names:
+        if not (name.startswith(STAGED_PREFIX) and name.endswith(".tmp")):
+            continue
+        pid = name[len(STAGED_PREFIX):].split("-", 1)[0]
+        if pid.isdigit() and _pid_alive(int(pid)):
+            continue
+        try:
+            os.remove(os.path.join(directory, name))
+            removed.append(os.path.join(directory, name))
+        except OSError:
+            pass
+    return removed
+
+
+def install_staged(path, tmp_path, data, backup_count=0):
+    """Second half: rotates the backups and renames tmp_path over path (writing data in place on a mount point)."""
+    path = os.path.realpath(path)
+    _rotate_backups(path, backup_count)
+    try:
+        os.replace(tmp_path, path)
+    except OSError as e:
+        if e.errno not in (errno.EBUSY, errno.EXDEV):
+            raise
+        with open(path, "r+b") as f:
+            f.write(data)
+            f.truncate()
+            f.flush()
+            os.fsync(f.fileno())
+        os.remove(tmp_path)
+    else:
+        _fsync_directory(os.path.dirname(path))
+
+
+def _find_marker_line(data, marker, start=0):
+    """Returns (line_start, line_end) of the first line at/after start that begins with marker, or None."""
+    pos = data.find(marker, start)
+    while pos != -1:
+        if pos == 0 or data[pos - 1:pos] == b"\n":
+            line_end = data.find(b"\n", pos)
+            return pos, (len(data) if line_end == -1 else line_end + 1)
+        pos = data.find(marker, pos + 1)
+    return None
+
+
+class HostsFileEngine:
+    def __init__(self, hosts_path=HOSTS_FILE_PATH, redirect_ip=REDIRECT_IP, comment=POMODORO_COMMENT,
+                 atomic=True, backup_count=HOSTS_BACKUP_COUNT, owner=None):
+        self.hosts_path = hosts_path
+        self.owner = owner or default_owner() # Owner used when apply()/release() are not given one
+        self.atomic = atomic              # False: splice the region in place (faster, not crash-safe)
+        self.backup_count = backup_count
+        self.redirect_ip = redirect_ip
+        self.comment = comment
+        self._comment_bytes = comment.encode('utf-8')
+        self._begin_bytes = REGION_BEGIN_MARKER.encode('utf-8')
+        self._end_bytes = REGION_END_MARKER.encode('utf-8')
+        self._outside = None           # File content outside our region (bytes), legacy entries removed
+        self._region_offset = 0        # Byte offset where our region starts (== len(self._outside) once settled)
+        self._region_hosts = {}        # Host currently listed in the region -> frozenset of owners holding it
+        self._needs_relayout = True    # Region missing, not at the end, or legacy entries still present
+        self._signature = None         # (inode, size, mtime) seen at last parse/write
+
+    # --- Parsing ---
+    def _stat_signature(self):
+        st = os.stat(self.hosts_path)
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def _ensure_loaded(self):
+        """Parses the hosts file unless the cached copy is still current."""
+        signature = self._stat_signature()
+        if self._outside is not None and signature == self._signature:
+            return
+        if self._outside is None: # First read: clear temp files left by a crash
+            for stale in remove_stale_staged(self.hosts_path):
+                print(f"Removed stale staged hosts image {stale}")
+        with open(self.hosts_path, "rb") as f:
+            data = f.read()
+        self._parse(data)
+        self._signature = signature
+
+    def _parse_entries(self, region_bytes):
+        hosts = {}
+        for line in region_bytes.decode('utf-8', errors='replace').splitlines():
+            parts = line.split(None, 2)
+            if len(parts) >= 2 and parts[0] == self.redirect_ip:
+                owners = None
+                if len(parts) == 3 and parts[2].startswith(OWNERS_TAG):
+                    owners = frozenset(o for o in parts[2][len(OWNERS_TAG):].strip().split(",") if o)
+                hosts[parts[1]] = hosts.get(parts[1], frozenset()) | (owners or {LEGACY_OWNER})
+        return hosts
+
+    def _parse(self, data):
+        region_hosts = {}
+        needs_relayout = False
+        begin = _find_marker_line(data, self._begin_bytes)
+        end = _find_marker_line(data, self._end_bytes, begin[1]) if begin else None
+        if begin and end:
+            region_hosts = self._parse_entries(data[begin[1]:end[0]])
+            after = data[end[1]:]
+            needs_relayout = bool(after.strip())
+            outside = data[:begin[0]] + (after if needs_relayout else b"")
+            region_offset = begin[0]
+        else:
+            outside = data
+            region_offset = len(data)
+            needs_relayout = True
+
+        # Entries tagged one by one by older versions are adopted into the region.
+        if self._comment_bytes in outside:
+            kept_lines = []
+            for line in outside.splitlines(keepends=True):
+                if self._comment_bytes in line:
+                    parts = line.decode('utf-8', errors='replace').split(None, 2)
+                    if len(parts) >= 2 and parts[0] == self.redirect_ip:
+                        region_hosts.setdefault(parts[1], frozenset({LEGACY_OWNER}))
+                        continue
+                kept_lines.append(line)
+            outside = b"".join(kept_lines)
+            needs_relayout = True
+
+        self._outside = outside
+        self._region_offset = region_offset
+        self._region_hosts = region_hosts
+        self._needs_relayout = needs_relayout
+
+    def _render_region(self, hosts):
+        lines = [REGION_BEGIN_MARKER + "\n"]
+        lines.extend(f"{self.redirect_ip}\t{host}\t{OWNERS_TAG} {','.join(sorted(owners))}\n"
+                     for host, owners in sorted(hosts.items()))
+        lines.append(REGION_END_MARKER + "\n")
+        return "".join(lines).encode('utf-8')
+
+    # --- Queries ---
+    def managed_hosts(self):
+        """Returns the set of hosts currently redirected by our region."""
+        self._ensure_loaded()
+        return set(self._region_hosts)
+
+    def owners(self, host):
+        """The owners holding host blocked (empty if it is not)."""
+        self._ensure_loaded()
+        return set(self._region_hosts.get(host, ()))
+
+    def held_by(self, owner=None):
+        """The hosts owner (default: self.owner) holds blocked."""
+        self._ensure_loaded()
+        owner = owner or self.owner
+        return {host for host, owners in self._region_hosts.items() if owner in owners}
+
+    # --- Writing ---
+    def _splice_region(self, region_bytes):
+        """Overwrites the file from the start of our region; everything before it stays on disk untouched."""
+        with open(self.hosts_path, "r+b") as f:
+            f.seek(self._region_offset)
+            f.write(region_bytes)
+            f.truncate()
+
+    def _rewrite_all(self, region_bytes):
+        """Writes the complete file atomically: everything outside our region, then the region at the end."""
+        outside = self._outside
+        if outside and not outside.endswith(b"\n"):
+            outside += b"\n"
+        atomic_write_bytes(self.hosts_path, outside + region_bytes, self.backup_count)
+        self._outside = outside
+        self._region_offset = len(outside)
+        self._needs_relayout = False
+
+    def apply(self, block_hosts=(), unblock_hosts=(), owner=None):
+        """
+        Takes owner's hold (default: self.owner) on every host in block_hosts
+        and releases it on every host in unblock_hosts. A host is redirected
+        while anybody holds it. Only our region is rewritten, and only the
+        touched entries are looked at.
+        Returns (added_hosts, removed_hosts): the hosts whose redirect actually
+        started or ended. Raises OSError on I/O failure.
+        """
+        return self._commit(self._changes(block_hosts, unblock_hosts, owner))
+
+    def _changes(self, block_hosts, unblock_hosts, owner):
+        owner = owner or self.owner
+        if not _OWNER_RE.match(owner):
+            raise ValueError(f"invalid owner name {owner!r}")
+        self._ensure_loaded()
+        unblock_set = set(unblock_hosts)
+        changes = {}                   # host -> new owners (empty: drop the line)
+        for host in unblock_set:
+            owners = self._region_hosts.get(host)
+            if owners is not None and (owner in owners or LEGACY_OWNER in owners):
+                changes[host] = owners - {owner, LEGACY_OWNER}
+        for host in block_hosts:
+            owners = self._region_hosts.get(host, frozenset())
+            if host not in unblock_set and owner not in owners:
+                changes[host] = owners | {owner}
+        return changes
+
+    def release(self, owner=None):
+        """Releases every hold of owner (default: self.owner), e.g. ones left behind by a crash. Returns removed_hosts."""
+        owner = owner or self.owner
+        self._ensure_loaded()
+        changes = {host: owners - {owner} for host, owners in self._region_hosts.items() if owner in owners}
+        return self._commit(changes)[1]
+
+    def _plan(self, changes):
+        """(new region hosts, added, removed) once changes are applied to the cached region."""
+        to_add = sorted(host for host, owners in changes.items() if owners and host not in self._region_hosts)
+        to_remove = sorted(host for host, owners in changes.items() if not owners)
+        new_hosts = dict(self._region_hosts)
+        for host, owners in changes.items():
+            if owners:
+                new_hosts[host] = owners
+            else:
+                del new_hosts[host]
+        return new_hosts, to_add, to_remove
+
+    def _commit(self, changes):
+        if not changes:
+            return [], []
+        new_hosts, to_add, to_remove = self._plan(changes)
+        region_bytes = self._render_region(new_hosts)
+        if self._needs_relayout or self.atomic:
+            # Atomic mode always writes the full image (cached prefix + region): a rename
+            # cannot replace part of a file. Otherwise this is the one-time move of the
+            # region to the end of the file.
+            self._rewrite_all(region_bytes)
+        else:
+            try:
+                self._splice_region(region_bytes)
+            except PermissionError:
+                raise
+            except OSError:
+                # A partial splice may have left the file inconsistent; fall back to a full rewrite.
+                self._rewrite_all(region_bytes)
+
+        self._region_hosts = new_hosts
+        self._signature = self._stat_signature()
+        return to_add, to_remove
+
+    def block(self, hosts):
+        return self.apply(block_hosts=hosts)[0]
+
+    def unblock(self, hosts):
+        return self.apply(unblock_hosts=hosts)[1]
+
+    # --- Two-phase commits ---
+    def prepare(self, block_hosts=(), unblock_hosts=(), owner=None):
+        """
+        Phase one of apply(): renders the whole file as apply() would leave it,
+        writes and fsyncs it to a temp file beside the hosts file and reads it
+        back to validate it. Returns a StagedCommit for commit()/discard(), or
+        None if nothing would change. Raises OSError (or ValueError if the
+        image does not validate).
+        """
+        changes = self._changes(block_hosts, unblock_hosts, owner)
+        if not changes:
+            return None
+        new_hosts, to_add, to_remove = self._plan(changes)
+        outside = self._outside
+        if outside and not outside.endswith(b"\n"):
+            outside += b"\n"
+        data = outside + self._render_region(new_hosts)
+        tmp_path = stage_bytes(self.hosts_path, data)
+        staged = StagedCommit(tmp_path, data, outside, new_hosts, to_add, to_remove, self._signature)
+        try:
+            with open(tmp_path, "rb") as f:
+                check = HostsFileEngine(tmp_path, self.redirect_ip, self.comment, owner=self.owner)
+                check._parse(f.read())
+            if check._region_hosts != new_hosts or check._outside != outside or check._needs_relayout:
+                raise ValueError("staged hosts image does not read back as rendered")
+        except BaseException:
+            self.discard(staged)
+            raise
+        return staged
+
+    def commit(self, staged):
+        """
+        Phase two: a single rename of the staged image over the hosts file.
+        Returns (added_hosts, removed_hosts), or None (staged image discarded)
+        if the hosts file changed since prepare() and the image is stale.
+        """
+        if self._stat_signature() != staged.signature:
+            self.discard(staged)
+            return None
+        try:
+            install_staged(self.hosts_path, staged.tmp_path, staged.data, self.backup_count)
+        except BaseException:
+            self.discard(staged)
+            raise
+        self._outside = staged.outside
+        self._region_offset = len(staged.outside)
+        self._needs_relayout = False
+        self._region_hosts = staged.new_hosts
+        self._signature = self._stat_signature()
+        return staged.added, staged.removed
+
+    def discard(self, staged):
+        try:
+            os.remove(staged.tmp_path)
+        except FileNotFoundError:
+            pass
+
+
+class StagedCommit:
+    """A validated hosts image waiting in a temp file for HostsFileEngine.commit()."""
+
+    def __init__(self, tmp_path, data, outside, new_hosts, added, removed, signature):
+        self.tmp_path = tmp_path
+        self.data = data
+        self.outside = outside
+        self.new_hosts = new_hosts
+        self.added = added
+        self.removed = removed
+        self.signature = signature # (inode, size, mtime) of the hosts file it was rendered from
+
+
+class HostsWorker:
+    """
+    Runs every hosts file update on one background thread.
+
+    Requests are merged while the worker is busy: for each host only the most
+    recent block/unblock request survives, so a burst of transitions costs a
+    single write. Completion callbacks receive (added, removed, error) limited
+    to the hosts of their own request (a block superseded by a later unblock
+    reports nothing added) and are handed to `dispatch` (e.g. a root.after wrapper) so they run wherever the
+    caller needs them to.
+
+    stage() prepares the next expected request ahead of time (two-phase, see
+    HostsFileEngine.prepare); when that exact request is submitted, the
+    worker only has to rename the staged file into place.
+    """
+
+    def __init__(self, engine, dispatch=None, label="Hosts file"):
+        self.engine = engine
+        self.dispatch = dispatch or (lambda fn: fn())
+        self.label = label      # What the latency log calls the engine's target (e.g. "DNS blocker")
+        self._pending = {}      # host -> True (block) / False (unblock)
+        self._release = False   # Release all of the engine owner's holds before applying _pending
+        self._deadline = None   # Earliest monotonic deadline of the pending requests
+        self._stage_request = None # (block, unblock) frozensets to prepare once the queue is empty
+        self._staged = None     # (request, StagedCommit) ready for the matching submit()
+        self._callbacks = []    # (callback, block frozenset, unblock frozenset, release)
+        self._busy = False
+        self._stopping = False
+        self._cond = threading.Condition()
+        self.commit_latencies_ms = [] # deadline -> file written, most recent last
+        self._thread = threading.Thread(target=self._run, name="HostsWorker", daemon=True)
+        self._thread.start()
+
+    def submit(self, block_hosts=(), unblock_hosts=(), callback=None, release=False, deadline=None):
+        """
+        release=True first drops every hold the engine's owner has (it supersedes
+        earlier pending requests). deadline is the time.monotonic() at which the
+        change was due (e.g. a session boundary); the delay to the write is logged.
+        """
+        block_hosts, unblock_hosts = frozenset(block_hosts), frozenset(unblock_hosts)
+        with self._cond:
+            if release:
+                self._pending = {}
+                self._release = True
+            for host in unblock_hosts:
+                self._pending[host] = False
+            for host in block_hosts:
+                self._pending[host] = True
+            if deadline is not None:
+                self._deadline = deadline if self._deadline is None else min(self._deadline, deadline)
+            if callback:
+                self._callbacks.append((callback, block_hosts, unblock_hosts, release))
+            self._cond.notify()
+
+    def stage(self, block_hosts=(), unblock_hosts=()):
+        """Prepares this request in the background, once everything submitted so far is written. Replaces any earlier one."""
+        block = frozenset(block_hosts)
+        with self._cond:
+            self._stage_request = (block, frozenset(unblock_hosts) - block)
+            self._cond.notify()
+
+    def flush(self, timeout=None):
+        """Blocks until every request submitted (or staged) so far has been written (or prepared). Returns False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending and not self._release and not self._stage_request
+                                       and not self._busy, timeout)
+
+    def stop(self, timeout=None):
+        """Writes whatever is still pending, then ends the worker thread."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        self._thread.join(timeout)
+
+    def _take_staged(self, request):
+        """The staged commit if it was prepared for exactly this request; any other staged image is discarded."""
+        staged, self._staged = self._staged, None
+        if staged is None:
+            return None
+        if staged[0] == request:
+            return staged[1]
+        self.engine.discard(staged[1])
+        return None
+
+    def _prepare(self, request):
+        staged, self._staged = self._staged, None
+        if staged is not None:
+            self.engine.discard(staged[1])
+        try:
+            prepared = self.engine.prepare(block_hosts=request[0], unblock_hosts=request[1])
+        except (OSError, ValueError) as e:
+            print(f"HostsWorker: could not pre-stage the next transition ({e}); it will be written at the boundary.")
+            return
+        if prepared is not None:
+            self._staged = (request, prepared)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._release or self._stage_request or self._stopping)
+                if not self._pending and not self._release:
+                    if self._stopping:
+                        if self._staged is not None:
+                            self.engine.discard(self._staged[1])
+                            self._staged = None
+                        return
+                    request, self._stage_request = self._stage_request, None
+                    self._busy = True
+                    pending = None
+                else:
+                    pending, self._pending = self._pending, {}
+                    release, self._release = self._release, False
+                    deadline, self._deadline = self._deadline, None
+                    callbacks, self._callbacks = self._callbacks, []
+                    self._busy = True
+
+            if pending is None:
+                if hasattr(self.engine, "prepare"):
+                    self._prepare(request)
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+                continue
+
+            added, removed, error = [], [], None
+            block_hosts = frozenset(host for host, block in pending.items() if block)
+            unblock_hosts = frozenset(host for host, block in pending.items() if not block)
+            result = None
+            try:
+                released = self.engine.release() if release else []
+                staged = self._take_staged((block_hosts, unblock_hosts)) if hasattr(self.engine, "prepare") and not release else None
+                if staged is not None:
+                    result = self.engine.commit(staged) # None: the file changed since it was staged
+                pre_staged = result is not None
+                if result is None:
+                    result = self.engine.apply(block_hosts=block_hosts, unblock_hosts=unblock_hosts)
+                added, removed = result
+                removed = sorted((set(released) - set(added)) | set(removed))
+            except Exception as e:
+                error = e
+
+            if deadline is not None and error is None and (added or removed):
+                latency_ms = (time.monotonic() - deadline) * 1000
+                self.commit_latencies_ms = self.commit_latencies_ms[-99:] + [latency_ms]
+                print(f"{self.label} committed {latency_ms:.1f} ms after the session boundary "
+                      f"({'pre-staged image renamed into place' if pre_staged else 'rendered at the boundary'}).")
+
+            for callback, own_block, own_unblock, own_release in callbacks:
+                own_added = [host for host in added if host in own_block]
+                own_removed = removed if own_release else [host for host in removed if host in own_unblock]
+                try:
+                    self.dispatch(lambda cb=callback, a=own_added, r=own_removed: cb(a, r, error))
+                except Exception as e:  # e.g. the Tk root is already gone
+                    print(f"HostsWorker: could not deliver completion callback: {e}")
+
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
@@ -0,0 +1,495 @@
+"""
+Privileged hosts helper: a small root daemon that owns the hosts file, so
+the GUI (Tk, Pillow, pyautogui) can run as the logged-in user.
+
+    sudo python3 hosts_helper.py [--socket /var/run/pomodoro-blocker.sock] [--hosts-file /etc/hosts]
+                                 [--allow-group GROUP]
+
+Run it once at boot (a systemd unit or launchd daemon running the command
+above). It stays resident and serves every user session on the machine
+over a Unix socket; each block/unblock transition costs one socket round
+trip instead of starting a privileged process.
+
+Protocol: one JSON object per line each way. A request carries a batch of
+commands that is applied as a single hosts file write:
+
+    {"id": 1, "commands": [{"op": "block", "hosts": [...]}, {"op": "unblock", "hosts": [...]},
+                           {"op": "release"}, {"op": "flush"}, {"op": "status", "hosts": false}]}
+    {"id": 2, "commands": [{"op": "prepare", "block": [...], "unblock": [...]}]}   -> [{"token": 7}]
+    {"id": 3, "commands": [{"op": "commit", "token": 7}]}   -> [{"committed": true, "added": [...], "removed": [...]}]
+    {"id": 1, "ok": true, "results": [{"added": [...]}, {"removed": [...]}, {"removed": [...]},
+                                      {"flushed": [...]}, {...}]}
+    {"id": 1, "ok": false, "error": "..."}
+
+"prepare" renders and validates a hosts image ahead of time (see
+HostsFileEngine.prepare) and "commit" renames it into place, so a session
+boundary costs one rename; each user has at most one staged image, and it
+is discarded when that user's last connection closes.
+
+Blocks are held per user: the caller's login name is the owner recorded
+on each entry (see hosts_engine), so one person's break or app start only
+releases that person's holds, and "release" drops all of them at once
+(e.g. ones left behind by a crash).
+
+The caller is identified with SO_PEERCRED (LOCAL_PEERCRED on macOS);
+connections whose credentials cannot be read are refused, and
+--allow-group limits the service to root and members of that group. Hosts
+must be plain domain names, so a client can only add REDIRECT_IP entries,
+never arbitrary hosts file lines.
+
+HelperClient is the unprivileged side. Its apply() has the same contract as
+HostsFileEngine.apply, so a HostsWorker can drive it unchanged.
+"""
+import argparse
+import itertools
+import json
+import os
+import signal
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+
+from domain_matcher import normalize_domain
+from hosts_engine import HostsFileEngine, HOSTS_FILE_PATH, remove_stale_staged
+
+HELPER_SOCKET_PATH = "/var/run/pomodoro-blocker.sock"
+HELPER_TIMEOUT_S = 10.0
+HELPER_MAX_REQUEST_BYTES = 32 * 1024 * 1024
+HELPER_OPS = ("block", "unblock", "release", "prepare", "commit", "discard", "flush", "status")
+
+
+class HelperError(OSError):
+    """The helper is unreachable or refused a request."""
+
+
+def peer_credentials(sock):
+    """(pid, uid, gid) of the process at the other end of a Unix socket; None where the OS cannot tell."""
+    if hasattr(socket, "SO_PEERCRED"): # Linux
+        return struct.unpack("3i", sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i")))
+    if sys.platform == "darwin":
+        # SOL_LOCAL (0): LOCAL_PEERCRED (1) returns struct xucred {version, uid, ngroups, groups[16]}, LOCAL_PEERPID (2)
+        xucred = struct.Struct("IIh16I")
+        _, uid, _, gid, *_ = xucred.unpack(sock.getsockopt(0, 1, xucred.size))
+        pid = struct.unpack("i", sock.getsockopt(0, 2, 4))[0]
+        return pid, uid, gid
+    return None
+
+
+def owner_name(uid):
+    """Login name for uid: the owner recorded on the entries that uid's sessions hold."""
+    import pwd
+    try:
+        return pwd.getpwuid(uid).pw_name
+    except KeyError:
+        return f"uid{uid}"
+
+
+def _user_in_group(uid, gid, group):
+    import grp
+    import pwd
+    try:
+        entry = grp.getgrnam(group)
+        name = pwd.getpwuid(uid).pw_name
+    except KeyError:
+        return False
+    return gid == entry.gr_gid or name in entry.gr_mem
+
+
+# --- Daemon ---
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        helper = self.server.helper
+        credentials = peer_credentials(self.connection)
+        if credentials is None or not helper.authorized(*credentials[1:]):
+            helper.log(f"Refused connection from {credentials or 'unknown peer'}.")
+            self._send({"id": None, "ok": False, "error": "not authorized"})
+            return
+        pid, uid, _ = credentials
+        owner = helper.client_connected(uid)
+        try:
+            while True:
+                line = self.rfile.readline(HELPER_MAX_REQUEST_BYTES + 1)
+                if not line:
+                    return
+                if len(line) > HELPER_MAX_REQUEST_BYTES:
+                    self._send({"id": None, "ok": False, "error": "request too large"})
+                    return
+                try:
+                    request = json.loads(line)
+                    response = {"id": request.get("id"), "ok": True,
+                                "results": helper.execute(request.get("commands", []), uid, pid)}
+                except (ValueError, TypeError, AttributeError) as e:
+                    response = {"id": None, "ok": False, "error": f"bad request: {e}"}
+                except OSError as e:
+                    response = {"id": request.get("id"), "ok": False, "error": str(e)}
+                self._send(response)
+        finally:
+            helper.client_disconnected(owner)
+
+    def _send(self, message):
+        self.wfile.write(json.dumps(message).encode('utf-8') + b"\n")
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class HostsHelper:
+    """The daemon's state: one HostsFileEngine, changed by one request at a time."""
+
+    def __init__(self, hosts_path=HOSTS_FILE_PATH, allow_group=None, flushers=None):
+        self.engine = HostsFileEngine(hosts_path)
+        self.allow_group = allow_group
+        self._flushers = flushers   # None: detect the resolver caches on first flush
+        self._lock = threading.Lock()    # Serializes hosts file changes
+        self._flush_lock = threading.Lock() # Only guards the lazy flusher detection
+        self.started = time.time()
+        self.requests = 0
+        self._staged = {}           # owner -> (token, StagedCommit)
+        self._connections = {}      # owner -> open connections; the staged image goes with the last one
+        self._tokens = itertools.count(1)
+
+    def log(self, message):
+        print(f"[{time.strftime('%H:%M:%S')}] {message}", flush=True)
+
+    def client_connected(self, uid):
+        owner = owner_name(uid)
+        with self._lock:
+            self._connections[owner] = self._connections.get(owner, 0) + 1
+        return owner
+
+    def client_disconnected(self, owner):
+        with self._lock:
+            self._connections[owner] -= 1
+            if self._connections[owner]:
+                return
+            del self._connections[owner]
+            if owner in self._staged:
+                self._discard(owner)
+                self.log(f"{owner}: last connection closed; discarded the staged hosts image.")
+
+    def authorized(self, uid, gid):
+        return uid == 0 or self.allow_group is None or _user_in_group(uid, gid, self.allow_group)
+
+    def execute(self, commands, uid, pid):
+        """Runs one batch for uid's owner; all block/unblock commands in it become a single hosts file write."""
+        if not isinstance(commands, list) or not all(isinstance(c, dict) and c.get("op") in HELPER_OPS for c in commands):
+            raise ValueError(f"commands must be a list of objects with op in {HELPER_OPS}")
+        wanted = {}                 # host -> True (block) / False (unblock); the last command wins
+        for command in commands:
+            host_lists = {"block": ["hosts"], "unblock": ["hosts"], "prepare": ["block", "unblock"]}.get(command["op"], [])
+            for key in host_lists:
+                hosts = command.get(key, [])
+                invalid = [host for host in hosts if not isinstance(host, str) or normalize_domain(host) != host]
+                if invalid:
+                    raise ValueError(f"not plain domain names: {invalid[:5]}")
+            if command["op"] in ("block", "unblock"):
+                for host in command.get("hosts", []):
+                    wanted[host] = command["op"] == "block"
+
+        owner = owner_name(uid)
+        with self._lock:
+            self.requests += 1
+            released = []
+            if any(command["op"] == "release" for command in commands):
+                # A release supersedes the block/unblock commands before it, like HostsWorker.submit(release=True).
+                last = max(i for i, command in enumerate(commands) if command["op"] == "release")
+                wanted = {}
+                for command in commands[last:]:
+                    if command["op"] in ("block", "unblock"):
+                        for host in command.get("hosts", []):
+                            wanted[host] = command["op"] == "block"
+                released = self.engine.release(owner)
+            added, removed = [], []
+            if wanted:
+                added, removed = self.engine.apply(block_hosts=[h for h, block in wanted.items() if block],
+                                                   unblock_hosts=[h for h, block in wanted.items() if not block], owner=owner)
+            if added or removed or released:
+                self.log(f"{owner} (pid {pid}): {len(added)} blocked, {len(removed)} unblocked, {len(released)} released.")
+            added_set, removed_set = set(added), set(removed)
+            results = []
+            for command in commands:
+                op = command["op"]
+                if op == "block":
+                    results.append({"added": [host for host in command.get("hosts", []) if host in added_set]})
+                elif op == "unblock":
+                    results.append({"removed": [host for host in command.get("hosts", []) if host in removed_set]})
+                elif op == "release":
+                    results.append({"removed": sorted(set(released) - added_set)})
+                elif op == "prepare":
+                    results.append(self._prepare(owner, command.get("block", []), command.get("unblock", [])))
+                elif op == "commit":
+                    results.append(self._commit(owner, pid, command.get("token")))
+                elif op == "discard":
+                    self._discard(owner, command.get("token"))
+                    results.append({})
+                elif op == "flush":
+                    results.append(None) # Filled in below, outside the lock
+                else:
+                    results.append(self._status(owner, bool(command.get("hosts"))))
+        # Flushes run subprocesses (up to seconds each) and never touch the engine: another
+        # user's session-boundary commit must not wait behind them.
+        for i, command in enumerate(commands):
+            if command["op"] == "flush":
+                results[i] = self._flush_caches()
+        return results
+
+    def _prepare(self, owner, block_hosts, unblock_hosts):
+        self._discard(owner)
+        staged = self.engine.prepare(block_hosts=block_hosts, unblock_hosts=unblock_hosts, owner=owner)
+        if staged is None:
+            return {"token": None}
+        token = next(self._tokens)
+        self._staged[owner] = (token, staged)
+        return {"token": token}
+
+    def _commit(self, owner, pid, token):
+        entry = self._staged.pop(owner, None)
+        if entry is None or entry[0] != token:
+            if entry is not None:
+                self.engine.discard(entry[1])
+            return {"committed": False}
+        result = self.engine.commit(entry[1])
+        if result is None:
+            return {"committed": False}
+        added, removed = result
+        self.log(f"{owner} (pid {pid}): {len(added)} blocked, {len(removed)} unblocked (pre-staged).")
+        return {"committed": True, "added": added, "removed": removed}
+
+    def _discard(self, owner, token=None):
+        entry = self._staged.get(owner)
+        if entry is not None and token in (None, entry[0]):
+            del self._staged[owner]
+            self.engine.discard(entry[1])
+
+    def _flush_caches(self):
+        with self._flush_lock:
+            if self._flushers is None:
+                from resolver_cache import default_flushers
+                self._flushers = [flusher for flusher in default_flushers() if flusher.available()]
+        flushed, errors = [], {}
+        for flusher in self._flushers:
+            try:
+                flusher.flush()
+                flushed.append(flusher.name)
+            except OSError as e:
+                errors[flusher.name] = str(e)
+        return {"flushed": flushed, "errors": errors}
+
+    def _status(self, owner, include_hosts):
+        managed = self.engine.managed_hosts()
+        status = {"pid": os.getpid(), "uptime_s": time.time() - self.started, "hosts_file": self.engine.hosts_path,
+                  "blocked_count": len(managed), "requests": self.requests, "owner": owner}
+        if include_hosts:
+            status["hosts"] = sorted(managed)
+            status["held"] = sorted(self.engine.held_by(owner))
+        return status
+
+    def serve(self, socket_path=HELPER_SOCKET_PATH):
+        """Serves until SIGTERM/SIGINT. Every local user may connect; authorization is per request."""
+        if os.path.exists(socket_path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(socket_path)
+                raise OSError(f"another helper is already listening on {socket_path}")
+            except ConnectionRefusedError:
+                os.unlink(socket_path) # Left behind by a helper that did not exit cleanly
+            finally:
+                probe.close()
+        for stale in remove_stale_staged(self.engine.hosts_path): # Left by a helper that crashed
+            self.log(f"Removed stale staged hosts image {stale}")
+        server = _Server(socket_path, _RequestHandler)
+        server.helper = self
+        os.chmod(socket_path, 0o666)
+
+        def on_signal(signum, frame):
+            threading.Thread(target=server.shutdown, daemon=True).start()
+        signal.signal(signal.SIGTERM, on_signal)
+        signal.signal(signal.SIGINT, on_signal)
+        self.log(f"Hosts helper serving {self.engine.hosts_path} on {socket_path}")
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+            self.log("Hosts helper stopped.")
+
+
+# --- Client ---
+class HelperClient:
+    """
+    Unprivileged side of the helper socket. Keeps one connection open and
+    reconnects once if sending on it fails (the helper restarted); a request
+    that was sent but got no reply is not resent. Thread-safe. Raises
+    HelperError.
+    """
+
+    def __init__(self, socket_path=HELPER_SOCKET_PATH, timeout=HELPER_TIMEOUT_S):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.hosts_path = f"helper:{socket_path}" # For log messages that name the hosts file
+        self._sock = None
+        self._reader = None
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError as e:
+            sock.close()
+            raise HelperError(f"hosts helper not reachable at {self.socket_path}: {e}") from e
+        self._sock = sock
+        self._reader = sock.makefile("rb")
+
+    def close(self):
+        with self._lock:
+            self._disconnect()
+
+    def _disconnect(self):
+        if self._sock is not None:
+            self._reader.close()
+            self._sock.close()
+        self._sock = self._reader = None
+
+    def request(self, commands):
+        """Sends one batch of commands and returns their results (one write for all block/unblock commands)."""
+        with self._lock:
+            request_id = self._next_id
+            self._next_id += 1
+            payload = json.dumps({"id": request_id, "commands": commands}).encode('utf-8') + b"\n"
+            for attempt in (1, 2):
+                fresh = self._sock is None
+                if fresh:
+                    self._connect()
+                try:
+                    self._sock.sendall(payload)
+                except OSError as e:
+                    self._disconnect()
+                    if fresh or attempt == 2:
+                        raise HelperError(f"hosts helper request failed: {e}") from e
+                    continue # Stale connection (the helper restarted): the request never reached it
+                # Sent: commit and release are not idempotent, so a lost reply is not retried.
+                try:
+                    line = self._reader.readline()
+                    if not line:
+                        raise ConnectionResetError("helper closed the connection")
+                except OSError as e:
+                    self._disconnect()
+                    raise HelperError(f"no reply from the hosts helper (the request may have been applied): {e}") from e
+                break
+        response = json.loads(line)
+        if not response.get("ok"):
+            raise HelperError(f"hosts helper refused the request: {response.get('error')}")
+        return response["results"]
+
+    def apply(self, block_hosts=(), unblock_hosts=()):
+        """Same contract as HostsFileEngine.apply for the caller's own owner: returns (added, removed)."""
+        results = self.request([{"op": "unblock", "hosts": sorted(set(unblock_hosts))},
+                                {"op": "block", "hosts": sorted(set(block_hosts) - set(unblock_hosts))}])
+        return sorted(results[1]["added"]), sorted(results[0]["removed"])
+
+    def block(self, hosts):
+        return self.apply(block_hosts=hosts)[0]
+
+    def unblock(self, hosts):
+        return self.apply(unblock_hosts=hosts)[1]
+
+    def release(self):
+        """Same contract as HostsFileEngine.release for the caller's own owner: returns removed_hosts."""
+        return self.request([{"op": "release"}])[0]["removed"]
+
+    def held_by(self, owner=None):
+        """The hosts the caller holds (the helper decides who the caller is; owner is ignored)."""
+        return set(self.status(hosts=True)["held"])
+
+    def prepare(self, block_hosts=(), unblock_hosts=(), owner=None):
+        """Same contract as HostsFileEngine.prepare; the staged image stays in the helper."""
+        token = self.request([{"op": "prepare", "block": sorted(block_hosts), "unblock": sorted(unblock_hosts)}])[0]["token"]
+        return None if token is None else HelperStagedCommit(token)
+
+    def commit(self, staged):
+        """Same contract as HostsFileEngine.commit: (added, removed), or None if the staged image went stale."""
+        result = self.request([{"op": "commit", "token": staged.token}])[0]
+        return (result["added"], result["removed"]) if result["committed"] else None
+
+    def discard(self, staged):
+        try:
+            self.request([{"op": "discard", "token": staged.token}])
+        except HelperError as e:
+            print(f"Could not discard a staged hosts image in the helper: {e}")
+
+    def status(self, hosts=False):
+        return self.request([{"op": "status", "hosts": hosts}])[0]
+
+    def flush_caches(self):
+        return self.request([{"op": "flush"}])[0]
+
+
+class HelperStagedCommit:
+    """Handle for an image staged inside the helper."""
+
+    def __init__(self, token):
+        self.token = token
+
+
+class HelperCacheFlusher:
+    """resolver_cache flusher that asks the helper to flush the caches (flushing them needs root)."""
+
+    name = "hosts helper"
+
+    def __init__(self, client):
+        self.client = client
+
+    def available(self):
+        return True
+
+    def flush(self):
+        result = self.client.flush_caches()
+        if result["errors"]:
+            raise OSError("; ".join(f"{name}: {error}" for name, error in result["errors"].items()))
+
+
+def connect_helper(socket_path=HELPER_SOCKET_PATH):
+    """A HelperClient if a helper answers on socket_path, else None."""
+    if not os.path.exists(socket_path):
+        return None
+    client = HelperClient(socket_path, timeout=2.0)
+    try:
+        client.status()
+    except (HelperError, ValueError):
+        client.close()
+        return None
+    client.timeout = HELPER_TIMEOUT_S
+    client._sock.settimeout(HELPER_TIMEOUT_S)
+    return client
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Root helper that edits the hosts file for PomodoroBlocker clients.")
+    parser.add_argument("--socket", default=HELPER_SOCKET_PATH, help=f"Unix socket to listen on (default {HELPER_SOCKET_PATH})")
+    parser.add_argument("--hosts-file", default=HOSTS_FILE_PATH, help=f"hosts file to manage (default {HOSTS_FILE_PATH})")
+    parser.add_argument("--allow-group", metavar="GROUP", help="only serve root and members of GROUP")
+    args = parser.parse_args(argv)
+    if not hasattr(socket, "AF_UNIX"):
+        print("CRITICAL ERROR: The hosts helper needs Unix domain sockets.", file=sys.stderr)
+        return 1
+    if args.hosts_file == HOSTS_FILE_PATH and os.geteuid() != 0:
+        print("CRITICAL ERROR: The hosts helper must run as root.", file=sys.stderr)
+        return 1
+    try:
+        HostsHelper(args.hosts_file, args.allow_group).serve(args.socket)
+    except OSError as e:
+        print(f"CRITICAL ERROR: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,39 +1,69 @@
+import sys
+if __name__ == "__main__":
+    # In a frozen (PyInstaller) build the block list import's spawn workers re-run this
+    # executable; freeze_support() turns them into workers before anything else runs.
+    import multiprocessing
+    multiprocessing.freeze_support()
+if __name__ == "__main__" and "--headless" in sys.argv[1:]:
+    # Dispatch before tkinter and the GUI-only libraries below are imported.
+    from pomodoro_headless import main as headless_main
+    sys.exit(headless_main([arg for arg in sys.argv[1:] if arg != "--headless"]))
+
 import tkinter as tk
-from tkinter import ttk, messagebox, simpledialog
+from tkinter import ttk, messagebox, simpledialog, filedialog
+import tkinter.font as tkfont
 import os
-import sys
 from pathlib import Path
 import json
 import math
-import threading
+import bisect
 import datetime
-try:
-    from playsound import playsound
-    PLAYSOUND_AVAILABLE = True
-except ImportError:
-    PLAYSOUND_AVAILABLE = False
-    print("Warning: playsound library not found. Sound notifications will be disabled. Install with 'pip install playsound'")
-try:
-    import pyautogui
-    PYAUTOGUI_AVAILABLE = True
-except ImportError:
-    PYAUTOGUI_AVAILABLE = False
-    print("Warning: pyautogui library not found. Browser reload simulation will be disabled. Install with 'pip install pyautogui'")
-try:
-    from PIL import Image, ImageTk
-    PILLOW_AVAILABLE = True
-except ImportError:
-    PILLOW_AVAILABLE = False
-    print("Warning: Pillow library (PIL) not found. Custom PNG icon support will be limited or unavailable.")
-    print("Install with 'pip install Pillow' for full custom icon support.")
+from audio_engine import AudioService
+from blocklist_store import BlockListStore
+from domain_matcher import normalize_domain
+from settings_store import SettingsStore
+from resolver_cache import ResolverCacheManager
+from hosts_helper import connect_helper, HelperCacheFlusher, HELPER_SOCKET_PATH
+from session_history import SessionHistory, ROLLUP_COLUMNS, ITEM_ROLLUP_COLUMNS, week_start
+from hosts_engine import HostsFileEngine, HostsWorker, domain_variants, managed_variants, HOSTS_FILE_PATH
+from pomodoro_engine import (PomodoroEngine, normalize_sequence, BLOCK_LIST_FILE_PATH, CONFIG_FILE_PATH, STATE_FILE_PATH, DEFAULT_FOCUS_DURATION_MINUTES, DEFAULT_SHORT_BREAK_DURATION_MINUTES,
+                             DEFAULT_LONG_BREAK_DURATION_MINUTES, DEFAULT_EATING_BREAK_DURATION_MINUTES,
+                             DEFAULT_POMODOROS_FOR_FULL_XP, DEFAULT_SEQUENCE, DEFAULT_BLOCK_PROFILE, NO_BLOCK_PROFILE,
+                             RESERVED_BLOCK_PROFILES, item_block_profile, normalize_block_profiles, block_profile_domains)
+
+# --- Optional backends ---
+# playsound, pyautogui and Pillow are imported on first use rather than at startup:
+# pyautogui alone costs several hundred milliseconds before the window can appear.
+_optional_backends = {}
+_OPTIONAL_BACKEND_WARNINGS = {
+    "playsound": "Warning: playsound library not found. Sound notifications will be disabled. Install with 'pip install playsound'",
+    "pyautogui": "Warning: pyautogui library not found. Without the browser extension, browser reload simulation will be disabled. Install with 'pip install pyautogui'",
+    "PIL": "Warning: Pillow library (PIL) not found. Custom PNG icon support will be limited or unavailable.\n"
+           "Install with 'pip install Pillow' for full custom icon support.",
+}
+
+def _load_optional_backend(name):
+    """Imports an optional library once and caches it; returns None (after one warning) if it is missing."""
+    if name not in _optional_backends:
+        try:
+            if name == "playsound":
+                from playsound import playsound
+                _optional_backends[name] = playsound
+            elif name == "pyautogui":
+                import pyautogui
+                _optional_backends[name] = pyautogui
+            elif name == "PIL":
+                from PIL import Image, ImageTk
+                _optional_backends[name] = (Image, ImageTk)
+        except ImportError:
+            _optional_backends[name] = None
+            print(_OPTIONAL_BACKEND_WARNINGS[name])
+    return _optional_backends[name]
 
 
 # --- Constants ---
 # Paths
 SCRIPT_DIR = Path(__file__).parent.resolve() # For robust asset paths
-HOSTS_FILE_PATH = "/etc/hosts"
-BLOCK_LIST_FILE_PATH = Path.home() / ".website_blocker_list.txt"
-CONFIG_FILE_PATH = Path.home() / ".pomodoro_blocker_settings.json"
 SOUND_DIR = SCRIPT_DIR / "sound" # Centralized sound directory
 SCRIPT_DIR = Path(__file__).parent.resolve() # For robust asset paths
 APP_ICON_PATH = SCRIPT_DIR / "pom.png"  # Assuming your icon is named app_icon.png and is in the same directory
@@ -51,30 +81,6 @@ def get_symbols_from_art(art_string):
     """Helper function to get individual symbols from an art string."""
     return list(art_string)
 
-# Network
-REDIRECT_IP = "127.0.0.1"
-POMODORO_COMMENT = "# Added by PomodoroBlocker"
-
-# Default Durations (minutes)
-DEFAULT_FOCUS_DURATION_MINUTES = 25
-DEFAULT_SHORT_BREAK_DURATION_MINUTES = 5
-DEFAULT_LONG_BREAK_DURATION_MINUTES = 15
-DEFAULT_EATING_BREAK_DURATION_MINUTES = 30
-DEFAULT_POMODOROS_FOR_FULL_XP = 4
-DEFAULT_SEQUENCE = [
-    {'type': "Focus", 'name': "Focus"},
-    {'type': "Short Break", 'name': "Short Break"},
-    {'type': "Focus", 'name': "Focus"},
-    {'type': "Short Break", 'name': "Short Break"},
-    {'type': "Focus", 'name': "Focus"},
-    {'type': "Short Break", 'name': "Short Break"},
-    {'type': "Focus", 'name': "Focus"},
-    {'type': "Long Break", 'name': "Long Break"},
-    {'type': "Focus", 'name': "Focus"},
-    {'type': "Eating Break", 'name': "Eating Break"},
-    {'type': "Focus", 'name': "Focus"}
-]
-
 # Sound Files (using resolved paths)
 SOUND_FOCUS_COMPLETE = SOUND_DIR / "focus_complete.mp3"
 SOUND_BREAK_COMPLETE = SOUND_DIR / "focus_complete.mp3"
@@ -109,6 +115,154 @@ PAUSE_ICON_COLOR_ACTIVE = "royal blue"
 PLAY_ICON_COLOR_ACTIVE = "lime green"
 PAUSE_PLAY_ICON_COLOR_DISABLED = "gray75"
 
+# Block list manager
+IMPORT_POLL_INTERVAL_MS = 100
+
+# Statistics heatmap: 53 weeks x 7 days of cells, coloured by focus minutes that day
+HEATMAP_WEEKS = 53
+HEATMAP_CELL_SIZE = 10
+HEATMAP_CELL_GAP = 2
+HEATMAP_BG_COLOR = "white"
+HEATMAP_LEVELS = [(120, "#196127"), (60, "#239a3b"), (30, "#7bc96f"), (1, "#c6e48b"), (0, "#ebedf0")] # (min minutes, color)
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# VirtualListView Class
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+class VirtualListView(ttk.Frame):
+    """
+    A scrollable, filterable list of strings where the Listbox only ever holds
+    the rows that fit on screen. Items live in one sorted Python list: a
+    prefix filter is the contiguous slice found with two bisects, and
+    insert/remove touch a single position instead of rebuilding the widget.
+    Selection is kept by value, so it survives scrolling and filtering.
+    """
+
+    def __init__(self, master, height=10, **kwargs):
+        super().__init__(master, **kwargs)
+        self._items = []            # All items, sorted
+        self._lo, self._hi = 0, 0   # Filtered range of _items
+        self._prefix = ""
+        self._first = 0             # Offset of the top visible row within the filtered range
+        self._rows = height         # Rows that fit in the Listbox
+        self._row_height = None
+        self._visible = []
+        self._selected = set()
+
+        self.listbox = tk.Listbox(self, selectmode=tk.EXTENDED, height=height, exportselection=False, activestyle="none")
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.listbox.bind("<<ListboxSelect>>", self._on_select)
+        self.listbox.bind("<Button-1>", lambda e: self._selected.clear()) # A plain click starts a new selection
+        self.listbox.bind("<Control-Button-1>", lambda e: None)
+        self.listbox.bind("<Shift-Button-1>", lambda e: None)
+        self.listbox.bind("<MouseWheel>", lambda e: self.scroll(-1 if e.delta > 0 else 1, "units", 3))
+        self.listbox.bind("<Button-4>", lambda e: self.scroll(-1, "units", 3))
+        self.listbox.bind("<Button-5>", lambda e: self.scroll(1, "units", 3))
+        self.listbox.bind("<Configure>", self._on_resize)
+
+    # --- Data ---
+    def set_items(self, sorted_items):
+        self._items = list(sorted_items)
+        self._selected.clear()
+        self._apply_filter()
+
+    def insert(self, item):
+        index = bisect.bisect_left(self._items, item)
+        if index < len(self._items) and self._items[index] == item:
+            return
+        self._items.insert(index, item)
+        self._apply_filter(keep_position=True)
+
+    def remove(self, items):
+        for item in items:
+            index = bisect.bisect_left(self._items, item)
+            if index < len(self._items) and self._items[index] == item:
+                del self._items[index]
+            self._selected.discard(item)
+        self._apply_filter(keep_position=True)
+
+    def set_filter(self, prefix):
+        if prefix == self._prefix:
+            return
+        self._prefix = prefix
+        self._selected.clear()
+        self._apply_filter()
+
+    def _apply_filter(self, keep_position=False):
+        if self._prefix:
+            self._lo = bisect.bisect_left(self._items, self._prefix)
+            self._hi = bisect.bisect_left(self._items, self._prefix + "\uffff", self._lo)
+        else:
+            self._lo, self._hi = 0, len(self._items)
+        if not keep_position:
+            self._first = 0
+        self._render()
+
+    def filtered_count(self):
+        return self._hi - self._lo
+
+    def selection(self):
+        return sorted(self._selected)
+
+    # --- Scrolling ---
+    def scroll(self, amount, what="units", step=1):
+        rows = step if what == "units" else max(1, self._rows - 1)
+        self._first += amount * rows
+        self._render()
+        return "break"
+
+    def _on_scrollbar(self, action, *args):
+        if action == "moveto":
+            self._first = int(float(args[0]) * self.filtered_count())
+            self._render()
+        elif action == "scroll":
+            self.scroll(int(args[0]), args[1])
+
+    def _measure_row_height(self):
+        first, second = self.listbox.bbox(0), self.listbox.bbox(1)
+        if first and second:
+            self._row_height = second[1] - first[1] # Exact row pitch, cached once two rows exist
+            return self._row_height
+        return tkfont.Font(font=self.listbox.cget("font")).metrics("linespace") + 1
+
+    def _on_resize(self, event):
+        row_height = self._row_height or self._measure_row_height()
+        border = 2 * (int(self.listbox.cget("borderwidth")) + int(self.listbox.cget("highlightthickness")))
+        rows = max(1, (event.height - border) // row_height)
+        if rows != self._rows:
+            self._rows = rows
+            self._render()
+
+    # --- Rendering ---
+    def _render(self):
+        count = self.filtered_count()
+        self._first = max(0, min(self._first, count - self._rows))
+        start = self._lo + self._first
+        visible = self._items[start:min(start + self._rows, self._hi)]
+        if visible != self._visible:
+            self.listbox.delete(0, tk.END)
+            if visible:
+                self.listbox.insert(tk.END, *visible)
+            self._visible = visible
+        self.listbox.selection_clear(0, tk.END)
+        for row, item in enumerate(visible):
+            if item in self._selected:
+                self.listbox.selection_set(row)
+        if count:
+            self.scrollbar.set(self._first / count, (self._first + len(visible)) / count)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def _on_select(self, event=None):
+        selected_rows = set(self.listbox.curselection())
+        for row, item in enumerate(self._visible):
+            if row in selected_rows:
+                self._selected.add(item)
+            else:
+                self._selected.discard(item)
+
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # BlockListManagerWindow Class
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -128,59 +282,129 @@ class BlockListManagerWindow(tk.Toplevel):
         self.add_button_manager = ttk.Button(self, text="Add to Block List", command=self._ui_add_website)
         self.add_button_manager.grid(row=0, column=2, padx=5, pady=(10,5))
 
-        ttk.Label(self, text="Blocked Websites:").grid(row=1, column=0, padx=10, pady=5, sticky="nw")
-        self.listbox_frame_manager = ttk.Frame(self)
-        self.listbox_frame_manager.grid(row=2, column=0, columnspan=3, padx=10, pady=5, sticky="nsew")
+        self.list_count_label = ttk.Label(self, text="Blocked Websites:")
+        self.list_count_label.grid(row=1, column=0, padx=10, pady=5, sticky="nw")
+        self.filter_var = tk.StringVar()
+        self.filter_entry_manager = ttk.Entry(self, textvariable=self.filter_var)
+        self.filter_entry_manager.grid(row=1, column=1, columnspan=2, padx=10, pady=5, sticky="ew")
+        self.filter_var.trace_add("write", lambda *args: self._on_filter_changed())
 
-        self.listbox_manager = tk.Listbox(self.listbox_frame_manager, selectmode=tk.SINGLE, height=10)
-        self.listbox_scrollbar_manager = ttk.Scrollbar(self.listbox_frame_manager, orient=tk.VERTICAL, command=self.listbox_manager.yview)
-        self.listbox_manager.configure(yscrollcommand=self.listbox_scrollbar_manager.set)
-        self.listbox_manager.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        self.listbox_scrollbar_manager.pack(side=tk.RIGHT, fill=tk.Y)
+        self.list_view_manager = VirtualListView(self, height=10)
+        self.list_view_manager.grid(row=2, column=0, columnspan=3, padx=10, pady=5, sticky="nsew")
 
         self.unblock_button_manager = ttk.Button(self, text="Unblock Selected", command=self._ui_unblock_selected_website)
-        self.unblock_button_manager.grid(row=3, column=0, columnspan=3, padx=10, pady=10)
+        self.unblock_button_manager.grid(row=3, column=0, columnspan=2, padx=10, pady=10)
+
+        self.import_button_manager = ttk.Button(self, text="Import list...", command=self._ui_import_list)
+        self.import_button_manager.grid(row=3, column=2, padx=5, pady=10)
+
+        # Shown only while an import runs
+        self.import_job = None
+        self.import_progress = ttk.Progressbar(self, mode="determinate", maximum=100)
+        self.import_progress.grid(row=4, column=0, columnspan=3, padx=10, sticky="ew")
+        self.import_progress.grid_remove()
+        self.import_status_label = ttk.Label(self, text="")
+        self.import_status_label.grid(row=5, column=0, columnspan=3, padx=10, sticky="w")
 
         self.close_button = ttk.Button(self, text="Done", command=self.destroy)
-        self.close_button.grid(row=4, column=0, columnspan=3, padx=10, pady=10)
+        self.close_button.grid(row=6, column=0, columnspan=3, padx=10, pady=10)
 
         self.grid_columnconfigure(1, weight=1)
         self.grid_rowconfigure(2, weight=1)
         self._refresh_listbox()
 
     def _refresh_listbox(self):
-        self.listbox_manager.delete(0, tk.END)
-        for site in sorted(list(self.app_controller.blocked_websites)):
-            self.listbox_manager.insert(tk.END, site)
+        """Full reload; only needed on open and after a bulk import. Single edits update the view in place."""
+        self.list_view_manager.set_items(sorted(self.app_controller.blocked_websites))
+        self._update_count_label()
+
+    def _update_count_label(self):
+        total = len(self.app_controller.blocked_websites)
+        shown = self.list_view_manager.filtered_count()
+        if shown == total:
+            self.list_count_label.config(text=f"Blocked Websites ({total}):")
+        else:
+            self.list_count_label.config(text=f"Blocked Websites ({shown} of {total}):")
+
+    def _on_filter_changed(self):
+        self.list_view_manager.set_filter(self.filter_var.get().strip().lower())
+        self._update_count_label()
 
     def _ui_add_website(self):
         website = self.website_entry_manager.get().strip()
         if not website:
             messagebox.showwarning("Input Error", "Please enter a website domain.", parent=self)
             return
-        normalized_website = website.lower().replace("http://", "").replace("https://", "").split('/')[0]
+        normalized_website = normalize_domain(website)
         if not normalized_website:
-            messagebox.showwarning("Input Error", "Invalid website domain entered.", parent=self)
+            messagebox.showwarning("Input Error", f"'{website}' is not a domain name that can be blocked.", parent=self)
             return
         success, message = self.app_controller.add_domain_to_blocklist_core(normalized_website)
         if success:
-            self._refresh_listbox()
+            self.list_view_manager.insert(normalized_website)
+            self._update_count_label()
             self.website_entry_manager.delete(0, tk.END)
         else:
             messagebox.showwarning("Info", message, parent=self)
 
     def _ui_unblock_selected_website(self):
-        selected_indices = self.listbox_manager.curselection()
-        if not selected_indices:
+        selected_websites = self.list_view_manager.selection()
+        if not selected_websites:
             messagebox.showwarning("Selection Error", "Please select a website to unblock.", parent=self)
             return
-        selected_website = self.listbox_manager.get(selected_indices[0])
-        success, message = self.app_controller.remove_domain_from_blocklist_core(selected_website)
-        if success:
-            self._refresh_listbox()
+        removed = self.app_controller.remove_domains_from_blocklist_bulk(selected_websites)
+        if removed:
+            self.list_view_manager.remove(removed)
+            self._update_count_label()
         else:
             messagebox.showerror("Error", "Could not unblock selected website.", parent=self)
 
+    def _ui_import_list(self):
+        if self.import_job and not self.import_job.done: return
+        path = filedialog.askopenfilename(parent=self, title="Import Block List",
+                                          filetypes=[("Block lists", "*.txt *.hosts *.list"), ("All files", "*")])
+        if not path: return
+        from blocklist_import import ImportJob # Pulls in multiprocessing; only needed here
+        try:
+            self.import_job = ImportJob(path).start()
+        except OSError as e:
+            messagebox.showerror("Import Error", f"Could not read the list file:\n{path}\n{e}", parent=self)
+            return
+        self.import_button_manager.config(state=tk.DISABLED)
+        self.import_progress["value"] = 0
+        self.import_progress.grid()
+        self._poll_import()
+
+    def _poll_import(self):
+        """Runs on the Tk loop every IMPORT_POLL_INTERVAL_MS while the import thread parses the file."""
+        if not self.winfo_exists(): return
+        job = self.import_job
+        percent = 100 * job.bytes_done / job.total_bytes if job.total_bytes else 100
+        self.import_progress["value"] = percent
+        self.import_status_label.config(text=f"Importing... {percent:.0f}% ({len(job.domains)} domains found)")
+        if not job.done:
+            self.after(IMPORT_POLL_INTERVAL_MS, self._poll_import)
+            return
+        self.import_progress.grid_remove()
+        self.import_button_manager.config(state=tk.NORMAL)
+        if job.error:
+            self.import_status_label.config(text="")
+            messagebox.showerror("Import Error", f"Could not import the list file:\n{job.path}\n{job.error}", parent=self)
+            return
+        self.import_status_label.config(text=f"Merging {len(job.domains)} domains into the block list...")
+        self.app_controller.add_domains_to_blocklist_bulk(job.domains, on_done=lambda added: self._on_import_merged(job, added))
+
+    def _on_import_merged(self, job, added):
+        if not self.winfo_exists(): return
+        self.import_status_label.config(text=f"Imported {added} new domains ({len(job.domains)} in the file).")
+        if added:
+            self._refresh_listbox()
+
+    def destroy(self):
+        if self.import_job and not self.import_job.done:
+            self.import_job.cancel()
+        super().destroy()
+
 class AchievementsWindow(tk.Toplevel):
     def __init__(self, master, app_controller):
         super().__init__(master)
@@ -228,6 +452,150 @@ class AchievementsWindow(tk.Toplevel):
         self.text_area.tag_configure("art", font=("Courier", 12, "bold"), justify=tk.CENTER, spacing1=5, spacing3=5) # Add spacing around art
         self.text_area.config(state=tk.DISABLED) # Make read-only
 
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# Statistics: FocusHeatmap and StatisticsWindow Classes
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+class FocusHeatmap:
+    """
+    Calendar heatmap of focus minutes rendered once into a PhotoImage. The
+    app keeps it across StatisticsWindow openings; afterwards only the cells
+    of days whose totals changed (normally just today) are repainted. It is
+    valid until a new week starts and shifts every column.
+    """
+
+    def __init__(self, master, today):
+        self.last_week = week_start(today)
+        self.first_day = self.last_week - datetime.timedelta(weeks=HEATMAP_WEEKS - 1)
+        step = HEATMAP_CELL_SIZE + HEATMAP_CELL_GAP
+        self.image = tk.PhotoImage(master=master, width=HEATMAP_WEEKS * step, height=7 * step)
+        self.dirty_days = set()     # ISO days committed to the history since they were last painted
+
+    def covers(self, today):
+        return week_start(today) == self.last_week
+
+    @staticmethod
+    def _color(minutes):
+        return next(color for threshold, color in HEATMAP_LEVELS if minutes >= threshold)
+
+    def render(self, minutes_by_day, today):
+        """Full repaint; minutes_by_day maps ISO days to focus minutes."""
+        self.image.put(HEATMAP_BG_COLOR, to=(0, 0, self.image.width(), self.image.height()))
+        day = self.first_day
+        while day <= today:
+            self.paint_day(day, minutes_by_day.get(day.isoformat(), 0))
+            day += datetime.timedelta(days=1)
+        self.dirty_days.clear()
+
+    def paint_day(self, day, minutes):
+        offset = (day - self.first_day).days
+        if not 0 <= offset < HEATMAP_WEEKS * 7:
+            return
+        step = HEATMAP_CELL_SIZE + HEATMAP_CELL_GAP
+        x, y = (offset // 7) * step, (offset % 7) * step
+        self.image.put(self._color(minutes), to=(x, y, x + HEATMAP_CELL_SIZE, y + HEATMAP_CELL_SIZE))
+
+
+class StatisticsWindow(tk.Toplevel):
+    """Focus totals, heatmap and per-item completion rates, read from the history rollups only."""
+
+    def __init__(self, master, app_controller):
+        super().__init__(master)
+        self.app_controller = app_controller
+        self.title("Statistics")
+        self.transient(master)
+
+        main_frame = ttk.Frame(self, padding="10")
+        main_frame.pack(expand=True, fill=tk.BOTH)
+
+        self.summary_label = ttk.Label(main_frame, text="", justify=tk.LEFT)
+        self.summary_label.pack(anchor="w")
+
+        ttk.Label(main_frame, text="Focus, last 12 months:").pack(anchor="w", pady=(10, 2))
+        self.heatmap_label = ttk.Label(main_frame)
+        self.heatmap_label.pack(anchor="w")
+
+        tables = ttk.Frame(main_frame)
+        tables.pack(fill=tk.BOTH, expand=True, pady=(10, 0))
+        self.daily_tree = self._make_tree(tables, [("day", "Day", 90), ("minutes", "Focus min", 70), ("done", "Done", 45)], 7)
+        self.daily_tree.grid(row=0, column=0, sticky="nsew", padx=(0, 5))
+        self.weekly_tree = self._make_tree(tables, [("week", "Week of", 90), ("minutes", "Focus min", 70),
+                                                    ("done", "Done", 45), ("stopped", "Stopped", 55)], 7)
+        self.weekly_tree.grid(row=0, column=1, sticky="nsew")
+        tables.grid_columnconfigure((0, 1), weight=1)
+
+        ttk.Label(main_frame, text="Sequence items:").pack(anchor="w", pady=(10, 2))
+        self.items_tree = self._make_tree(main_frame, [("item", "Item", 160), ("started", "Started", 60),
+                                                       ("completed", "Completed", 75), ("rate", "Rate", 55)], 6)
+        self.items_tree.pack(fill=tk.BOTH, expand=True)
+
+        ttk.Button(main_frame, text="Close", command=self.destroy).pack(pady=10)
+        self.protocol("WM_DELETE_WINDOW", self.destroy)
+        self.refresh()
+
+    def _make_tree(self, parent, columns, height):
+        tree = ttk.Treeview(parent, columns=[column for column, _, _ in columns], show="headings", height=height)
+        for column, heading, width in columns:
+            tree.heading(column, text=heading)
+            tree.column(column, width=width, anchor=tk.W if column in ("day", "week", "item") else tk.E)
+        return tree
+
+    def refresh(self):
+        """Re-reads the rollups (a few dozen rows) and repaints the changed heatmap cells."""
+        history = self.app_controller.session_history
+        today = datetime.date.today()
+        this_week = week_start(today)
+        try:
+            heatmap = self.app_controller.focus_heatmap
+            if heatmap is None or not heatmap.covers(today):
+                heatmap = FocusHeatmap(self.app_controller.root, today)
+                yearly = history.daily_rollups(heatmap.first_day.isoformat(), today.isoformat())
+                heatmap.render({day: row['focus_seconds'] / 60 for day, row in yearly.items()}, today)
+                self.app_controller.focus_heatmap = heatmap
+            else:
+                dirty = heatmap.dirty_days | {today.isoformat()}
+                changed = history.daily_rollups(min(dirty), max(dirty))
+                for day in dirty:
+                    heatmap.paint_day(datetime.date.fromisoformat(day), changed.get(day, {}).get('focus_seconds', 0) / 60)
+                heatmap.dirty_days.clear()
+            daily = history.daily_rollups((today - datetime.timedelta(days=6)).isoformat(), today.isoformat())
+            weekly = history.weekly_rollups((this_week - datetime.timedelta(weeks=52)).isoformat(), this_week.isoformat())
+            items = history.item_rollups()
+        except Exception as e:
+            print(f"Error reading session history: {e}")
+            self.summary_label.config(text=f"Session history unavailable: {e}")
+            return
+        self.heatmap_label.config(image=heatmap.image)
+
+        empty = dict.fromkeys(ROLLUP_COLUMNS, 0)
+        today_row = daily.get(today.isoformat(), empty)
+        week_row = weekly.get(this_week.isoformat(), empty)
+        lost_minutes = sum(row['lost_seconds'] for row in weekly.values()) / 60
+        stopped_count = sum(row['focus_stopped'] for row in weekly.values())
+        self.summary_label.config(text=(
+            f"Today: {today_row['focus_seconds'] / 60:.0f} min focus, {today_row['focus_completed']} completed\n"
+            f"This week: {week_row['focus_seconds'] / 60:.0f} min focus, {week_row['focus_completed']} completed\n"
+            f"Lost to {stopped_count} stopped focus sessions (12 months): {lost_minutes:.0f} min"))
+
+        self.daily_tree.delete(*self.daily_tree.get_children())
+        for offset in range(7):
+            day = (today - datetime.timedelta(days=offset)).isoformat()
+            row = daily.get(day, empty)
+            self.daily_tree.insert("", tk.END, values=(day, f"{row['focus_seconds'] / 60:.0f}", row['focus_completed']))
+
+        self.weekly_tree.delete(*self.weekly_tree.get_children())
+        for offset in range(8):
+            week = (this_week - datetime.timedelta(weeks=offset)).isoformat()
+            row = weekly.get(week, empty)
+            self.weekly_tree.insert("", tk.END, values=(week, f"{row['focus_seconds'] / 60:.0f}",
+                                                        row['focus_completed'], row['focus_stopped']))
+
+        self.items_tree.delete(*self.items_tree.get_children())
+        for index, item in enumerate(self.app_controller.custom_sequence):
+            counts = items.get((index, item['type'], item['name']), dict.fromkeys(ITEM_ROLLUP_COLUMNS, 0))
+            rate = f"{counts['completed'] / counts['started']:.0%}" if counts['started'] else "-"
+            self.items_tree.insert("", tk.END, values=(f"{index + 1}. {item['name']}", counts['started'],
+                                                       counts['completed'], rate))
+
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # RepeatingNotificationWindow Class
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -303,10 +671,13 @@ class RepeatingNotificationWindow(tk.Toplevel):
         self._after_id_pause = self.after(5000, self._play_sound_and_initiate_next_cycle)
 
     def _stop_sound_repetition_cycle(self): # This method IS in your file
+        was_active = self._repetition_active
         self._repetition_active = False 
         if self._after_id_pause:
             self.after_cancel(self._after_id_pause)
             self._after_id_pause = None
+        if was_active:
+            self.app_controller._stop_sound() # Interrupt the clip now rather than letting it finish
 
     def _on_ok(self): # This method IS in your file
         self._stop_sound_repetition_cycle()
@@ -326,6 +697,105 @@ class RepeatingNotificationWindow(tk.Toplevel):
     # from your current RepeatingNotificationWindow class (lines 179-190 in your file)
     # as they implement the older, overlapping logic.
 
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# BlockProfilesWindow Class
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+class BlockProfilesWindow(tk.Toplevel):
+    """Edits the named block profiles sequence items can use instead of the main block list."""
+
+    def __init__(self, master, app_controller, on_change=None):
+        super().__init__(master)
+        self.app_controller = app_controller
+        self.on_change = on_change # Called after a profile is saved or deleted
+        self.title("Block Profiles")
+        self.geometry("520x360")
+        self.transient(master)
+        self.grab_set()
+
+        ttk.Label(self, text="Profiles:").grid(row=0, column=0, padx=10, pady=(10, 5), sticky="w")
+        ttk.Label(self, text="Domains (one per line):").grid(row=0, column=1, padx=10, pady=(10, 5), sticky="w")
+        self.profile_listbox = tk.Listbox(self, selectmode=tk.SINGLE, exportselection=False, width=18)
+        self.profile_listbox.grid(row=1, column=0, padx=10, pady=5, sticky="nsew")
+        self.profile_listbox.bind("<<ListboxSelect>>", lambda event: self._show_selected_profile())
+        self.domains_text = tk.Text(self, width=36, height=14, undo=True)
+        self.domains_text.grid(row=1, column=1, padx=10, pady=5, sticky="nsew")
+
+        buttons_frame = ttk.Frame(self)
+        buttons_frame.grid(row=2, column=0, columnspan=2, padx=10, pady=10, sticky="ew")
+        ttk.Button(buttons_frame, text="New Profile...", command=self._new_profile).pack(side=tk.LEFT, padx=5, expand=True, fill=tk.X)
+        ttk.Button(buttons_frame, text="Delete Profile", command=self._delete_profile).pack(side=tk.LEFT, padx=5, expand=True, fill=tk.X)
+        ttk.Button(buttons_frame, text="Save Profile", command=self._save_profile).pack(side=tk.LEFT, padx=5, expand=True, fill=tk.X)
+        ttk.Button(buttons_frame, text="Close", command=self._close).pack(side=tk.LEFT, padx=5, expand=True, fill=tk.X)
+
+        self.grid_rowconfigure(1, weight=1)
+        self.grid_columnconfigure(1, weight=1)
+        self.selected_profile = None
+        self._refresh_profiles()
+        self.protocol("WM_DELETE_WINDOW", self._close)
+
+    def _refresh_profiles(self, select=None):
+        names = sorted(self.app_controller.block_profiles)
+        self.profile_listbox.delete(0, tk.END)
+        for name in names:
+            self.profile_listbox.insert(tk.END, name)
+        if select in names:
+            index = names.index(select)
+            self.profile_listbox.selection_set(index)
+            self.profile_listbox.see(index)
+        self._show_selected_profile()
+
+    def _show_selected_profile(self):
+        selection = self.profile_listbox.curselection()
+        self.selected_profile = self.profile_listbox.get(selection[0]) if selection else None
+        self.domains_text.delete("1.0", tk.END)
+        if self.selected_profile:
+            self.domains_text.insert("1.0", "\n".join(self.app_controller.block_profiles[self.selected_profile]))
+
+    def _new_profile(self):
+        name = simpledialog.askstring("New Block Profile", "Profile name (e.g. Deep Work):", parent=self)
+        if name is None:
+            return
+        name = name.strip()
+        if not name or name in RESERVED_BLOCK_PROFILES or name in self.app_controller.block_profiles:
+            messagebox.showwarning("Invalid Name", f"'{name}' is empty, reserved or already used.", parent=self)
+            return
+        self.app_controller.set_block_profile(name, [])
+        self._refresh_profiles(select=name)
+        if self.on_change: self.on_change()
+
+    def _delete_profile(self):
+        if not self.selected_profile:
+            messagebox.showwarning("Selection Error", "Please select a profile to delete.", parent=self)
+            return
+        if not messagebox.askyesno("Delete Profile", f"Delete '{self.selected_profile}'? Sessions using it will block "
+                                   "their default (the block list for focus, nothing for breaks).", parent=self):
+            return
+        self.app_controller.delete_block_profile(self.selected_profile)
+        self._refresh_profiles()
+        if self.on_change: self.on_change()
+
+    def _save_profile(self):
+        if not self.selected_profile:
+            messagebox.showwarning("Selection Error", "Please select or create a profile first.", parent=self)
+            return
+        domains, invalid = set(), []
+        for line in self.domains_text.get("1.0", tk.END).splitlines():
+            if line.strip():
+                domain = normalize_domain(line)
+                if domain: domains.add(domain)
+                else: invalid.append(line.strip())
+        if invalid:
+            messagebox.showwarning("Invalid Domains", "Skipped lines that are not domain names:\n" + "\n".join(invalid[:10]), parent=self)
+        self.app_controller.set_block_profile(self.selected_profile, domains)
+        self._refresh_profiles(select=self.selected_profile)
+        if self.on_change: self.on_change()
+
+    def _close(self):
+        self.grab_release()
+        self.destroy()
+        if isinstance(self.master, tk.Toplevel) and self.master.winfo_exists():
+            self.master.grab_set() # Hand the grab back to the sequence editor
+
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # SequenceEditorWindow Class
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -335,7 +805,7 @@ class SequenceEditorWindow(tk.Toplevel):
         self.app_controller = app_controller
         self.title("Edit Pomodoro Sequence & Durations")
         # Potentially increase height slightly more if needed, e.g., 550x680
-        self.geometry("550x680") # Adjusted height for the new label
+        self.geometry("550x750") # Adjusted height for the block profile row
         self.transient(master)
         self.grab_set()
 
@@ -356,6 +826,7 @@ class SequenceEditorWindow(tk.Toplevel):
         self.sequence_listbox.configure(yscrollcommand=listbox_scrollbar.set)
         listbox_scrollbar.grid(row=0, column=1, sticky="ns")
         self.sequence_listbox.bind("<Return>", self._rename_selected_session_dialog)
+        self.sequence_listbox.bind("<<ListboxSelect>>", lambda event: self._show_selected_profile())
 
         # --- NEW: Total Sequence Time Label ---
         self.total_sequence_time_label = ttk.Label(self, text="Total Time: Calculating...", font=("Helvetica", 10, "italic"))
@@ -389,8 +860,17 @@ class SequenceEditorWindow(tk.Toplevel):
         self.move_down_button.pack(side=tk.LEFT, padx=5, pady=5, expand=True, fill=tk.X)
 
 
+        profile_frame = ttk.LabelFrame(self, text="Sites Blocked by Selected Session")
+        profile_frame.grid(row=5, column=0, columnspan=3, padx=10, pady=5, sticky="ew")
+        profile_frame.grid_columnconfigure(0, weight=1)
+        self.profile_var = tk.StringVar()
+        self.profile_combobox = ttk.Combobox(profile_frame, textvariable=self.profile_var, state="readonly")
+        self.profile_combobox.grid(row=0, column=0, padx=5, pady=5, sticky="ew")
+        self.profile_combobox.bind("<<ComboboxSelected>>", lambda event: self._set_selected_profile(self.profile_var.get()))
+        ttk.Button(profile_frame, text="Edit Profiles...", command=self._open_block_profiles).grid(row=0, column=1, padx=5, pady=5, sticky="e")
+
         durations_frame = ttk.LabelFrame(self, text="Edit Session Durations (minutes)")
-        durations_frame.grid(row=5, column=0, columnspan=3, padx=10, pady=10, sticky="ew") # Changed row to 5
+        durations_frame.grid(row=6, column=0, columnspan=3, padx=10, pady=10, sticky="ew") # Changed row to 6
         # ... (rest of durations_frame setup as before, including labels and buttons) ...
         durations_frame.grid_columnconfigure(0, weight=1) 
         durations_frame.grid_columnconfigure(1, weight=0) 
@@ -406,9 +886,12 @@ class SequenceEditorWindow(tk.Toplevel):
         self.eating_break_duration_label = ttk.Label(durations_frame, text="")
         self.eating_break_duration_label.grid(row=3, column=0, padx=5, pady=2, sticky="w")
         ttk.Button(durations_frame, text="Edit Eating Break", command=self._edit_eating_break_duration_in_editor).grid(row=3, column=1, padx=5, pady=2, sticky="e")
+        self.pre_block_lead_label = ttk.Label(durations_frame, text="")
+        self.pre_block_lead_label.grid(row=4, column=0, padx=5, pady=2, sticky="w")
+        ttk.Button(durations_frame, text="Edit Lead Time", command=self._edit_pre_block_lead_in_editor).grid(row=4, column=1, padx=5, pady=2, sticky="e")
 
         action_buttons_frame = ttk.Frame(self)
-        action_buttons_frame.grid(row=6, column=0, columnspan=3, padx=10, pady=(10,10), sticky="sew") # Changed row to 6
+        action_buttons_frame.grid(row=7, column=0, columnspan=3, padx=10, pady=(10,10), sticky="sew") # Changed row to 7
         # ... (rest of action_buttons_frame setup as before) ...
         action_buttons_frame.grid_columnconfigure(0, weight=1)
         action_buttons_frame.grid_columnconfigure(1, weight=1)
@@ -424,8 +907,52 @@ class SequenceEditorWindow(tk.Toplevel):
 
         self._refresh_duration_displays()
         self._refresh_listbox() # This will now also call the total time calculation
+        self._refresh_profile_choices()
         self.protocol("WM_DELETE_WINDOW", self.destroy)
 
+    def _refresh_profile_choices(self):
+        self.profile_combobox.config(values=list(RESERVED_BLOCK_PROFILES) + sorted(self.app_controller.block_profiles))
+        self._show_selected_profile()
+
+    def _selected_index(self):
+        selected_indices = self.sequence_listbox.curselection()
+        if not selected_indices or selected_indices[0] >= len(self.editable_sequence):
+            return None
+        return selected_indices[0]
+
+    def _show_selected_profile(self):
+        index = self._selected_index()
+        if index is None:
+            self.profile_var.set("")
+            self.profile_combobox.state(["disabled"])
+            return
+        self.profile_combobox.state(["!disabled", "readonly"])
+        self.profile_var.set(item_block_profile(self.editable_sequence[index]))
+
+    def _set_selected_profile(self, profile):
+        index = self._selected_index()
+        if index is None:
+            return
+        item = {key: value for key, value in self.editable_sequence[index].items() if key != 'profile'}
+        if profile != item_block_profile(item): # Only a non-default choice is stored on the item
+            item['profile'] = profile
+        self.editable_sequence[index] = item
+        self._refresh_listbox()
+        self.sequence_listbox.selection_set(index)
+        self.sequence_listbox.activate(index)
+
+    def _open_block_profiles(self):
+        BlockProfilesWindow(self, self.app_controller, on_change=self._on_block_profiles_changed)
+
+    def _on_block_profiles_changed(self):
+        # Items using a deleted profile fall back to their default
+        known = set(RESERVED_BLOCK_PROFILES) | set(self.app_controller.block_profiles)
+        self.editable_sequence = [item if item.get('profile', DEFAULT_BLOCK_PROFILE) in known
+                                  else {key: value for key, value in item.items() if key != 'profile'}
+                                  for item in self.editable_sequence]
+        self._refresh_listbox()
+        self._refresh_profile_choices()
+
     
     def _format_total_time(self, total_minutes):
         if total_minutes < 0:
@@ -484,6 +1011,7 @@ class SequenceEditorWindow(tk.Toplevel):
         self.short_break_duration_label.config(text=f"Short Break Duration: {self.app_controller.short_break_duration_minutes} min")
         self.long_break_duration_label.config(text=f"Long Break Duration: {self.app_controller.long_break_duration_minutes} min")
         self.eating_break_duration_label.config(text=f"Eating Break Duration: {self.app_controller.eating_break_duration_minutes} min")
+        self.pre_block_lead_label.config(text=f"Re-block Before Focus: {self.app_controller.engine.pre_focus_block_lead_seconds} s before the break ends")
 
     def _edit_focus_duration_in_editor(self):
         new_duration = simpledialog.askinteger(
@@ -534,6 +1062,17 @@ class SequenceEditorWindow(tk.Toplevel):
             self._refresh_listbox()
 
 
+    def _edit_pre_block_lead_in_editor(self):
+        new_lead = simpledialog.askinteger(
+            "Re-block Lead Time", "Seconds before a break ends to re-block sites for the next focus session (0-60):",
+            parent=self, minvalue=0, maxvalue=60,
+            initialvalue=self.app_controller.engine.pre_focus_block_lead_seconds
+        )
+        if new_lead is not None:
+            self.app_controller.engine.pre_focus_block_lead_seconds = new_lead
+            self.app_controller._save_settings()
+            self._refresh_duration_displays()
+
     def _refresh_listbox(self):
         self.sequence_listbox.delete(0, tk.END)
 
@@ -553,7 +1092,8 @@ class SequenceEditorWindow(tk.Toplevel):
 
             current_projected_time += datetime.timedelta(minutes=duration_minutes)
             time_str = current_projected_time.strftime("%H:%M")
-            self.sequence_listbox.insert(tk.END, f"{i+1}. {display_name} — {time_str}")
+            profile_str = f"  [blocks {item['profile']}]" if item.get('profile') else ""
+            self.sequence_listbox.insert(tk.END, f"{i+1}. {display_name} — {time_str}{profile_str}")
 
         self._calculate_and_display_total_sequence_time()
 
@@ -653,12 +1193,18 @@ class PomodoroWebsiteBlocker:
         estimated_height = 10 + 30 + 20 + ICON_SIZE + 20 + CIRCLE_CANVAS_SIZE + 20 + 30 + XP_BAR_HEIGHT + 30 + 20
         self.root.geometry(f"350x{estimated_height}")
 
+        # Session/sequence state machine; this window is one of its subscribers.
+        self.engine = PomodoroEngine(self.root.after, self.root.after_cancel, self._get_duration_for_type)
+        self.engine.confirm_start = self._confirm_session_start
         self.custom_sequence = [] 
         self.current_sequence_index = -1
 
 
-        if not self._is_admin():
-            messagebox.showerror("Admin Privileges Required", "This application must be run with sudo privileges.")
+        # Without root, the hosts file is edited by the resident helper daemon (hosts_helper.py) if one is running.
+        self.hosts_helper = None if self._is_admin() else connect_helper(HELPER_SOCKET_PATH)
+        if not self._is_admin() and self.hosts_helper is None:
+            messagebox.showerror("Admin Privileges Required", "This application must be run with sudo privileges, "
+                                 f"or with the hosts helper (hosts_helper.py) running as root on {HELPER_SOCKET_PATH}.")
             self.root.destroy(); return
 
         self._initialize_durations()
@@ -669,28 +1215,65 @@ class PomodoroWebsiteBlocker:
         self.current_art_piece_id = None
         self.current_art_progress = 0    # Symbols revealed for the current piece
         self.last_xp_full_date_str = None # Store as YYYY-MM-DD string
+        self.pomodoro_count = 0
 
+        # Blocking backend: "hosts" (edit /etc/hosts) or "dns" (local stub resolver, see dns_blocker.py).
+        # None for the port/upstream means dns_blocker's defaults.
+        self.blocking_backend = "hosts"
+        self.dns_listen_port = None
+        self.dns_upstream = None
+        # What the companion browser extension does with tabs on newly blocked sites: "reload" or "close".
+        self.browser_tab_action = "reload"
+        # Named domain lists sequence items can block instead of the main block list ({name: [domains]}).
+        self.block_profiles = {}
+        # What is blocked once every queued hosts write is done; each transition only touches the domains that differ from it.
+        self.active_block_profile = NO_BLOCK_PROFILE
+        self.active_block_domains = set()
+        # What the writes done so far blocked, and the (block, unblock, profile) changes still queued.
+        self._written_block_profile = NO_BLOCK_PROFILE
+        self._written_block_domains = set()
+        self._queued_block_changes = []
+
+        # Writes are coalesced: changes within SETTINGS_SAVE_DELAY_MS share one write of the dirty file(s).
+        self.settings_store = SettingsStore(CONFIG_FILE_PATH, STATE_FILE_PATH, schedule=self.root.after,
+                                            cancel=self.root.after_cancel, on_error=self._show_settings_save_error)
         self._load_settings() # This will now also load custom_sequence
 
-        self._timer_id = None
         self.block_list_manager_window = None
         self.sequence_editor_window = None
         self.notification_window = None
-        self.reload_attempted_early = False
 
-        self.blocked_websites = set()
-        self.pomodoro_count = 0
-        self.timer_running = False
-        self.timer_paused = False
-        self.current_state = "Idle"
-        self.current_break_type = ""
-        self.remaining_seconds = 0
-        self.total_seconds_for_session = 0
-        self._timer_id = None
+        # Snapshot + journal on disk; its DomainMatcher keeps every entry (collapse=False)
+        # because the hosts file cannot cover subdomains of a listed domain.
+        self.block_list_store = BlockListStore(BLOCK_LIST_FILE_PATH, dispatch=lambda fn: self.root.after(0, fn))
+        # HelperClient.apply has the same contract as HostsFileEngine.apply, so the worker drives either.
+        self.hosts_engine = self.hosts_helper or HostsFileEngine(HOSTS_FILE_PATH)
+        if self.hosts_helper:
+            print(f"Editing the hosts file through the helper on {HELPER_SOCKET_PATH}.")
+        # All hosts file I/O runs on this worker; results come back through root.after.
+        self.hosts_worker = HostsWorker(self.hosts_engine, dispatch=lambda fn: self.root.after(0, fn))
+        # After each commit: flush the local resolver caches and log how long until blocked names redirect.
+        # Flushing needs root too, so an unprivileged app asks the helper to do it.
+        self.resolver_caches = ResolverCacheManager(flushers=[HelperCacheFlusher(self.hosts_helper)] if self.hosts_helper else None)
+        # One audio service for the app's lifetime: each sound is decoded once and can be cut off instantly.
+        self.audio = AudioService(dispatch=lambda fn: self.root.after(0, fn),
+                                  load_fallback_player=lambda: _load_optional_backend("playsound"))
+        self.root.after(1000, lambda: self.audio.preload([SOUND_FOCUS_COMPLETE, SOUND_BREAK_COMPLETE]))
+        self.dns_blocker = None
+        self._start_blocking_backend()
+        # WebSocket server for the browser extension; started after the window is up (it imports asyncio).
+        self.browser_bridge = None
+        self.root.after(1000, self._start_browser_bridge)
+        # Every start/pause/stop/completion goes to a SQLite history, written in batches off this thread.
+        self.session_history = SessionHistory(on_commit=lambda days: self.root.after(0, lambda: self._on_history_committed(days)))
+        self.session_history.attach(self.engine)
+        self.statistics_window = None
+        self.focus_heatmap = None # FocusHeatmap kept across StatisticsWindow openings
         self.block_list_manager_window = None
 
         self._create_menubar()
         self._setup_ui()
+        self._subscribe_to_engine()
 
         self._update_current_art_piece() # Determine first/next art piece
         self._update_streak_display()
@@ -713,7 +1296,8 @@ class PomodoroWebsiteBlocker:
         # self._load_settings()
         # --- END MODIFICATION ---
 
-        self.root.bind("<Configure>", self._on_window_resize)
+        # Bound on the XP canvas itself: a root binding also fires for every child widget's <Configure>.
+        self.xp_bar_canvas.bind("<Configure>", self._on_window_resize)
 
     # --- MODIFICATION: Removed first (incomplete/buggy) definitions of _load_settings, _save_settings, _reset_to_default_settings_and_save ---
     # Old _load_settings was here (approx lines 194-233) - REMOVED
@@ -721,6 +1305,143 @@ class PomodoroWebsiteBlocker:
     # Old _reset_to_default_settings_and_save was here (approx lines 249-257) - REMOVED
     # --- END MODIFICATION ---
 
+    # --- Session state lives in the engine; these keep the window's existing attribute names ---
+    @property
+    def custom_sequence(self): return self.engine.sequence
+    @custom_sequence.setter
+    def custom_sequence(self, value): self.engine.sequence = value
+
+    @property
+    def current_sequence_index(self): return self.engine.sequence_index
+    @current_sequence_index.setter
+    def current_sequence_index(self, value): self.engine.sequence_index = value
+
+    @property
+    def timer_running(self): return self.engine.timer_running
+    @property
+    def timer_paused(self): return self.engine.timer_paused
+    @property
+    def current_state(self): return self.engine.current_state
+    @property
+    def current_break_type(self): return self.engine.current_break_type
+    @property
+    def remaining_seconds(self): return self.engine.remaining_seconds
+    @property
+    def total_seconds_for_session(self): return self.engine.total_seconds
+    @property
+    def blocked_websites(self): return self.block_list_store.domains
+
+    def _subscribe_to_engine(self):
+        self.engine.subscribe("tick", lambda remaining, total: self._update_timer_display())
+        self.engine.subscribe("state_changed", self._update_ui_for_timer_state)
+        self.engine.subscribe("state_changed", self._save_settings) # Keeps current_session in the state file
+        self.engine.subscribe("block_requested", self._on_engine_block_requested)
+        self.engine.subscribe("unblock_requested", self._on_engine_unblock_requested)
+        self.engine.subscribe("pre_focus_block", self._on_engine_pre_focus_block)
+        # Once this session's own blocking is queued, prepare the hosts image for where it goes next.
+        self.engine.subscribe("session_started", lambda session: self.root.after_idle(self._stage_next_transition))
+        self.engine.subscribe("session_completed", self._handle_natural_session_completion)
+        self.engine.subscribe("sequence_finished", self._on_sequence_finished)
+
+    def _confirm_session_start(self, state_name, break_type_name):
+        index = self.current_sequence_index
+        item = self.custom_sequence[index] if 0 <= index < len(self.custom_sequence) else {'type': "Focus"}
+        if state_name == "Focus" and not self._profile_domains(item_block_profile(item)):
+            return messagebox.askyesno("No Websites Blocked", "This session's block list is empty. Start focus session anyway?", parent=self.root)
+        return True
+
+    def _on_engine_block_requested(self, profile):
+        self._apply_block_profile(profile, on_complete=self._push_blocked_tabs, deadline=self.engine.transition_deadline)
+
+    def _on_engine_unblock_requested(self, next_profile):
+        # Sites the next session also blocks (e.g. a break that keeps some) stay blocked throughout.
+        self._apply_block_profile(next_profile, on_complete=self._push_blocked_tabs, deadline=self.engine.transition_deadline)
+
+    def _on_engine_pre_focus_block(self, profile):
+        if not self._profile_domains(profile):
+            print("Next session will be Focus, but its block list is empty. Skipping reload.")
+            self._apply_block_profile(profile, deadline=self.engine.transition_deadline)
+            return
+        print("Next session will be Focus. Re-blocking websites now and attempting browser reload.")
+        # The reload runs once the hosts worker has written the change, outside the tick.
+        self._apply_block_profile(profile, deadline=self.engine.transition_deadline,
+                                  on_complete=lambda newly_blocked: self._push_blocked_tabs(newly_blocked, fallback=self._simulate_browser_reload))
+
+    # --- Block profiles ---
+    def _profile_domains(self, profile):
+        return block_profile_domains(profile, self.block_profiles, self.blocked_websites)
+
+    def _apply_block_profile(self, profile, on_complete=None, deadline=None):
+        """Moves what is blocked to profile's domains with one update that touches only the domains that differ."""
+        target = self._profile_domains(profile)
+        to_block = target - self.active_block_domains
+        to_unblock = self.active_block_domains - target
+        if to_block or to_unblock or profile != self.active_block_profile:
+            print(f"Block profile: {self.active_block_profile} -> {profile} "
+                  f"({len(to_block)} domains to block, {len(to_unblock)} to unblock, {len(target & self.active_block_domains)} unchanged)")
+        self.active_block_profile = profile
+        self.active_block_domains = target
+        if to_block or to_unblock:
+            self._queue_block_change(to_block, to_unblock, profile, on_complete=on_complete, deadline=deadline)
+        else:
+            if not self._queued_block_changes:
+                self._written_block_profile = profile
+            if on_complete:
+                on_complete([])
+
+    def _queue_block_change(self, to_block, to_unblock, profile=None, on_complete=None, deadline=None):
+        """
+        Writes a change already made to active_block_domains (and to the
+        profile, unless None). If the write fails, the active state is rebuilt
+        from the writes that succeeded plus the changes still queued, so later
+        diffs and staged images start from what the hosts file really holds.
+        """
+        change = (to_block, to_unblock, profile)
+        self._queued_block_changes.append(change)
+        def written(added):
+            self._queued_block_changes.remove(change)
+            self._written_block_domains = (self._written_block_domains - to_unblock) | to_block
+            if profile is not None:
+                self._written_block_profile = profile
+            if on_complete:
+                on_complete(added)
+        def failed(error):
+            self._queued_block_changes.remove(change)
+            domains, active_profile = self._written_block_domains, self._written_block_profile
+            for block, unblock, queued_profile in self._queued_block_changes:
+                domains = (domains - unblock) | block
+                if queued_profile is not None:
+                    active_profile = queued_profile
+            self.active_block_domains, self.active_block_profile = set(domains), active_profile
+            self._stage_next_transition() # A staged image may have been diffed from the failed target
+        self._update_blocked_domains(to_block, to_unblock, on_complete=written, deadline=deadline, on_error=failed)
+
+    def _stage_next_transition(self):
+        """Renders and validates the hosts image for the session's next transition now, so the boundary is one rename."""
+        if self.dns_blocker or not self.timer_running:
+            return # The DNS backend switches in memory; nothing to prepare
+        target = self._profile_domains(self.engine.next_block_profile())
+        block_hosts, unblock_hosts = self._hosts_for_update(target - self.active_block_domains, self.active_block_domains - target)
+        if block_hosts or unblock_hosts:
+            self.hosts_worker.stage(block_hosts, unblock_hosts)
+
+    def set_block_profile(self, name, domains):
+        self.block_profiles = dict(self.block_profiles, **{name: sorted(domains)})
+        self._save_settings()
+
+    def delete_block_profile(self, name):
+        self.block_profiles = {key: value for key, value in self.block_profiles.items() if key != name}
+        # Items that used it go back to their default profile (new dicts, so the settings store sees the change).
+        if any(item.get('profile') == name for item in self.custom_sequence):
+            self.custom_sequence = [{key: value for key, value in item.items() if key != 'profile'} if item.get('profile') == name else item
+                                    for item in self.custom_sequence]
+        self._save_settings()
+
+    def _on_sequence_finished(self):
+        self.root.lift()
+        self.root.focus_force()
+        messagebox.showinfo("Sequence Complete", "The defined Pomodoro sequence has finished!", parent=self.root)
+
     def _get_duration_for_type(self, session_type_str):
         if session_type_str == "Focus":
             return self.focus_duration_minutes
@@ -736,38 +1457,14 @@ class PomodoroWebsiteBlocker:
         
     def _play_sound_with_callback_on_finish(self, sound_file_path_obj, on_finish_callback=None):
         """
-        Plays a sound in a separate thread.
-        Executes on_finish_callback in the main Tkinter thread when sound finishes or if an error occurs.
+        Plays a sound through the shared audio service without blocking.
+        Executes on_finish_callback in the main Tkinter thread when sound finishes or if an error occurs
+        (not when the sound is stopped with _stop_sound).
         """
-        if not PLAYSOUND_AVAILABLE:
-            if on_finish_callback:
-                # If sounds are disabled, trigger callback immediately to allow logic to proceed
-                self.root.after(0, on_finish_callback)
-            return
-
-        def play_and_callback():
-            sound_file_str = "" # Initialize for finally block
-            try:
-                sound_file_str = str(sound_file_path_obj) # playsound needs string
-                if sound_file_path_obj.exists():
-                    print(f"Playing sound (with callback): {sound_file_str}")
-                    playsound(sound_file_str) # This is blocking within this thread
-                    print(f"Finished playing sound: {sound_file_str}")
-                else:
-                    print(f"Sound file not found (with callback): {sound_file_str}")
-            except Exception as e:
-                print(f"Error playing sound '{sound_file_str}' (with callback): {e}")
-            finally:
-                # Ensure callback happens even if sound fails, so the repeat logic isn't stuck
-                if on_finish_callback and hasattr(self.root, 'winfo_exists') and self.root.winfo_exists():
-                    # Schedule the callback to run in the main Tkinter thread
-                    self.root.after(0, on_finish_callback)
-                elif on_finish_callback: # Fallback if root doesn't exist (should not happen in this context)
-                    print("Root window for callback no longer exists.")
-
+        self.audio.play(sound_file_path_obj, on_finish_callback)
 
-        sound_thread = threading.Thread(target=play_and_callback, daemon=True)
-        sound_thread.start()
+    def _stop_sound(self):
+        self.audio.stop()
 
     def _update_current_art_piece(self):
         """Determines and sets the current art piece the user is working on."""
@@ -808,8 +1505,31 @@ class PomodoroWebsiteBlocker:
             if hasattr(self, '_update_streak_display'): # Check if UI method exists
                 self._update_streak_display()
 
+    def _push_blocked_tabs(self, newly_blocked, fallback=None):
+        """
+        Sends the newly blocked domains to the browser extension, which reloads
+        or closes just the tabs on them. Without a connected extension, runs
+        fallback (the keystroke reload) instead.
+        """
+        if self.browser_bridge is not None and self.browser_bridge.client_count:
+            if newly_blocked:
+                self.browser_bridge.push_blocked(newly_blocked, self.browser_tab_action)
+        elif fallback:
+            fallback()
+
+    def _start_browser_bridge(self):
+        from browser_bridge import BrowserBridge # asyncio is imported here, after the window is up
+        bridge = BrowserBridge()
+        try:
+            bridge.start()
+        except OSError as e:
+            print(f"Browser bridge not available ({e}); tab reloads fall back to keystrokes.")
+            return
+        self.browser_bridge = bridge
+
     def _simulate_browser_reload(self):
-        if not PYAUTOGUI_AVAILABLE:
+        pyautogui = _load_optional_backend("pyautogui")
+        if pyautogui is None:
             print("pyautogui library is not available. Skipping browser reload simulation.")
             # Optionally, inform the user via a non-blocking way if this is critical
             # messagebox.showinfo("Info", "pyautogui library not found. Browser reload cannot be simulated.", parent=self.root)
@@ -854,56 +1574,7 @@ class PomodoroWebsiteBlocker:
              messagebox.showinfo("Sequence Info", "No custom sequence defined. Please configure one or use manual mode.", parent=self.root)
              self._reset_session_end_actions() 
              return
-
-        self.current_sequence_index += 1 
-
-        if self.current_sequence_index < len(self.custom_sequence):
-            next_session_item = self.custom_sequence[self.current_sequence_index]
-            next_session_type_str = next_session_item['type']
-            next_session_display_name = next_session_item['name']
-            duration_minutes = self._get_duration_for_type(next_session_type_str)
-
-            # ... (session_name_for_log, next_up_message, print statements - these are fine) ...
-            session_name_for_log = f"{next_session_display_name} (Type: {next_session_type_str}, {duration_minutes} min)" 
-            next_up_message = f"Next in sequence: {session_name_for_log}"
-            if self.current_sequence_index + 1 < len(self.custom_sequence):
-                next_next_session_item = self.custom_sequence[self.current_sequence_index + 1]
-                next_up_message += f"\nFollowing that: {next_next_session_item['name']}"
-            else:
-                next_up_message += "\nThis is the last session in the sequence."
-            print(next_up_message)
-            
-            self.timer_running = False # Ensure these are not commented out
-            self.current_state = "Idle"  # Ensure these are not commented out
-            success = False
-            
-            if next_session_type_str == "Focus":
-                success = self._start_session_common("Focus", "", duration_minutes)
-                #if success: # If focus session started successfully (sites are now blocked)
-                #    self.root.after(100, self._simulate_browser_reload) # Call after a very brief delay
-            elif next_session_type_str == "Short Break":
-                success = self._start_session_common("Break", "Short", duration_minutes)
-            elif next_session_type_str == "Long Break":
-                success = self._start_session_common("Break", "Long", duration_minutes)
-            elif next_session_type_str == "Eating Break":
-                success = self._start_session_common("Break", "Eating", duration_minutes)
-            else:
-                print(f"Error: Encountered unknown session type '{next_session_type_str}' during sequence progression.")
-                self._reset_session_end_actions()
-                self.current_sequence_index = -1
-                return
-
-            if not success:
-                print("Could not start the next session in the sequence. Sequence interrupted.")
-                self._reset_session_end_actions()
-                self.current_sequence_index = -1
-        else:
-            # ... (sequence finished logic - this is fine) ...
-            self.root.lift()
-            self.root.focus_force()
-            messagebox.showinfo("Sequence Complete", "The defined Pomodoro sequence has finished!", parent=self.root)
-            self._reset_session_end_actions()
-            self.current_sequence_index = -1
+        self.engine.advance()
 
     def _initialize_durations(self):
         """Sets default durations for all timers."""
@@ -915,6 +1586,16 @@ class PomodoroWebsiteBlocker:
 
     def _setup_ui(self):
         """Creates and grids all UI elements for the main window."""
+        # Canvas items are created on first draw and then updated in place (see _draw_* methods).
+        self._xp_bar_items = None
+        self._xp_bar_geometry = None
+        self._xp_label_text = None
+        self._xp_bar_redraw_pending = False
+        self._stop_icon_item = None
+        self._stop_icon_color = None
+        self._pause_play_items = None
+        self._pause_play_icon_state = None
+        self._timer_display_state = {}
         ttk.Separator(self.root, orient='horizontal').grid(row=0, column=0, columnspan=4, sticky='ew', pady=5)
         self.timer_label = ttk.Label(self.root, text="Status: Idle", font=("Helvetica", 14, "italic"))
         self.timer_label.grid(row=1, column=0, columnspan=4, padx=10, pady=(10,0))
@@ -978,14 +1659,21 @@ class PomodoroWebsiteBlocker:
         self.streak_display_label.config(text=display_text)
 
     def _on_window_resize(self, event=None):
+        # Coalesce bursts of resize events into one redraw when Tk is next idle.
+        if self._xp_bar_redraw_pending:
+            return
         if hasattr(self, 'xp_bar_canvas') and self.xp_bar_canvas.winfo_exists():
-            self.xp_bar_canvas.after_idle(self._draw_xp_bar)
+            self._xp_bar_redraw_pending = True
+            self.xp_bar_canvas.after_idle(self._redraw_xp_bar_after_resize)
 
-    def _create_rounded_rect(self, canvas, x1, y1, x2, y2, radius, **kwargs):
-        if x2 < x1 or y2 < y1: return None
+    def _redraw_xp_bar_after_resize(self):
+        self._xp_bar_redraw_pending = False
+        self._draw_xp_bar()
+
+    def _rounded_rect_points(self, x1, y1, x2, y2, radius):
         radius = min(radius, (x2 - x1) / 2, (y2 - y1) / 2)
         if radius < 0: radius = 0
-        points = [
+        return [
             x1 + radius, y1, x2 - radius, y1,
             x2 - radius, y1, x2, y1, x2, y1 + radius,
             x2, y1 + radius, x2, y2 - radius,
@@ -995,17 +1683,22 @@ class PomodoroWebsiteBlocker:
             x1, y2 - radius, x1, y1 + radius,
             x1, y1 + radius, x1, y1, x1 + radius, y1,
         ]
-        return canvas.create_polygon(points, **kwargs, smooth=True)
+
+    def _create_rounded_rect(self, canvas, x1, y1, x2, y2, radius, **kwargs):
+        if x2 < x1 or y2 < y1: return None
+        return canvas.create_polygon(self._rounded_rect_points(x1, y1, x2, y2, radius), **kwargs, smooth=True)
 
     def _create_menubar(self):
         menubar = tk.Menu(self.root)
         edit_menu = tk.Menu(menubar, name='edit', tearoff=0)
         edit_menu.add_command(label="Manage Blocked Websites...", command=self._open_block_list_manager)
+        edit_menu.add_command(label="Export Block List...", command=self._export_block_list)
         edit_menu.add_separator()
         edit_menu.add_command(label="Edit Pomodoro Sequence...", command=self._open_sequence_editor) # New Menu Item
 
         achievements_menu = tk.Menu(menubar, name='achievements', tearoff=0)
         achievements_menu.add_command(label="View Unlocked Art", command=self._open_achievements_viewer)
+        achievements_menu.add_command(label="Statistics...", command=self._open_statistics)
         menubar.add_cascade(label="Achievements", menu=achievements_menu) # Add it as a top-level menu
 
         menubar.add_cascade(label="Edit", menu=edit_menu)
@@ -1033,35 +1726,73 @@ class PomodoroWebsiteBlocker:
             self._achievements_window.lift()
             self._achievements_window.focus_set()
 
+    def _open_statistics(self):
+        if self.statistics_window is None or not self.statistics_window.winfo_exists():
+            self.statistics_window = StatisticsWindow(self.root, self)
+        else:
+            self.statistics_window.lift()
+            self.statistics_window.focus_set()
+
+    def _on_history_committed(self, days):
+        """The history rollups changed for these days: mark their heatmap cells and refresh an open window."""
+        if self.focus_heatmap is not None:
+            self.focus_heatmap.dirty_days.update(days)
+        if self.statistics_window is not None and self.statistics_window.winfo_exists():
+            self.statistics_window.refresh()
+
     def _draw_xp_bar(self):
+        """Updates the XP bar in place; its canvas items are created once and only moved/hidden afterwards."""
         if not hasattr(self, 'xp_bar_canvas') or not self.xp_bar_canvas.winfo_exists(): return
-        self.xp_bar_canvas.delete("all")
-        canvas_width = self.xp_bar_canvas.winfo_width()
+        canvas = self.xp_bar_canvas
+        canvas_width = canvas.winfo_width()
         if canvas_width <= 20: canvas_width = 400
         bar_x_start = 10
         bar_y_start = 5
         bar_width = canvas_width - (bar_x_start * 2)
         if bar_width <= 0: return
-        self._create_rounded_rect(self.xp_bar_canvas, bar_x_start, bar_y_start,
-                                  bar_x_start + bar_width, bar_y_start + XP_BAR_HEIGHT,
-                                  XP_BAR_CORNER_RADIUS, fill=XP_BAR_BG_COLOR, outline=XP_BAR_BG_COLOR)
         xp_percentage = 0.0
         if self.pomodoros_for_full_xp > 0:
             xp_percentage = min(self.pomodoro_count / self.pomodoros_for_full_xp, 1.0)
         filled_width = bar_width * xp_percentage
+
+        label_text = f"XP: {self.pomodoro_count} / {self.pomodoros_for_full_xp} Pomodoros"
+        if label_text != self._xp_label_text:
+            self.pomodoros_completed_label.config(text=label_text)
+            self._xp_label_text = label_text
+
+        geometry = (bar_width, filled_width)
+        if geometry == self._xp_bar_geometry:
+            return # Nothing moved: no Tcl calls at all
+        self._xp_bar_geometry = geometry
+
+        if self._xp_bar_items is None:
+            self._xp_bar_items = {
+                'bg': self._create_rounded_rect(canvas, 0, 0, 1, 1, 0, fill=XP_BAR_BG_COLOR, outline=XP_BAR_BG_COLOR),
+                'fg': self._create_rounded_rect(canvas, 0, 0, 1, 1, 0, fill=XP_BAR_FG_COLOR, outline=XP_BAR_FG_COLOR),
+                'highlight': canvas.create_line(0, 0, 1, 0, fill=XP_BAR_HIGHLIGHT_COLOR, width=1),
+            }
+        items = self._xp_bar_items
+
+        canvas.coords(items['bg'], *self._rounded_rect_points(bar_x_start, bar_y_start,
+                                                               bar_x_start + bar_width, bar_y_start + XP_BAR_HEIGHT,
+                                                               XP_BAR_CORNER_RADIUS))
         if filled_width > 0:
-            self._create_rounded_rect(self.xp_bar_canvas, bar_x_start, bar_y_start,
-                                      bar_x_start + filled_width, bar_y_start + XP_BAR_HEIGHT,
-                                      XP_BAR_CORNER_RADIUS, fill=XP_BAR_FG_COLOR, outline=XP_BAR_FG_COLOR)
-            highlight_thickness = 1
-            if filled_width > XP_BAR_CORNER_RADIUS * 2 and XP_BAR_HEIGHT > highlight_thickness * 2:
-                self.xp_bar_canvas.create_line(
-                    bar_x_start + XP_BAR_CORNER_RADIUS, bar_y_start + highlight_thickness,
-                    bar_x_start + filled_width - XP_BAR_CORNER_RADIUS, bar_y_start + highlight_thickness,
-                    fill=XP_BAR_HIGHLIGHT_COLOR, width=highlight_thickness
-                )
-        self.pomodoros_completed_label.config(text=f"XP: {self.pomodoro_count} / {self.pomodoros_for_full_xp} Pomodoros")
-    
+            canvas.coords(items['fg'], *self._rounded_rect_points(bar_x_start, bar_y_start,
+                                                                   bar_x_start + filled_width, bar_y_start + XP_BAR_HEIGHT,
+                                                                   XP_BAR_CORNER_RADIUS))
+            canvas.itemconfigure(items['fg'], state=tk.NORMAL)
+        else:
+            canvas.itemconfigure(items['fg'], state=tk.HIDDEN)
+
+        highlight_thickness = 1
+        if filled_width > XP_BAR_CORNER_RADIUS * 2 and XP_BAR_HEIGHT > highlight_thickness * 2:
+            canvas.coords(items['highlight'],
+                          bar_x_start + XP_BAR_CORNER_RADIUS, bar_y_start + highlight_thickness,
+                          bar_x_start + filled_width - XP_BAR_CORNER_RADIUS, bar_y_start + highlight_thickness)
+            canvas.itemconfigure(items['highlight'], state=tk.NORMAL)
+        else:
+            canvas.itemconfigure(items['highlight'], state=tk.HIDDEN)
+
     def _handle_xp_bar_full(self):
         """Called when pomodoro_count reaches pomodoros_for_full_xp."""
         print("XP bar is full. Processing streak.")
@@ -1175,16 +1906,16 @@ class PomodoroWebsiteBlocker:
 
     def _start_automatic_focus_session(self):
         print("Starting automatic focus session.")
-        self.timer_running = False
-        self.current_state = "Idle"
         if not self._start_session_common("Focus", "", self.focus_duration_minutes):
             self._reset_session_end_actions()
 
     def _update_timer_display(self):
         mins, secs = divmod(max(0, self.remaining_seconds), 60)
         time_format = f"{int(mins):02d}:{int(secs):02d}"
-        if hasattr(self, 'time_text_id') and self.time_text_id:
+        shown = self._timer_display_state
+        if hasattr(self, 'time_text_id') and self.time_text_id and shown.get('text') != time_format:
              self.timer_canvas.itemconfig(self.time_text_id, text=time_format)
+             shown['text'] = time_format
         progress_extent = 0
         current_fg_color = CIRCLE_FG_COLOR_FOCUS
         if self.timer_running and self.total_seconds_for_session > 0:
@@ -1197,7 +1928,13 @@ class PomodoroWebsiteBlocker:
             elif self.current_state == "Break":
                 current_fg_color = CIRCLE_FG_COLOR_BREAK
         if hasattr(self, 'progress_arc_id') and self.progress_arc_id:
-            self.timer_canvas.itemconfig(self.progress_arc_id, extent=-progress_extent, outline=current_fg_color)
+            arc = (-progress_extent, current_fg_color)
+            if shown.get('arc') != arc: # Only the extent changes between ticks; the color only on transitions
+                if shown.get('arc', (None, None))[1] != current_fg_color:
+                    self.timer_canvas.itemconfig(self.progress_arc_id, extent=arc[0], outline=current_fg_color)
+                else:
+                    self.timer_canvas.itemconfig(self.progress_arc_id, extent=arc[0])
+                shown['arc'] = arc
         if hasattr(self, 'timer_label'):
             status_text = "Status: Idle"
             if self.timer_running:
@@ -1209,36 +1946,42 @@ class PomodoroWebsiteBlocker:
                     break_duration_attr = f"{self.current_break_type.lower()}_break_duration_minutes"
                     current_break_total_duration = getattr(self, break_duration_attr, self.short_break_duration_minutes)
                     status_text = f"Status: {self.current_break_type} Break ({current_break_total_duration} min)"
-            self.timer_label.config(text=status_text)
+            if shown.get('status') != status_text:
+                self.timer_label.config(text=status_text)
+                shown['status'] = status_text
 
     # --- MODIFICATION: This is now the primary (and only) _load_settings method ---
     def _load_settings(self):
         try:
-            if CONFIG_FILE_PATH.exists():
-                with open(CONFIG_FILE_PATH, "r", encoding='utf-8') as f:
-                    settings = json.load(f)
+            # Cold config and hot state come from separate files; older layouts are migrated on the way in.
+            config, state = self.settings_store.load()
+            if config is not None:
+                settings = dict(config, **state)
                 # ... (loading durations, custom_sequence as before) ...
                 self.focus_duration_minutes = int(settings.get("focus_duration_minutes", self.focus_duration_minutes))
                 self.short_break_duration_minutes = int(settings.get("short_break_duration_minutes", self.short_break_duration_minutes))
                 self.long_break_duration_minutes = int(settings.get("long_break_duration_minutes", self.long_break_duration_minutes))
                 self.eating_break_duration_minutes = int(settings.get("eating_break_duration_minutes", self.eating_break_duration_minutes))
 
-                loaded_sequence_raw = settings.get("custom_sequence", DEFAULT_SEQUENCE)
-                # ... (sequence loading logic as before) ...
-                if not loaded_sequence_raw: # Handle empty sequence from file
-                    self.custom_sequence = list(DEFAULT_SEQUENCE) 
-                elif isinstance(loaded_sequence_raw, list) and loaded_sequence_raw and isinstance(loaded_sequence_raw[0], str):
-                    self.custom_sequence = [{'type': item_str, 'name': item_str} for item_str in loaded_sequence_raw]
-                elif isinstance(loaded_sequence_raw, list) and all(isinstance(item, dict) and 'type' in item and 'name' in item for item in loaded_sequence_raw):
-                    self.custom_sequence = loaded_sequence_raw 
-                else: 
-                    self.custom_sequence = list(DEFAULT_SEQUENCE) 
+                self.custom_sequence = normalize_sequence(settings.get("custom_sequence", DEFAULT_SEQUENCE))
 
                 # Load Streak Data
                 self.unlocked_achievements = settings.get("unlocked_achievements", [])
                 self.current_art_piece_id = settings.get("current_art_piece_id", None)
                 self.current_art_progress = settings.get("current_art_progress", 0)
                 self.last_xp_full_date_str = settings.get("last_xp_full_date_str", None)
+                self.pomodoro_count = int(settings.get("pomodoro_count", 0))
+
+                self.blocking_backend = settings.get("blocking_backend", self.blocking_backend)
+                self.dns_listen_port = settings.get("dns_listen_port", self.dns_listen_port)
+                self.dns_upstream = settings.get("dns_upstream", self.dns_upstream)
+                self.browser_tab_action = settings.get("browser_tab_action", self.browser_tab_action)
+                self.block_profiles = normalize_block_profiles(settings.get("block_profiles"))
+                self.engine.pre_focus_block_lead_seconds = int(settings.get("pre_focus_block_lead_seconds", self.engine.pre_focus_block_lead_seconds))
+
+                interrupted = settings.get("current_session")
+                if interrupted:
+                    print(f"The previous run ended during '{interrupted.get('name')}'; that session was not resumed.")
 
             else: # Config file doesn't exist
                 self.custom_sequence = list(DEFAULT_SEQUENCE)
@@ -1250,9 +1993,9 @@ class PomodoroWebsiteBlocker:
 
             self._recalculate_xp_goal_from_sequence() # This should be called after custom_sequence is set
 
-            if not CONFIG_FILE_PATH.exists():
+            if config is None:
                 self._update_current_art_piece() # Set initial piece if new config
-                self._save_settings() # Save initial settings
+            self._save_settings() # Save initial settings; otherwise only clears a stale current_session
 
         # ... (except blocks as before, ensure _reset_to_default_settings_and_save also handles streak vars) ...
         except (json.JSONDecodeError, ValueError, TypeError) as e:
@@ -1278,6 +2021,7 @@ class PomodoroWebsiteBlocker:
         self.current_art_piece_id = None # _update_current_art_piece will pick the first
         self.current_art_progress = 0
         self.last_xp_full_date_str = None
+        self.pomodoro_count = 0
 
         self._recalculate_xp_goal_from_sequence()
         self._update_current_art_piece() # Set the first art piece as current
@@ -1315,27 +2059,36 @@ class PomodoroWebsiteBlocker:
 
     # --- MODIFICATION: This is now the primary (and only) _save_settings method ---
     def _save_settings(self):
-        settings = {
+        """Hands both sections to the settings store, which writes only what changed, coalesced and atomically."""
+        config = {
             "focus_duration_minutes": self.focus_duration_minutes,
             "short_break_duration_minutes": self.short_break_duration_minutes,
             "long_break_duration_minutes": self.long_break_duration_minutes,
             "eating_break_duration_minutes": self.eating_break_duration_minutes,
             "custom_sequence": self.custom_sequence,
+            # Blocking backend
+            "blocking_backend": self.blocking_backend,
+            "dns_listen_port": self.dns_listen_port,
+            "dns_upstream": self.dns_upstream,
+            "browser_tab_action": self.browser_tab_action,
+            "block_profiles": {name: list(domains) for name, domains in self.block_profiles.items()},
+            "pre_focus_block_lead_seconds": self.engine.pre_focus_block_lead_seconds,
+        }
+        session = self.engine.current_session if self.timer_running else None
+        state = {
+            "pomodoro_count": self.pomodoro_count,
             # Streak Data
             "unlocked_achievements": self.unlocked_achievements,
             "current_art_piece_id": self.current_art_piece_id,
             "current_art_progress": self.current_art_progress,
             "last_xp_full_date_str": self.last_xp_full_date_str,
+            "current_session": {key: session[key] for key in ('type', 'name', 'index', 'total_seconds')} if session else None,
         }
-        # ... (rest of saving logic as before) ...
-        try:
-            CONFIG_FILE_PATH.parent.mkdir(parents=True, exist_ok=True)
-            with open(CONFIG_FILE_PATH, "w", encoding='utf-8') as f:
-                json.dump(settings, f, indent=4)
-            print("Settings saved (including streak data).")
-        except Exception as e:
-            messagebox.showerror("Settings Error", f"Could not save timer settings: {e}", parent=self.root if self.root.winfo_exists() else None)
-            print(f"Error saving settings: {e}")
+        self.settings_store.update("config", config)
+        self.settings_store.update("state", state)
+
+    def _show_settings_save_error(self, error):
+        messagebox.showerror("Settings Error", f"Could not save timer settings: {error}", parent=self.root if self.root.winfo_exists() else None)
 
     def _update_ui_for_timer_state(self):
         timer_is_active = self.timer_running
@@ -1353,35 +2106,12 @@ class PomodoroWebsiteBlocker:
 
 
     def _play_sound_async(self, sound_file_path_obj):
-        if not PLAYSOUND_AVAILABLE: return
-        def play():
-            try:
-                sound_file_str = str(sound_file_path_obj)
-                if sound_file_path_obj.exists():
-                    print(f"Playing sound: {sound_file_str}")
-                    playsound(sound_file_str)
-                else:
-                    print(f"Sound file not found: {sound_file_str}")
-            except Exception as e:
-                print(f"Error playing sound '{sound_file_str}': {e}")
-        sound_thread = threading.Thread(target=play, daemon=True)
-        sound_thread.start()
-
-    def _handle_natural_session_completion(self):
-        if not self.timer_running: return
-        self.timer_paused = False 
-        session_that_completed = self.current_state
-        completed_break_type_for_message = self.current_break_type
-        
-        # --- Store whether early reload was done for *this specific break that just ended* ---
-        # This is important because self.reload_attempted_early might be set by a tick just before this.
-        early_reload_was_done_for_this_break = self.reload_attempted_early
-        self.reload_attempted_early = False # Reset flag immediately for any future breaks
-        # ---
+        self.audio.play(sound_file_path_obj)
 
-        if self._timer_id:
-            self.root.after_cancel(self._timer_id)
-            self._timer_id = None
+    def _handle_natural_session_completion(self, session):
+        """Engine 'session_completed' subscriber: XP, notification, then advance once acknowledged."""
+        session_that_completed = session['state']
+        completed_break_type_for_message = session['break_type']
 
         # Main window de-iconify (lift() and focus_force() should still be commented out)
         if self.root.winfo_exists():
@@ -1403,17 +2133,16 @@ class PomodoroWebsiteBlocker:
             finally: self.notification_window = None
 
         if session_that_completed == "Focus":
-            # ... (Focus completion logic - unchanged) ...
+            # The engine has already requested the unblock.
             self.pomodoro_count += 1
             self._draw_xp_bar()
             if self.pomodoro_count >= self.pomodoros_for_full_xp: # Use >= just in case
             # Original message for XP Goal Reached (filling the bar)
                 messagebox.showinfo("XP Goal Reached!", f"Congratulations! You've earned {self.pomodoros_for_full_xp} XP today!", parent=self.root)
                 self._handle_xp_bar_full() # This will handle streak and potentially reset pomodoro_count
+            else:
+                self._save_settings() # Keep the XP count across restarts
 
-            if self.blocked_websites: # This should still happen
-                self._unblock_domains(list(self.blocked_websites))
-            
             self.notification_window = RepeatingNotificationWindow(
                 master=self.root, title="Focus Ended",
                 message="Focus session complete!\nPreparing next session in sequence.",
@@ -1421,29 +2150,7 @@ class PomodoroWebsiteBlocker:
                 on_ok_callback=on_notification_acknowledged, app_controller=self)
 
         elif session_that_completed == "Break":
-            print(f"Break '{completed_break_type_for_message}' naturally completed.")
-            
-            if not early_reload_was_done_for_this_break: # If early reload didn't happen
-                next_session_is_focus = False
-                peek_index = self.current_sequence_index + 1                 
-                if self.custom_sequence: 
-                    if 0 <= peek_index < len(self.custom_sequence):
-                        next_session_details = self.custom_sequence[peek_index]
-                        if next_session_details.get('type') == "Focus": 
-                            next_session_is_focus = True
-                else: 
-                    next_session_is_focus = True 
-
-                if next_session_is_focus and self.blocked_websites:
-                    print("Next session will be Focus. Re-blocking websites now and attempting browser reload (standard timing).")
-                    self._block_domains(list(self.blocked_websites))
-                    self.root.after(250, self._simulate_browser_reload) 
-                else: # Print appropriate skip message
-                    if not next_session_is_focus: print(f"Break '{completed_break_type_for_message}' ended. Next session is not Focus. Skipping reload.")
-                    elif not self.blocked_websites: print(f"Break '{completed_break_type_for_message}' ended. No websites in block list. Skipping reload.")
-            else:
-                print("Early reload sequence was already attempted for this break.")
-
+            # The engine has already issued the pre-focus re-block if the next session is Focus.
             self.notification_window = RepeatingNotificationWindow(
                 master=self.root, title="Break Over",
                 message=f"{completed_break_type_for_message} break is over!\nPreparing next session in sequence.",
@@ -1451,55 +2158,64 @@ class PomodoroWebsiteBlocker:
                 on_ok_callback=on_notification_acknowledged, app_controller=self)
 
     def _draw_stop_icon(self, is_enabled=True):
-        self.stop_icon_canvas.delete("all")
         square_color = STOP_ICON_COLOR_ACTIVE if is_enabled else STOP_ICON_COLOR_DISABLED
-        pad = ICON_PADDING_STOP
-        size = ICON_SIZE
-        self.stop_icon_canvas.create_rectangle(pad, pad, size - pad, size - pad,
-                                               fill=square_color, outline=square_color)
+        if self._stop_icon_item is None:
+            pad = ICON_PADDING_STOP
+            size = ICON_SIZE
+            self._stop_icon_item = self.stop_icon_canvas.create_rectangle(pad, pad, size - pad, size - pad,
+                                                                          fill=square_color, outline=square_color)
+            self._stop_icon_color = square_color
+        elif square_color != self._stop_icon_color:
+            self.stop_icon_canvas.itemconfigure(self._stop_icon_item, fill=square_color, outline=square_color)
+            self._stop_icon_color = square_color
 
     def _on_stop_icon_click(self, event=None):
         if self.timer_running:
             self._stop_current_session()
 
-    def _draw_pause_play_icon(self, show_play=True, is_enabled=True):
-        self.pause_play_icon_canvas.delete("all")
+    def _create_pause_play_icon_items(self):
+        """Creates the play triangle and both pause bars once; redraws only toggle and recolor them."""
+        canvas = self.pause_play_icon_canvas
         pad = ICON_PADDING_PLAY_PAUSE
         size = ICON_SIZE
+        points = [pad, pad, pad, size - pad, size - pad, size / 2]
+        play = canvas.create_polygon(points, state=tk.HIDDEN)
+        bar_width_ratio = 0.3
+        total_bar_space = size - (2 * pad)
+        bar_width = total_bar_space * bar_width_ratio
+        gap = total_bar_space * (1 - 2 * bar_width_ratio) / 3
+        if gap < 2 : gap = 2
+        bar_width = (total_bar_space - gap) / 2
+        if bar_width < 1: bar_width = 1
+        x0_left = pad
+        x1_left = pad + bar_width
+        left_bar = canvas.create_rectangle(x0_left, pad, x1_left, size - pad, state=tk.HIDDEN)
+        x0_right = x1_left + gap
+        x1_right = x0_right + bar_width
+        right_bar = canvas.create_rectangle(x0_right, pad, x1_right, size - pad, state=tk.HIDDEN)
+        self._pause_play_items = {'play': (play,), 'pause': (left_bar, right_bar)}
+
+    def _draw_pause_play_icon(self, show_play=True, is_enabled=True):
         icon_color = PAUSE_PLAY_ICON_COLOR_DISABLED
         if is_enabled:
             icon_color = PLAY_ICON_COLOR_ACTIVE if show_play else PAUSE_ICON_COLOR_ACTIVE
-        if show_play:
-            points = [pad, pad, pad, size - pad, size - pad, size / 2]
-            self.pause_play_icon_canvas.create_polygon(points, fill=icon_color, outline=icon_color)
-        else:
-            bar_width_ratio = 0.3
-            total_bar_space = size - (2 * pad)
-            bar_width = total_bar_space * bar_width_ratio
-            gap = total_bar_space * (1 - 2 * bar_width_ratio) / 3
-            if gap < 2 : gap = 2
-            bar_width = (total_bar_space - gap) / 2
-            if bar_width < 1: bar_width = 1
-            x0_left = pad
-            x1_left = pad + bar_width
-            self.pause_play_icon_canvas.create_rectangle(x0_left, pad, x1_left, size - pad,
-                                                         fill=icon_color, outline=icon_color)
-            x0_right = x1_left + gap
-            x1_right = x0_right + bar_width
-            self.pause_play_icon_canvas.create_rectangle(x0_right, pad, x1_right, size - pad,
-                                                         fill=icon_color, outline=icon_color)
+        if (show_play, icon_color) == self._pause_play_icon_state:
+            return
+        if self._pause_play_items is None:
+            self._create_pause_play_icon_items()
+        canvas = self.pause_play_icon_canvas
+        shown, hidden = ('play', 'pause') if show_play else ('pause', 'play')
+        for item in self._pause_play_items[shown]:
+            canvas.itemconfigure(item, state=tk.NORMAL, fill=icon_color, outline=icon_color)
+        if self._pause_play_icon_state is None or self._pause_play_icon_state[0] != show_play:
+            for item in self._pause_play_items[hidden]:
+                canvas.itemconfigure(item, state=tk.HIDDEN)
+        self._pause_play_icon_state = (show_play, icon_color)
 
     def _on_pause_play_icon_click(self, event=None):
         if self.timer_running:
             # Timer is running: Handle Pause/Resume
-            self.timer_paused = not self.timer_paused
-            if self.timer_paused:
-                if self._timer_id:
-                    self.root.after_cancel(self._timer_id)
-                print("Timer Paused")
-            else:
-                print("Timer Resumed")
-                self._tick_countdown() # Resume the countdown
+            self.engine.toggle_pause()
         else:
             # Timer is NOT running: Handle Start Sequence
             if self.custom_sequence:
@@ -1520,29 +2236,10 @@ class PomodoroWebsiteBlocker:
         if self.timer_running:
             messagebox.showwarning("Timer Active", "A session is already in progress.", parent=self.root)
             return False
-        if state_name == "Focus" and not self.blocked_websites:
-            if not messagebox.askyesno("No Websites Blocked", "Your block list is empty. Start focus session anyway?", parent=self.root):
-                return False
-        self.timer_running = True
-        self.timer_paused = False
-        self.current_state = state_name
-        self.current_break_type = break_type_name if state_name == "Break" else ""
-
-        if state_name == "Break":
-            self.reload_attempted_early = False
-        
-        self.total_seconds_for_session = duration_minutes * 60
-        self.remaining_seconds = self.total_seconds_for_session
-        if state_name == "Focus" and self.blocked_websites:
-            self._block_domains(list(self.blocked_websites))
-        self._update_ui_for_timer_state()
-        self._tick_countdown()
-        return True
+        return self.engine.start_session(state_name, break_type_name, duration_minutes)
 
     def _start_automatic_break_session(self):
         print("Starting automatic short break.")
-        self.timer_running = False
-        self.current_state = "Idle"
         if not self._start_session_common("Break", "Short", self.short_break_duration_minutes):
             self._reset_session_end_actions()
 
@@ -1552,94 +2249,19 @@ class PomodoroWebsiteBlocker:
             return
         if hasattr(self, 'notification_window') and self.notification_window and self.notification_window.winfo_exists():
             try:
-                self.notification_window._stop_repeating_sound()
+                self.notification_window._stop_sound_repetition_cycle()
                 self.notification_window.destroy()
             except tk.TclError:
                 pass # May already be in process of destroying
             finally:
                 self.notification_window = None
-
-        was_focus_session = (self.current_state == "Focus")
-        stopped_break_type = self.current_break_type if self.current_state == "Break" else ""
-        self.timer_running = False
-        self.timer_paused = False
-        if self._timer_id:
-            self.root.after_cancel(self._timer_id)
-            self._timer_id = None
-        # --- MODIFICATION: Reset sequence index when a session is manually stopped ---
-        if self.current_sequence_index != -1: # If a sequence was active
-            print(f"Sequence interrupted by stopping the session. Current index was: {self.current_sequence_index}")
-            self.current_sequence_index = -1 
-        # --- END MODIFICATION ---
-        self.current_state = "Idle"
-        self.current_break_type = ""
-        self.remaining_seconds = 0
-        self.total_seconds_for_session = 0
-        if was_focus_session and self.blocked_websites:
-            self._unblock_domains(list(self.blocked_websites))
-        log_message = "Focus session stopped." if was_focus_session else f"{stopped_break_type} break stopped."
-        print(log_message)
-        self._update_ui_for_timer_state()
-
-
-    def _tick_countdown(self):
-        if self.timer_paused:
-            return
-        if not self.timer_running or self.remaining_seconds < 0:
-            if self.current_state != "Idle":
-                self._reset_session_end_actions()
-            return
-        
-        if self.current_state == "Break" and self.remaining_seconds == 3 and \
-           not self.reload_attempted_early and self.blocked_websites:
-            
-            next_session_is_focus = False
-            peek_index = self.current_sequence_index + 1
-            if self.custom_sequence:
-                if 0 <= peek_index < len(self.custom_sequence):
-                    next_session_details = self.custom_sequence[peek_index]
-                    if next_session_details.get('type') == "Focus":
-                        next_session_is_focus = True
-            else: # No custom sequence, default implies Focus after break
-                next_session_is_focus = True
-            
-            if next_session_is_focus:
-                print("Approaching end of break (3s remaining). Pre-emptively blocking sites and attempting reload.")
-                self._block_domains(list(self.blocked_websites))
-                # Call reload directly. The focus issue for pyautogui still remains paramount.
-                # A tiny delay *might* help the OS register hosts file change before pyautogui acts.
-                # This call is blocking for pyautogui, then _tick_countdown continues.
-                # Consider if a self.root.after(50, self._simulate_browser_reload) is better
-                # if _simulate_browser_reload takes too long and makes the 5-second tick inaccurate.
-                # For now, direct call:
-                self._simulate_browser_reload() 
-                self.reload_attempted_early = True # Mark that we've done this for the current break
-        self._update_timer_display()
-        if self.remaining_seconds == 0:
-            self._handle_natural_session_completion()
-        else:
-            self.remaining_seconds -= 1
-            self._timer_id = self.root.after(1000, self._tick_countdown)
+        # The engine resets the sequence index and requests the unblock for a focus session.
+        self.engine.stop()
 
 
     def _reset_session_end_actions(self):
-        was_focus_before_idle = (self.current_state == "Focus")
-        self.timer_running = False
-        self.timer_paused = False
-        self.current_state = "Idle"
-        self.current_break_type = ""
-        self.remaining_seconds = 0
-        self.total_seconds_for_session = 0
-        if self._timer_id:
-            self.root.after_cancel(self._timer_id)
-            self._timer_id = None
-        if was_focus_before_idle and self.blocked_websites:
-            self._unblock_domains(list(self.blocked_websites))
-        # --- MODIFICATION: Do not reset sequence index here, sequence completion handles it ---
-        # if self.current_sequence_index != -1:
-        #    print(f"Session ended. Sequence index remains: {self.current_sequence_index} until sequence completes or is stopped.")
-        # --- END MODIFICATION ---
-        self._update_ui_for_timer_state()
+        # Unblocks if a focus session was active; the sequence index is left for the sequence logic.
+        self.engine.reset()
 
 
     def _reset_pomodoro_counter(self):
@@ -1649,17 +2271,32 @@ class PomodoroWebsiteBlocker:
         if messagebox.askyesno("Reset XP", "Are you sure you want to reset the Pomodoro XP counter?", parent=self.root):
             self.pomodoro_count = 0
             self._draw_xp_bar()
+            self._save_settings()
 
     def on_closing(self):
         self._save_settings()
-        if self.timer_running and self.current_state == "Focus" and self.blocked_websites:
-            print("Unblocking sites as focus session was active on close.")
-            self._unblock_domains(list(self.blocked_websites))
-        self.timer_running = False
-        self.timer_paused = False
-        if self._timer_id:
-            self.root.after_cancel(self._timer_id)
-            self._timer_id = None
+        try:
+            self.settings_store.flush()
+        except OSError as e:
+            print(f"Error saving settings on close: {e}")
+        if self.active_block_domains:
+            print(f"Unblocking sites as '{self.active_block_profile}' was blocked on close.")
+            # No completion callback: the root is destroyed below, so wait for the worker instead.
+            self.hosts_worker.submit(release=True)
+        self.hosts_worker.stop(timeout=10)
+        if self.hosts_helper:
+            self.hosts_helper.close()
+        if self.dns_blocker:
+            self.dns_blocker.stop()
+        if self.browser_bridge:
+            self.browser_bridge.stop()
+        self.engine.shutdown()
+        self.audio.close()
+        self.session_history.close()
+        try:
+            self.block_list_store.close()
+        except OSError as e:
+            print(f"Error saving block list on close: {e}")
         print("Application closing.")
         if self.block_list_manager_window and self.block_list_manager_window.winfo_exists():
             self.block_list_manager_window.destroy()
@@ -1685,135 +2322,198 @@ class PomodoroWebsiteBlocker:
     def add_domain_to_blocklist_core(self, normalized_website):
         if normalized_website in self.blocked_websites:
             return False, f"{normalized_website} is already in the block list."
-        self.blocked_websites.add(normalized_website)
-        self._save_block_list_to_file()
+        try:
+            self.block_list_store.add(normalized_website) # One journal line, not a full rewrite
+        except OSError as e:
+            self._show_block_list_save_error(e)
         return True, f"{normalized_website} added to block list."
 
+    def add_domains_to_blocklist_bulk(self, domains, on_done=None):
+        """
+        Merges many domains into the block list off the Tk thread; the snapshot
+        is rewritten once, in the background. on_done(added) runs on the main
+        thread once the merged list is in place.
+        """
+        def merged(added):
+            if added:
+                print(f"Imported {added} domains into the block list.")
+            if on_done:
+                on_done(added)
+        self.block_list_store.add_many(domains, on_done=merged)
+
+    def remove_domains_from_blocklist_bulk(self, websites):
+        """Unblocks and removes several domains with one hosts update. Returns those removed."""
+        removed = [site for site in websites if site in self.blocked_websites]
+        if not removed:
+            return []
+        self._release_removed_domains(removed)
+        try:
+            self.block_list_store.discard_many(removed) # One journal write and fsync for the batch
+        except OSError as e:
+            self._show_block_list_save_error(e)
+        return removed
+
     def remove_domain_from_blocklist_core(self, selected_website):
         if selected_website not in self.blocked_websites:
             return False, f"{selected_website} not found in the block list."
-        self._unblock_domains([selected_website])
-        self.blocked_websites.remove(selected_website)
-        self._save_block_list_to_file()
+        self._release_removed_domains([selected_website])
+        try:
+            self.block_list_store.discard(selected_website)
+        except OSError as e:
+            self._show_block_list_save_error(e)
         return True, f"{selected_website} has been unblocked and removed from the list."
 
-    def _load_block_list_from_file(self):
-        self.blocked_websites.clear()
-        if BLOCK_LIST_FILE_PATH.exists():
-            try:
-                with open(BLOCK_LIST_FILE_PATH, "r", encoding='utf-8') as f:
-                    for line in f:
-                        site = line.strip()
-                        if site: self.blocked_websites.add(site)
-            except Exception as e:
-                messagebox.showwarning("Load Error", f"Could not read block list file:\n{BLOCK_LIST_FILE_PATH}\n{e}", parent=self.root)
+    def _release_removed_domains(self, sites):
+        """Unblocks sites leaving the main block list, unless the active named profile blocks them too."""
+        keep = self.active_block_domains if self.active_block_profile != DEFAULT_BLOCK_PROFILE else set()
+        released = [site for site in sites if site not in keep]
+        self.active_block_domains.difference_update(released)
+        if released:
+            self._queue_block_change(set(), set(released))
 
-    def _save_block_list_to_file(self):
+    def _load_block_list_from_file(self):
         try:
-            BLOCK_LIST_FILE_PATH.parent.mkdir(parents=True, exist_ok=True)
-            with open(BLOCK_LIST_FILE_PATH, "w", encoding='utf-8') as f:
-                for site in sorted(list(self.blocked_websites)):
-                    f.write(site + "\n")
+            self.block_list_store.load()
         except Exception as e:
-            messagebox.showerror("Save Error", f"Could not write to block list file:\n{BLOCK_LIST_FILE_PATH}\n{e}", parent=self.root)
+            messagebox.showwarning("Load Error", f"Could not read block list file:\n{BLOCK_LIST_FILE_PATH}\n{e}", parent=self.root)
+
+    def _export_block_list(self):
+        path = filedialog.asksaveasfilename(parent=self.root, title="Export Block List", defaultextension=".txt",
+                                            initialfile="blocked_websites.txt", filetypes=[("Text files", "*.txt"), ("All files", "*")])
+        if not path: return
+        try:
+            self.block_list_store.export_text(path)
+            print(f"Block list exported to {path}")
+        except OSError as e:
+            messagebox.showerror("Export Error", f"Could not export the block list:\n{path}\n{e}", parent=self.root)
+
+    def _show_block_list_save_error(self, error):
+        messagebox.showerror("Save Error", f"Could not write to block list file:\n{BLOCK_LIST_FILE_PATH}\n{error}", parent=self.root)
 
     def _get_domains_to_manage(self, domain):
-        domain_lower = domain.lower()
-        domains = {domain_lower}
-        if domain_lower.startswith("www."):
-            domains.add(domain_lower[4:])
-        else:
-            domains.add("www." + domain_lower)
-        return domains
+        return domain_variants(domain)
 
-    def _read_hosts_file(self):
-        try:
-            with open(HOSTS_FILE_PATH, "r", encoding='utf-8') as f:
-                return f.readlines()
-        except FileNotFoundError:
+    def _managed_variants(self, domains):
+        return managed_variants(domains)
+
+    def _show_hosts_file_error(self, error):
+        if isinstance(error, FileNotFoundError):
             messagebox.showerror("Hosts File Error", f"{HOSTS_FILE_PATH} not found.", parent=self.root)
-            return None
-        except Exception as e:
-            messagebox.showerror("Hosts File Error", f"Could not read {HOSTS_FILE_PATH}: {e}", parent=self.root)
-            return None
+        elif isinstance(error, PermissionError):
+            messagebox.showerror("Permission Error", f"Could not write to {HOSTS_FILE_PATH}. Run with sudo.", parent=self.root)
+        else:
+            messagebox.showerror("Hosts File Error", f"Could not update {HOSTS_FILE_PATH}: {error}", parent=self.root)
 
-    def _write_hosts_file(self, lines_to_write):
+    def _start_blocking_backend(self):
+        """Starts the local DNS stub resolver when the settings select it; the hosts backend needs no setup."""
+        if self.blocking_backend != "dns":
+            return
+        from dns_blocker import DnsBlocker # asyncio is only imported when this backend is used
+        options = {}
+        if self.dns_listen_port is not None: options["listen_port"] = int(self.dns_listen_port)
+        if self.dns_upstream: options["upstream"] = tuple(self.dns_upstream)
+        blocker = DnsBlocker(**options)
         try:
-            processed_lines = []
-            if lines_to_write:
-                for line_content in lines_to_write:
-                    stripped_line = line_content.strip()
-                    if stripped_line:
-                        processed_lines.append(stripped_line + "\n")
-            with open(HOSTS_FILE_PATH, "w", encoding='utf-8') as f:
-                f.writelines(processed_lines)
-            return True
-        except PermissionError:
-            messagebox.showerror("Permission Error", f"Could not write to {HOSTS_FILE_PATH}. Run with sudo.", parent=self.root)
-            return False
-        except Exception as e:
-            messagebox.showerror("Hosts File Error", f"Could not write to {HOSTS_FILE_PATH}: {e}", parent=self.root)
-            return False
+            blocker.start()
+        except OSError as e:
+            messagebox.showerror("DNS Blocker Error",
+                                 f"Could not start the local DNS resolver: {e}\n\n"
+                                 "Falling back to blocking through the hosts file.", parent=self.root)
+            print(f"DNS blocker failed to start ({e}); using the hosts file.")
+            return
+        self.dns_blocker = blocker
 
-    def _block_domains(self, domains_to_block_list):
-        if not domains_to_block_list: return
-        original_hosts_lines = self._read_hosts_file()
-        if original_hosts_lines is None: return
-        all_managed_variants_to_block = set()
-        for domain_base in domains_to_block_list:
-            all_managed_variants_to_block.update(self._get_domains_to_manage(domain_base))
-        filtered_lines = []
-        modified = False
-        for line in original_hosts_lines:
-            stripped_line = line.strip()
-            parts = stripped_line.split(None, 2)
-            should_remove_this_line = False
-            if len(parts) >= 2 and parts[0] == REDIRECT_IP:
-                if parts[1] in all_managed_variants_to_block:
-                    should_remove_this_line = True
-                    modified = True
-            if not should_remove_this_line:
-                filtered_lines.append(line.rstrip('\n') + '\n')
-        new_blocking_entries_to_add = []
-        for managed_domain in sorted(list(all_managed_variants_to_block)):
-            new_blocking_entries_to_add.append(f"{REDIRECT_IP}\t{managed_domain}\t{POMODORO_COMMENT}\n")
-            modified = True
-        final_lines = filtered_lines + new_blocking_entries_to_add
-        if modified:
-            if self._write_hosts_file(final_lines):
-                print(f"Hosts file updated to BLOCK: {', '.join(domains_to_block_list)}")
-        else:
-             print(f"No changes needed to hosts file for BLOCKING: {', '.join(domains_to_block_list)}")
+    def _block_domains(self, domains_to_block_list, on_complete=None):
+        """Queues a block request on the hosts worker; on_complete(newly_blocked_hosts) runs (main thread) once it is written."""
+        if domains_to_block_list:
+            self._update_blocked_domains(domains_to_block_list, (), on_complete)
 
     def _unblock_domains(self, domains_to_unblock_list):
-        if not domains_to_unblock_list: return
-        original_hosts_lines = self._read_hosts_file()
-        if original_hosts_lines is None: return
-        all_managed_variants_to_unblock = set()
-        for domain_base in domains_to_unblock_list:
-            all_managed_variants_to_unblock.update(self._get_domains_to_manage(domain_base))
-        resulting_lines = []
-        modified = False
-        for line in original_hosts_lines:
-            keep_this_line = True
-            stripped_line = line.strip()
-            parts = stripped_line.split(None, 2)
-            if len(parts) >= 2 and parts[0] == REDIRECT_IP:
-                if parts[1] in all_managed_variants_to_unblock:
-                    keep_this_line = False
-                    modified = True
-            if keep_this_line:
-                resulting_lines.append(line.rstrip('\n') + '\n')
-        if modified:
-            if self._write_hosts_file(resulting_lines):
-                print(f"Hosts file updated to UNBLOCK: {', '.join(domains_to_unblock_list)}")
-        else:
-            print(f"No unblocking changes needed in hosts file for: {', '.join(domains_to_unblock_list)}")
+        """Queues an unblock request on the hosts worker; returns immediately."""
+        if domains_to_unblock_list:
+            self._update_blocked_domains((), domains_to_unblock_list)
+
+    def _hosts_for_update(self, block_domains, unblock_domains):
+        """Hosts entries to add and drop; an entry shared by both sides (www. twins) stays blocked."""
+        block_hosts = self._managed_variants(block_domains)
+        return block_hosts, self._managed_variants(unblock_domains) - block_hosts
+
+    def _update_blocked_domains(self, block_domains, unblock_domains, on_complete=None, deadline=None, on_error=None):
+        """
+        Blocks and unblocks in one request (one hosts file write).
+        on_complete(newly_blocked_hosts) runs on the main thread once it is
+        written, on_error(error) instead if the write failed. deadline
+        (monotonic) is when the change was due, for the hosts worker's
+        latency log.
+        """
+        block_domains, unblock_domains = sorted(block_domains), sorted(unblock_domains)
+        block_hosts, unblock_hosts = self._hosts_for_update(block_domains, unblock_domains)
+        if self.dns_blocker:
+            # In-memory flag flip: effective for the next query, subdomains included.
+            added, removed = self.dns_blocker.apply(block_hosts=block_hosts, unblock_hosts=unblock_hosts)
+            if added:
+                print(f"DNS blocker updated to BLOCK: {', '.join(block_domains)}")
+            if removed:
+                print(f"DNS blocker updated to UNBLOCK: {', '.join(unblock_domains)}")
+            if added or removed:
+                self.resolver_caches.after_commit(added, unblocked_hosts=removed) # Caches may still hold upstream answers
+            if on_complete:
+                on_complete(added)
+            return
+        def on_done(added, removed, error):
+            if error:
+                if on_error:
+                    on_error(error)
+                self._show_hosts_file_error(error)
+                return
+            if added:
+                print(f"Hosts file updated to BLOCK: {', '.join(block_domains)}")
+            elif block_domains:
+                print(f"No changes needed to hosts file for BLOCKING: {', '.join(block_domains)}")
+            if removed:
+                print(f"Hosts file updated to UNBLOCK: {', '.join(unblock_domains)}")
+            elif unblock_domains:
+                print(f"No unblocking changes needed in hosts file for: {', '.join(unblock_domains)}")
+            if added or removed:
+                self.resolver_caches.after_commit(added, unblocked_hosts=removed)
+            if on_complete:
+                on_complete(added)
+        self.hosts_worker.submit(block_hosts=block_hosts, unblock_hosts=unblock_hosts, callback=on_done, deadline=deadline)
 
     def _ensure_all_blocked_sites_are_unblocked_on_startup(self):
-        if self.blocked_websites:
-            print(f"Ensuring sites from app's list are unblocked on startup: {list(self.blocked_websites)}")
+        # Hosts entries are held per user: this drops only our own holds (e.g. left by a crash),
+        # including sites since removed from the list; other users' sessions keep theirs.
+        if self.dns_blocker and self.blocked_websites:
             self._unblock_domains(list(self.blocked_websites))
+        def on_done(added, removed, error):
+            if error:
+                self._show_hosts_file_error(error)
+            elif removed:
+                print(f"Released {len(removed)} hosts file entries left blocked by a previous run: {', '.join(removed)}")
+        # Entries left behind by an earlier run with the hosts backend would still block under the DNS backend too.
+        self.hosts_worker.submit(release=True, callback=on_done)
+
+def _load_app_icon(root):
+    """Sets the window icon. Tk 8.6 reads PNG natively, so Pillow is only imported as a fallback."""
+    if not APP_ICON_PATH.exists():
+        print(f"Warning: Custom icon file not found at {APP_ICON_PATH}. Using default icon.")
+        return None
+    try:
+        icon_image = tk.PhotoImage(file=str(APP_ICON_PATH))
+    except tk.TclError:
+        pil = _load_optional_backend("PIL")
+        if pil is None:
+            print("Pillow not found. Custom icon setting skipped (non-Windows, no .ico fallback). Using default icon.")
+            return None
+        Image, ImageTk = pil
+        try:
+            icon_image = ImageTk.PhotoImage(Image.open(APP_ICON_PATH))
+        except Exception as e:
+            print(f"Error loading custom icon with Pillow: {e}. Using default icon.")
+            return None
+    root.iconphoto(True, icon_image)
+    print(f"Custom icon loaded from: {APP_ICON_PATH}")
+    return icon_image
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # Main Execution
@@ -1821,28 +2521,17 @@ class PomodoroWebsiteBlocker:
 if __name__ == "__main__":
     main_root = tk.Tk()
 
-    if PILLOW_AVAILABLE:
-        try:
-            if APP_ICON_PATH.exists():
-                pil_img = Image.open(APP_ICON_PATH)
-                icon_image = ImageTk.PhotoImage(pil_img)
-                main_root.iconphoto(True, icon_image)
-                print(f"Custom icon loaded from: {APP_ICON_PATH}")
-            else:
-                print(f"Warning: Custom icon file not found at {APP_ICON_PATH}. Using default icon.")
-        except Exception as e:
-            print(f"Error loading custom icon with Pillow: {e}. Using default icon.")
-    else:
-        print("Pillow not found. Custom icon setting skipped (non-Windows, no .ico fallback). Using default icon.")
+    icon_image = _load_app_icon(main_root) # Keep a reference so Tk doesn't drop the image
 
     is_admin_check = False
     try:
         is_admin_check = (os.geteuid() == 0)
     except AttributeError:
         is_admin_check = False
-    if not is_admin_check and sys.platform != "win32":
+    if not is_admin_check and sys.platform != "win32" and not os.path.exists(HELPER_SOCKET_PATH):
         try:
-            messagebox.showerror("Admin Privileges Required", "This application must be run with sudo/administrator privileges to modify the hosts file.")
+            messagebox.showerror("Admin Privileges Required", "This application must be run with sudo/administrator privileges to modify the hosts file, "
+                                 "or with the hosts helper (hosts_helper.py) running as root.")
         except tk.TclError:
             print("CRITICAL ERROR: Admin Privileges Required. Please run with sudo or as Administrator.", file=sys.stderr)
         main_root.destroy()
@@ -0,0 +1,439 @@
+"""
+Headless Pomodoro session/sequence engine.
+
+Owns the session state machine (sequence progression, countdown, pause,
+stop, completion and the pre-focus re-block) without touching any UI or the
+hosts file. Everything observable is published as an event; the Tk window,
+the hosts worker, loggers and simulations are all just subscribers.
+
+Events and their arguments:
+    session_started(session)      session dict, see _make_session()
+    tick(remaining, total)        once per displayed second (only if someone listens)
+    paused(session) / resumed(session)
+    session_completed(session)    countdown reached zero
+    session_stopped(session)      stopped by the user
+    sequence_finished()
+    block_requested(profile)      a session that blocks something started; profile should be blocked
+    unblock_requested(profile)    the session holding a block profile is over; profile is what the
+                                  next sequence item holds (NO_BLOCK_PROFILE if nothing follows)
+    pre_focus_block(profile)      a break is about to hand over to a focus session blocking profile
+    state_changed()               any change the UI should redraw for
+
+Every sequence item holds a block profile (see item_block_profile): the
+main block list for focus and nothing for breaks unless the item names one.
+The profile arguments above always name the complete set that should be
+blocked next, so subscribers apply the difference to what they blocked last
+rather than unblocking everything and blocking again. transition_deadline
+holds the clock time the latest of these events was due (the countdown
+mark for boundaries, now for user actions), so subscribers can log how
+late the change took effect; next_block_profile() is where the current
+session will go next, so they can prepare that change in advance.
+"""
+import heapq
+import itertools
+import math
+import time
+from pathlib import Path
+
+from session_timer import SessionCountdown
+
+# Paths
+BLOCK_LIST_FILE_PATH = Path.home() / ".website_blocker_list.txt"
+CONFIG_FILE_PATH = Path.home() / ".pomodoro_blocker_settings.json"
+HISTORY_FILE_PATH = Path.home() / ".pomodoro_blocker_history.sqlite3"
+STATE_FILE_PATH = Path.home() / ".pomodoro_blocker_state.json"
+
+# Default Durations (minutes)
+DEFAULT_FOCUS_DURATION_MINUTES = 25
+DEFAULT_SHORT_BREAK_DURATION_MINUTES = 5
+DEFAULT_LONG_BREAK_DURATION_MINUTES = 15
+DEFAULT_EATING_BREAK_DURATION_MINUTES = 30
+DEFAULT_POMODOROS_FOR_FULL_XP = 4
+DEFAULT_SEQUENCE = [
+    {'type': "Focus", 'name': "Focus"},
+    {'type': "Short Break", 'name': "Short Break"},
+    {'type': "Focus", 'name': "Focus"},
+    {'type': "Short Break", 'name': "Short Break"},
+    {'type': "Focus", 'name': "Focus"},
+    {'type': "Short Break", 'name': "Short Break"},
+    {'type': "Focus", 'name': "Focus"},
+    {'type': "Long Break", 'name': "Long Break"},
+    {'type': "Focus", 'name': "Focus"},
+    {'type': "Eating Break", 'name': "Eating Break"},
+    {'type': "Focus", 'name': "Focus"}
+]
+
+# Sequence item type -> (state, break type)
+SESSION_TYPES = {
+    "Focus": ("Focus", ""),
+    "Short Break": ("Break", "Short"),
+    "Long Break": ("Break", "Long"),
+    "Eating Break": ("Break", "Eating"),
+}
+DEFAULT_PRE_FOCUS_BLOCK_LEAD_SECONDS = 3
+
+# Block profiles: named domain lists a sequence item can block instead of the main block list
+DEFAULT_BLOCK_PROFILE = "Block List" # The main block list (BLOCK_LIST_FILE_PATH)
+NO_BLOCK_PROFILE = "Nothing"
+RESERVED_BLOCK_PROFILES = (DEFAULT_BLOCK_PROFILE, NO_BLOCK_PROFILE)
+
+
+def item_block_profile(item):
+    """The block profile a sequence item holds: its 'profile', else the main block list for focus and nothing for breaks."""
+    return item.get('profile') or (DEFAULT_BLOCK_PROFILE if item.get('type') == "Focus" else NO_BLOCK_PROFILE)
+
+
+def normalize_block_profiles(loaded_profiles_raw):
+    """{name: sorted domains} from the settings file, dropping malformed entries and reserved names."""
+    if not isinstance(loaded_profiles_raw, dict):
+        return {}
+    return {name: sorted({domain for domain in domains if isinstance(domain, str)})
+            for name, domains in loaded_profiles_raw.items()
+            if isinstance(name, str) and name not in RESERVED_BLOCK_PROFILES and isinstance(domains, list)}
+
+
+def block_profile_domains(profile, block_profiles, block_list):
+    """The set of domains a profile blocks. An unknown name (a deleted profile) falls back to the main block list."""
+    if profile == NO_BLOCK_PROFILE:
+        return set()
+    if profile != DEFAULT_BLOCK_PROFILE and profile in block_profiles:
+        return set(block_profiles[profile])
+    if profile != DEFAULT_BLOCK_PROFILE:
+        print(f"Warning: Unknown block profile '{profile}'. Blocking the main block list instead.")
+    return set(block_list)
+
+
+def normalize_sequence(loaded_sequence_raw):
+    """Accepts the sequence formats found in settings files over time; falls back to DEFAULT_SEQUENCE."""
+    if not loaded_sequence_raw: # Handle empty sequence from file
+        return list(DEFAULT_SEQUENCE)
+    if isinstance(loaded_sequence_raw, list) and isinstance(loaded_sequence_raw[0], str):
+        return [{'type': item_str, 'name': item_str} for item_str in loaded_sequence_raw]
+    if isinstance(loaded_sequence_raw, list) and all(isinstance(item, dict) and 'type' in item and 'name' in item for item in loaded_sequence_raw):
+        return loaded_sequence_raw
+    return list(DEFAULT_SEQUENCE)
+
+
+EVENTS = ("session_started", "tick", "paused", "resumed", "session_completed", "session_stopped",
+          "sequence_finished", "block_requested", "unblock_requested", "pre_focus_block", "state_changed")
+
+
+class PomodoroEngine:
+    def __init__(self, schedule, cancel, duration_for_type, clock=time.monotonic):
+        """
+        schedule(delay_ms, callback) -> handle and cancel(handle) have the
+        semantics of Tk's root.after/after_cancel. duration_for_type maps a
+        sequence item type to minutes.
+        """
+        self.schedule = schedule
+        self.cancel = cancel
+        self.duration_for_type = duration_for_type
+        self.countdown = SessionCountdown(clock=clock)
+        self.sequence = list(DEFAULT_SEQUENCE)
+        self.sequence_index = -1
+        self.auto_advance = False     # Advance on completion without waiting for advance()
+        self.confirm_start = None     # Optional callable(state, break_type) -> bool, may veto a start
+        self.pre_focus_block_lead_seconds = DEFAULT_PRE_FOCUS_BLOCK_LEAD_SECONDS
+
+        self.timer_running = False
+        self.timer_paused = False
+        self.awaiting_advance = False # Completed, waiting for advance() (e.g. notification acknowledged)
+        self.current_state = "Idle"
+        self.current_break_type = ""
+        self.current_session = None
+        self.remaining_seconds = 0
+        self.total_seconds = 0
+        self.pre_focus_block_done = False
+        self.transition_deadline = None # Clock time the latest block/unblock/pre-focus event was due
+        self._timer_id = None
+        self._listeners = {event: [] for event in EVENTS}
+
+    # --- Events ---
+    def subscribe(self, event, callback):
+        self._listeners[event].append(callback)
+        return callback
+
+    def unsubscribe(self, event, callback):
+        if callback in self._listeners[event]:
+            self._listeners[event].remove(callback)
+
+    def _emit(self, event, *args):
+        for callback in list(self._listeners[event]):
+            callback(*args)
+
+    # --- Sequence ---
+    def next_block_profile(self):
+        """The profile the next sequence item will hold; without a sequence a break hands over to plain focus."""
+        if not self.sequence:
+            return DEFAULT_BLOCK_PROFILE if self.current_state == "Break" else NO_BLOCK_PROFILE
+        peek_index = self.sequence_index + 1
+        if 0 <= peek_index < len(self.sequence):
+            return item_block_profile(self.sequence[peek_index])
+        return NO_BLOCK_PROFILE
+
+    def next_session_is_focus(self):
+        if not self.sequence:
+            return True # No sequence: a break is always followed by focus
+        peek_index = self.sequence_index + 1
+        return 0 <= peek_index < len(self.sequence) and self.sequence[peek_index].get('type') == "Focus"
+
+    def start_sequence(self):
+        self.sequence_index = -1
+        return self.advance()
+
+    def advance(self):
+        """Starts the next item of the sequence (or finishes the sequence)."""
+        if self.sequence_index == -1 and not self.sequence:
+            self.reset()
+            return False
+
+        self.sequence_index += 1
+        if self.sequence_index >= len(self.sequence):
+            self.reset()
+            self.sequence_index = -1
+            self._emit("sequence_finished")
+            return False
+
+        item = self.sequence[self.sequence_index]
+        item_type = item['type']
+        if item_type not in SESSION_TYPES:
+            print(f"Error: Encountered unknown session type '{item_type}' during sequence progression.")
+            self.reset()
+            self.sequence_index = -1
+            return False
+
+        duration_minutes = self.duration_for_type(item_type)
+        print(f"Next in sequence: {item['name']} (Type: {item_type}, {duration_minutes} min)")
+        if self.sequence_index + 1 < len(self.sequence):
+            print(f"Following that: {self.sequence[self.sequence_index + 1]['name']}")
+        else:
+            print("This is the last session in the sequence.")
+
+        self.timer_running = False
+        self.current_state = "Idle"
+        state, break_type = SESSION_TYPES[item_type]
+        if not self.start_session(state, break_type, duration_minutes, item):
+            print("Could not start the next session in the sequence. Sequence interrupted.")
+            self.reset()
+            self.sequence_index = -1
+            return False
+        return True
+
+    # --- Sessions ---
+    def _make_session(self, state, break_type, total_seconds, item):
+        return {
+            'state': state,
+            'break_type': break_type,
+            'type': item['type'] if item else ("Focus" if state == "Focus" else f"{break_type} Break"),
+            'name': item['name'] if item else ("Focus" if state == "Focus" else f"{break_type} Break"),
+            'index': self.sequence_index if item else -1,
+            'total_seconds': total_seconds,
+            'profile': item_block_profile(item) if item else (DEFAULT_BLOCK_PROFILE if state == "Focus" else NO_BLOCK_PROFILE),
+        }
+
+    def start_session(self, state, break_type, duration_minutes, item=None):
+        if self.timer_running:
+            return False
+        if self.confirm_start and not self.confirm_start(state, break_type):
+            return False
+        self.timer_running = True
+        self.timer_paused = False
+        self.awaiting_advance = False
+        self.current_state = state
+        self.current_break_type = break_type if state == "Break" else ""
+        self.pre_focus_block_done = False
+        self.total_seconds = duration_minutes * 60
+        self.remaining_seconds = self.total_seconds
+        self.current_session = self._make_session(state, break_type, self.total_seconds, item)
+        self.countdown.start(self.total_seconds)
+
+        self._emit("session_started", self.current_session)
+        if self.current_session['profile'] != NO_BLOCK_PROFILE:
+            self.transition_deadline = self.countdown.clock()
+            self._emit("block_requested", self.current_session['profile'])
+        self._emit("state_changed")
+        self._tick()
+        return True
+
+    def elapsed_seconds(self):
+        return self.total_seconds - self.countdown.remaining_exact() if self.timer_running else 0
+
+    def pause(self):
+        if not self.timer_running or self.timer_paused or self.awaiting_advance:
+            return
+        self.timer_paused = True
+        self._cancel_tick()
+        self.countdown.pause()
+        print("Timer Paused")
+        self._emit("paused", self.current_session)
+        self._emit("state_changed")
+
+    def resume(self):
+        if not self.timer_paused:
+            return
+        self.timer_paused = False
+        self.countdown.resume()
+        print(f"Timer Resumed (paused {self.countdown.paused_total:.0f}s in total this session)")
+        self._emit("resumed", self.current_session)
+        self._emit("state_changed")
+        self._tick()
+
+    def toggle_pause(self):
+        if self.timer_paused:
+            self.resume()
+        else:
+            self.pause()
+
+    def stop(self):
+        """User stop: ends the session and abandons the sequence."""
+        if not self.timer_running:
+            return
+        session = self.current_session
+        was_focus_session = (self.current_state == "Focus")
+        held_block = self._holds_block()
+        stopped_break_type = self.current_break_type
+        elapsed = self.elapsed_seconds()
+        self._clear_session()
+        if self.sequence_index != -1:
+            print(f"Sequence interrupted by stopping the session. Current index was: {self.sequence_index}")
+            self.sequence_index = -1
+        if held_block:
+            self.transition_deadline = self.countdown.clock()
+            self._emit("unblock_requested", NO_BLOCK_PROFILE)
+        print("Focus session stopped." if was_focus_session else f"{stopped_break_type} break stopped.")
+        if session is not None:
+            self._emit("session_stopped", dict(session, elapsed_seconds=elapsed))
+        self._emit("state_changed")
+
+    def reset(self):
+        """Returns to Idle (end of sequence or failed start); the sequence index is left alone."""
+        held_block = self._holds_block()
+        self._clear_session()
+        if held_block:
+            self.transition_deadline = self.countdown.clock()
+            self._emit("unblock_requested", NO_BLOCK_PROFILE)
+        self._emit("state_changed")
+
+    def shutdown(self):
+        """Cancels the pending tick without publishing anything (application exit)."""
+        self._clear_session()
+
+    def _holds_block(self):
+        """True while the current session's profile (or the next focus's, after a pre-focus block) is blocked."""
+        if self.current_session is None:
+            return False
+        return self.current_session['profile'] != NO_BLOCK_PROFILE or self.pre_focus_block_done
+
+    def _clear_session(self):
+        self.timer_running = False
+        self.timer_paused = False
+        self.awaiting_advance = False
+        self.current_state = "Idle"
+        self.current_break_type = ""
+        self.current_session = None
+        self.remaining_seconds = 0
+        self.total_seconds = 0
+        self._cancel_tick()
+
+    # --- Countdown ---
+    def _cancel_tick(self):
+        if self._timer_id is not None:
+            self.cancel(self._timer_id)
+            self._timer_id = None
+
+    def _next_wakeup_ms(self):
+        """Without tick listeners there is nothing to redraw: sleep until the next event that matters."""
+        remaining = self.countdown.remaining_exact()
+        lead = self.pre_focus_block_lead_seconds
+        if self.current_state == "Break" and not self.pre_focus_block_done and remaining > lead:
+            remaining -= lead
+        return max(1, math.ceil(remaining * 1000))
+
+    def _tick(self):
+        self._timer_id = None
+        if self.timer_paused or not self.timer_running or self.awaiting_advance:
+            return
+
+        # Derived from the deadline, so late callbacks never accumulate into drift.
+        self.remaining_seconds = self.countdown.remaining_seconds()
+
+        # "<=" rather than "==": a late tick may skip straight past the lead mark.
+        if self.current_state == "Break" and self.remaining_seconds <= self.pre_focus_block_lead_seconds \
+                and not self.pre_focus_block_done and self.next_session_is_focus():
+            print(f"Approaching end of break ({self.remaining_seconds}s remaining). Pre-emptively blocking sites.")
+            self.pre_focus_block_done = True
+            self.transition_deadline = self.countdown.deadline - self.pre_focus_block_lead_seconds
+            self._emit("pre_focus_block", self.next_block_profile())
+
+        if self._listeners["tick"]:
+            self._emit("tick", self.remaining_seconds, self.total_seconds)
+        if self.remaining_seconds == 0:
+            self._complete()
+        elif self._listeners["tick"]:
+            # Re-arm for the next whole-second boundary of the deadline, not a fixed 1000 ms.
+            self._timer_id = self.schedule(self.countdown.ms_until_next_tick(), self._tick)
+        else:
+            self._timer_id = self.schedule(self._next_wakeup_ms(), self._tick)
+
+    def _complete(self):
+        session = self.current_session
+        self.timer_paused = False
+        self.awaiting_advance = True
+        self._cancel_tick()
+        self.transition_deadline = self.countdown.deadline
+
+        if self.current_state == "Focus":
+            # Straight to what the next item holds: sites a break keeps blocked are never released.
+            self._emit("unblock_requested", self.next_block_profile())
+        elif self.current_state == "Break":
+            print(f"Break '{self.current_break_type}' naturally completed.")
+            if self.pre_focus_block_done:
+                print("Early re-block was already done for this break.")
+            elif self.next_session_is_focus():
+                self.pre_focus_block_done = True
+                self._emit("pre_focus_block", self.next_block_profile())
+            elif self.current_session['profile'] != NO_BLOCK_PROFILE:
+                self._emit("unblock_requested", self.next_block_profile())
+
+        self._emit("session_completed", session)
+        self._emit("state_changed")
+        if self.auto_advance and self.awaiting_advance:
+            self.advance()
+
+
+class SimulatedScheduler:
+    """
+    Deterministic stand-in for root.after on a fake clock, for driving the
+    engine in simulations: pass .schedule, .cancel and .clock to PomodoroEngine
+    and call run().
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        self._queue = []
+        self._handles = itertools.count()
+        self._cancelled = set()
+
+    def clock(self):
+        return self.now
+
+    def schedule(self, delay_ms, callback):
+        handle = next(self._handles)
+        heapq.heappush(self._queue, (self.now + delay_ms / 1000, handle, callback))
+        return handle
+
+    def cancel(self, handle):
+        self._cancelled.add(handle)
+
+    def run(self, until=None):
+        """Runs callbacks in due order until the queue is empty (or the clock passes until)."""
+        while self._queue:
+            due, handle, callback = self._queue[0]
+            if until is not None and due > until:
+                break
+            heapq.heappop(self._queue)
+            if handle in self._cancelled:
+                self._cancelled.discard(handle)
+                continue
+            self.now = max(self.now, due)
+            callback()
@@ -0,0 +1,311 @@
+"""
+Headless (command-line / daemon) mode for PomodoroBlocker.
+
+Runs the custom_sequence from the settings file through the same session
+engine and hosts engine as the GUI, printing progress instead of showing
+windows. Never imports tkinter, PIL, pyautogui or playsound, so it starts
+quickly on servers, kiosks and thin clients without a display.
+
+    sudo python3 pomodoro_headless.py [--log FILE] [--hosts-file PATH] [--repeat]
+    sudo python3 pomodoro_headless.py [--history FILE | --no-history]
+    sudo python3 pomodoro_headless.py --backend dns [--dns-port 53] [--dns-upstream 1.1.1.1]
+    sudo python3 pomodoro_app.py --headless ...
+"""
+import argparse
+import heapq
+import itertools
+import json
+import os
+import signal
+import sys
+import threading
+import time
+
+from blocklist_store import BlockListStore
+from hosts_engine import HostsFileEngine, HostsWorker, managed_variants, HOSTS_FILE_PATH
+from resolver_cache import ResolverCacheManager
+from hosts_helper import connect_helper, HelperCacheFlusher, HELPER_SOCKET_PATH
+from pomodoro_engine import (PomodoroEngine, normalize_sequence, BLOCK_LIST_FILE_PATH, CONFIG_FILE_PATH, HISTORY_FILE_PATH,
+                             DEFAULT_FOCUS_DURATION_MINUTES, DEFAULT_SHORT_BREAK_DURATION_MINUTES,
+                             DEFAULT_LONG_BREAK_DURATION_MINUTES, DEFAULT_EATING_BREAK_DURATION_MINUTES,
+                             DEFAULT_SEQUENCE, DEFAULT_PRE_FOCUS_BLOCK_LEAD_SECONDS, normalize_block_profiles, block_profile_domains)
+
+
+class RealTimeScheduler:
+    """
+    root.after/after_cancel equivalent for a process without a Tk event loop.
+    schedule() may also be called from other threads (the hosts worker hands
+    its completion callbacks over this way); they all run on the run() thread.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._queue = []
+        self._handles = itertools.count()
+        self._cancelled = set()
+        self._stopped = False
+        self._lock = threading.RLock() # Re-entrant: the signal handler cancels timers on the run() thread
+        self._wakeup = threading.Event()
+
+    def schedule(self, delay_ms, callback):
+        with self._lock:
+            handle = next(self._handles)
+            heapq.heappush(self._queue, (self.clock() + delay_ms / 1000, handle, callback))
+        self._wakeup.set()
+        return handle
+
+    def cancel(self, handle):
+        with self._lock:
+            self._cancelled.add(handle)
+
+    def stop(self):
+        self._stopped = True
+        self._wakeup.set()
+
+    def _next(self):
+        """(callback, 0) for the next due callback, else (None, seconds until one is due, or None if none is queued)."""
+        with self._lock:
+            self._wakeup.clear()
+            while self._queue:
+                delay = self._queue[0][0] - self.clock()
+                if delay > 0:
+                    return None, delay
+                _, handle, callback = heapq.heappop(self._queue)
+                if handle in self._cancelled:
+                    self._cancelled.discard(handle)
+                    continue
+                return callback, 0
+            return None, None
+
+    def run(self):
+        while not self._stopped:
+            callback, delay = self._next()
+            if callback is not None:
+                callback()
+            elif delay is None:
+                return
+            else:
+                self._wakeup.wait(delay) # schedule() and stop() wake it early
+
+    def run_due(self):
+        """Runs the callbacks that are already due, even after stop() (e.g. completions of the last hosts writes)."""
+        callback, _ = self._next()
+        while callback is not None:
+            callback()
+            callback, _ = self._next()
+
+
+def load_settings(config_path=CONFIG_FILE_PATH):
+    """Reads durations, the sequence, the block profiles and the re-block lead time from the GUI's settings file (read-only)."""
+    durations = {
+        "Focus": DEFAULT_FOCUS_DURATION_MINUTES,
+        "Short Break": DEFAULT_SHORT_BREAK_DURATION_MINUTES,
+        "Long Break": DEFAULT_LONG_BREAK_DURATION_MINUTES,
+        "Eating Break": DEFAULT_EATING_BREAK_DURATION_MINUTES,
+    }
+    sequence = list(DEFAULT_SEQUENCE)
+    block_profiles = {}
+    pre_block_lead = DEFAULT_PRE_FOCUS_BLOCK_LEAD_SECONDS
+    try:
+        with open(config_path, "r", encoding='utf-8') as f:
+            settings = json.load(f)
+        durations["Focus"] = int(settings.get("focus_duration_minutes", durations["Focus"]))
+        durations["Short Break"] = int(settings.get("short_break_duration_minutes", durations["Short Break"]))
+        durations["Long Break"] = int(settings.get("long_break_duration_minutes", durations["Long Break"]))
+        durations["Eating Break"] = int(settings.get("eating_break_duration_minutes", durations["Eating Break"]))
+        sequence = normalize_sequence(settings.get("custom_sequence", DEFAULT_SEQUENCE))
+        block_profiles = normalize_block_profiles(settings.get("block_profiles"))
+        pre_block_lead = int(settings.get("pre_focus_block_lead_seconds", pre_block_lead))
+    except FileNotFoundError:
+        print(f"No settings file at {config_path}; using the default sequence and durations.")
+    except (json.JSONDecodeError, ValueError, TypeError) as e:
+        print(f"Error loading settings file '{config_path}': {e}. Using default values.")
+    return durations, sequence, block_profiles, pre_block_lead
+
+
+def load_block_list(block_list_path=BLOCK_LIST_FILE_PATH):
+    """Reads the block list (snapshot + journal, or plain text) without writing anything."""
+    sites = BlockListStore(block_list_path, read_only=True).load()
+    if not sites:
+        print(f"No block list at {block_list_path}; focus sessions will not block anything.")
+    return sites
+
+
+def _format_seconds(seconds):
+    mins, secs = divmod(max(0, int(seconds)), 60)
+    return f"{mins:02d}:{secs:02d}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the Pomodoro sequence without a GUI.")
+    parser.add_argument("--log", metavar="FILE", help="append progress to FILE instead of stdout")
+    parser.add_argument("--hosts-file", default=HOSTS_FILE_PATH, help=f"hosts file to manage (default {HOSTS_FILE_PATH})")
+    parser.add_argument("--config", default=str(CONFIG_FILE_PATH), help="settings file to read the sequence from")
+    parser.add_argument("--block-list", default=str(BLOCK_LIST_FILE_PATH), help="block list file")
+    parser.add_argument("--repeat", action="store_true", help="start the sequence again when it finishes")
+    parser.add_argument("--backend", choices=("hosts", "dns"), default="hosts",
+                        help="block by editing the hosts file (default) or with a local DNS stub resolver")
+    parser.add_argument("--dns-port", type=int, default=None, help="DNS backend listen port (default 53)")
+    parser.add_argument("--dns-upstream", metavar="IP[:PORT]", default=None, help="DNS backend upstream resolver")
+    parser.add_argument("--history", default=str(HISTORY_FILE_PATH), help="session history database (shared with the GUI)")
+    parser.add_argument("--no-history", action="store_true", help="do not record sessions")
+    parser.add_argument("--helper", nargs="?", const=HELPER_SOCKET_PATH, metavar="SOCKET",
+                        help=f"edit the hosts file through the root helper daemon (default socket {HELPER_SOCKET_PATH}); "
+                             "used automatically when not running as root")
+    parser.add_argument("--pre-block-lead", type=int, default=None, metavar="SECONDS",
+                        help="re-block this long before a break hands over to focus (default: the GUI setting)")
+    args = parser.parse_args(argv)
+
+    if args.log:
+        # Everything (including the engines' own print() logging) goes to the log file.
+        sys.stdout = open(args.log, "a", encoding='utf-8', buffering=1)
+        sys.stderr = sys.stdout
+
+    needs_root = args.hosts_file == HOSTS_FILE_PATH if args.backend == "hosts" else (args.dns_port or 53) < 1024
+    is_root = not hasattr(os, "geteuid") or os.geteuid() == 0
+    helper = None
+    if args.backend == "hosts" and (args.helper or (needs_root and not is_root)):
+        helper = connect_helper(args.helper or HELPER_SOCKET_PATH)
+        if helper is None and args.helper:
+            print(f"CRITICAL ERROR: No hosts helper answering on {args.helper}.", file=sys.stderr)
+            return 1
+    if needs_root and not is_root and helper is None:
+        print("CRITICAL ERROR: Admin Privileges Required. Please run with sudo, or start hosts_helper.py as root.", file=sys.stderr)
+        return 1
+
+    durations, sequence, block_profiles, pre_block_lead = load_settings(args.config)
+    blocked_websites = load_block_list(args.block_list)
+    if args.backend == "dns":
+        from dns_blocker import DnsBlocker
+        options = {}
+        if args.dns_port is not None: options["listen_port"] = args.dns_port
+        if args.dns_upstream:
+            host, _, port = args.dns_upstream.partition(":")
+            options["upstream"] = (host, int(port or 53))
+        blocker = DnsBlocker(**options)
+        try:
+            blocker.start()
+        except OSError as e:
+            print(f"CRITICAL ERROR: Could not start the DNS blocker: {e}", file=sys.stderr)
+            return 1
+        target = "DNS blocker"
+    elif helper:
+        blocker = helper # Same apply() contract; the helper manages its own hosts file
+        target = "Hosts file (via helper)"
+    else:
+        blocker = HostsFileEngine(args.hosts_file)
+        target = "Hosts file"
+
+    # Flushing and probing the system resolver only means something when the system actually resolves
+    # through what we edit; a scratch --hosts-file (or a DNS blocker on another port) would report every host as leaked.
+    resolves_system = helper is not None or (args.hosts_file == HOSTS_FILE_PATH if args.backend == "hosts" else (args.dns_port or 53) == 53)
+    resolver_caches = ResolverCacheManager(flushers=[HelperCacheFlusher(helper)] if helper else None) if resolves_system else None
+
+    active_hosts = set()  # Hosts entries blocked once every queued write is done; transitions diff from it
+    written_hosts = set() # ... as far as the writes done so far go
+    queued_changes = []   # (block, unblock) submitted to the worker and not yet written
+
+    def profile_request(profile):
+        target_hosts = managed_variants(block_profile_domains(profile, block_profiles, blocked_websites))
+        return target_hosts, target_hosts - active_hosts, active_hosts - target_hosts
+
+    def stage_next():
+        """Has the worker render and validate the next transition's hosts image while the session runs."""
+        if args.backend != "hosts" or not engine.timer_running:
+            return
+        _, to_block, to_unblock = profile_request(engine.next_block_profile())
+        if to_block or to_unblock:
+            hosts_worker.stage(to_block, to_unblock)
+
+    def apply_profile(profile):
+        """One update from the active profile to profile, touching only the entries that differ."""
+        nonlocal active_hosts
+        target_hosts, to_block, to_unblock = profile_request(profile)
+        if not to_block and not to_unblock:
+            return
+        active_hosts = target_hosts
+        change = (to_block, to_unblock)
+        queued_changes.append(change)
+
+        def on_done(added, removed, error):
+            nonlocal active_hosts, written_hosts
+            queued_changes.remove(change)
+            if error:
+                print(f"Hosts file error ({args.hosts_file}): {error}", file=sys.stderr)
+                # Those entries are as they were; changes queued behind it diffed from its target.
+                active_hosts = set(written_hosts)
+                for block, unblock in queued_changes:
+                    active_hosts = (active_hosts - unblock) | block
+                stage_next()
+                return
+            written_hosts = (written_hosts - to_unblock) | to_block
+            print(f"{target} updated for block profile '{profile}' ({len(added)} entries added, {len(removed)} removed).")
+            if resolver_caches and (added or removed):
+                resolver_caches.after_commit(added, unblocked_hosts=removed)
+        # The worker commits a matching pre-staged image (one rename) and logs the delay after the boundary.
+        hosts_worker.submit(to_block, to_unblock, callback=on_done, deadline=engine.transition_deadline)
+
+    scheduler = RealTimeScheduler()
+    engine = PomodoroEngine(scheduler.schedule, scheduler.cancel, durations.get, clock=scheduler.clock)
+    engine.sequence = sequence
+    engine.auto_advance = True # Nobody to acknowledge a notification
+    engine.pre_focus_block_lead_seconds = args.pre_block_lead if args.pre_block_lead is not None else pre_block_lead
+
+    def stamp(message):
+        print(f"[{time.strftime('%H:%M:%S')}] {message}")
+
+    def on_tick(remaining, total):
+        if remaining % 60 == 0 and remaining != total:
+            stamp(f"{engine.current_session['name']}: {_format_seconds(remaining)} remaining")
+
+    def on_finished():
+        stamp("Sequence complete.")
+        if args.repeat:
+            scheduler.schedule(0, engine.start_sequence)
+
+    engine.subscribe("block_requested", apply_profile)
+    engine.subscribe("pre_focus_block", apply_profile)
+    engine.subscribe("unblock_requested", apply_profile)
+    engine.subscribe("session_started", lambda session: scheduler.schedule(0, stage_next)) # After its own block_requested
+    engine.subscribe("session_started", lambda s: stamp(f"Started {s['name']} ({_format_seconds(s['total_seconds'])})"))
+    engine.subscribe("session_completed", lambda s: stamp(f"Completed {s['name']}"))
+    engine.subscribe("tick", on_tick)
+    engine.subscribe("sequence_finished", on_finished)
+    history = None
+    if not args.no_history:
+        from session_history import SessionHistory
+        history = SessionHistory(args.history)
+        history.attach(engine)
+
+    def on_signal(signum, frame):
+        stamp(f"Received signal {signum}; stopping.")
+        engine.stop()
+        scheduler.stop()
+    signal.signal(signal.SIGINT, on_signal)
+    signal.signal(signal.SIGTERM, on_signal)
+
+    if args.backend == "hosts":
+        # Same startup cleanup as the GUI: our own holds left by a crash; other users' entries stay.
+        try:
+            released = blocker.release()
+            if released:
+                print(f"Released {len(released)} entries left blocked by a previous run.")
+        except OSError as e:
+            print(f"Hosts file error ({args.hosts_file}): {e}", file=sys.stderr)
+    hosts_worker = HostsWorker(blocker, dispatch=lambda fn: scheduler.schedule(0, fn), label=target)
+    stamp(f"Headless mode: {len(sequence)} sessions, {len(blocked_websites)} blocked sites.")
+    engine.start_sequence()
+    scheduler.run()
+    hosts_worker.stop() # Writes what is still queued and discards an image staged for a boundary never reached
+    scheduler.run_due() # Their completion callbacks
+    if args.backend == "dns":
+        blocker.stop()
+    elif helper:
+        helper.close()
+    if history is not None:
+        history.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,302 @@
+"""
+Resolver cache flushing, time-to-effect measurement and redirect
+verification after each hosts commit.
+
+A hosts file edit is not visible to programs that ask a caching layer:
+systemd-resolved, nscd, mDNSResponder and the Windows DNS client can keep
+serving the real addresses until their entries expire. After each commit
+the ResolverCacheManager flushes the caches detected on this machine, then
+resolves a sample of the newly blocked names through the normal system
+resolver until they return REDIRECT_IP and logs how long that took.
+
+Browsers keep their own short-lived host caches (about a minute in Chrome)
+that no outside command can clear; the browser extension bridge reloads
+the affected tabs, and the DNS backend answers with a 5 second TTL.
+
+While that sampling runs, verify_redirects() resolves every changed host
+concurrently on a bounded thread pool, with a per-query timeout, and reports the hosts that
+leak (a blocked name that still resolves elsewhere, or an unblocked one
+still redirected) along with p50/p99 resolution latency for the transition.
+
+Everything is pluggable: pass `flushers` (objects with name, available()
+and flush()) and `resolve` (name -> list of IPv4 strings) to substitute a
+fake resolver for the real caches.
+"""
+import math
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+from hosts_engine import REDIRECT_IP
+
+RESOLVER_SAMPLE_SIZE = 3
+TIME_TO_EFFECT_TIMEOUT_S = 10.0
+TIME_TO_EFFECT_POLL_S = 0.05
+FLUSH_COMMAND_TIMEOUT_S = 5.0
+VERIFY_WORKERS = 32
+VERIFY_QUERY_TIMEOUT_S = 2.0
+VERIFY_POLL_S = 0.05
+
+
+class CommandFlusher:
+    """Flushes one caching layer by running commands; available() is True if the layer is present."""
+
+    def __init__(self, name, commands, detect):
+        self.name = name
+        self.commands = commands
+        self.detect = detect
+
+    def available(self):
+        return bool(self.detect())
+
+    def flush(self):
+        """Runs the commands in order, stopping at the first that succeeds. Raises OSError if none does."""
+        errors = []
+        for command in self.commands:
+            if not shutil.which(command[0]):
+                errors.append(f"{command[0]} not found")
+                continue
+            try:
+                result = subprocess.run(command, capture_output=True, text=True, timeout=FLUSH_COMMAND_TIMEOUT_S)
+            except (OSError, subprocess.TimeoutExpired) as e:
+                errors.append(str(e))
+                continue
+            if result.returncode == 0:
+                return
+            errors.append(f"{' '.join(command)}: {(result.stderr or result.stdout).strip() or result.returncode}")
+        raise OSError("; ".join(errors))
+
+    def __repr__(self):
+        return f"CommandFlusher({self.name!r})"
+
+
+def _any_path_exists(*paths):
+    return lambda: any(os.path.exists(path) for path in paths)
+
+
+def default_flushers(platform=sys.platform):
+    """The caching layers this platform may run; call available() on each to see which are present."""
+    if platform.startswith("linux"):
+        return [
+            CommandFlusher("systemd-resolved", [["resolvectl", "flush-caches"], ["systemd-resolve", "--flush-caches"]],
+                           _any_path_exists("/run/systemd/resolve/io.systemd.Resolve", "/run/systemd/resolve/stub-resolv.conf")),
+            CommandFlusher("nscd", [["nscd", "-i", "hosts"]], _any_path_exists("/var/run/nscd/socket", "/run/nscd/socket")),
+        ]
+    if platform == "darwin":
+        return [
+            CommandFlusher("Directory Services", [["dscacheutil", "-flushcache"]], lambda: True),
+            CommandFlusher("mDNSResponder", [["killall", "-HUP", "mDNSResponder"]], lambda: True),
+        ]
+    if platform == "win32":
+        return [CommandFlusher("DNS Client", [["ipconfig", "/flushdns"]], lambda: True)]
+    return []
+
+
+def system_resolve(name):
+    """IPv4 addresses for name through the system resolver (NSS, caches included), [] if it fails."""
+    try:
+        return sorted({info[4][0] for info in socket.getaddrinfo(name, None, socket.AF_INET, socket.SOCK_STREAM)})
+    except (socket.gaierror, UnicodeError, OSError):
+        return []
+
+
+def measure_time_to_effect(names, resolve=system_resolve, expected_ip=REDIRECT_IP, timeout=TIME_TO_EFFECT_TIMEOUT_S,
+                           poll_interval=TIME_TO_EFFECT_POLL_S, clock=time.monotonic, sleep=time.sleep):
+    """
+    Resolves names repeatedly until each returns only expected_ip. Returns
+    {name: seconds until it did, or None if it still had not after timeout}.
+    """
+    start = clock()
+    results = {name: None for name in names}
+    waiting = list(names)
+    while waiting:
+        for name in list(waiting):
+            addresses = resolve(name)
+            if addresses and all(address == expected_ip for address in addresses):
+                results[name] = clock() - start
+                waiting.remove(name)
+        if not waiting or clock() - start >= timeout:
+            break
+        sleep(poll_interval)
+    return results
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def verify_redirects(hosts, expect_redirect=True, resolve=system_resolve, expected_ip=REDIRECT_IP,
+                     workers=VERIFY_WORKERS, timeout=VERIFY_QUERY_TIMEOUT_S):
+    """
+    Resolves every host concurrently (at most `workers` at a time). A query
+    still running `timeout` seconds after it started is reported as timed
+    out; its thread is left to finish on its own. Returns
+        {'checked', 'leaked': {host: addresses}, 'failed': [...], 'timed_out': [...],
+         'p50_ms', 'p99_ms', 'seconds'}
+    where a leak is a host that resolves away from expected_ip although
+    expect_redirect (or to it although not), and failed hosts did not
+    resolve at all.
+    """
+    hosts = sorted(set(hosts))
+    result = {'checked': len(hosts), 'leaked': {}, 'failed': [], 'timed_out': [], 'p50_ms': None, 'p99_ms': None, 'seconds': 0.0}
+    if not hosts:
+        return result
+    started = {}
+
+    def query(host):
+        started[host] = time.monotonic()
+        addresses = resolve(host)
+        return addresses, time.monotonic() - started[host]
+
+    import concurrent.futures # Only needed on the verification thread; kept out of start-up
+    begin = time.monotonic()
+    latencies = []
+    pool = concurrent.futures.ThreadPoolExecutor(max_workers=min(workers, len(hosts)), thread_name_prefix="RedirectVerify")
+    futures = {pool.submit(query, host): host for host in hosts}
+    pending = set(futures)
+    try:
+        while pending:
+            done, pending = concurrent.futures.wait(pending, timeout=min(VERIFY_POLL_S, timeout),
+                                                    return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                host = futures[future]
+                try:
+                    addresses, seconds = future.result()
+                except Exception:
+                    result['failed'].append(host)
+                    continue
+                latencies.append(seconds)
+                if not addresses:
+                    result['failed'].append(host)
+                elif all(address == expected_ip for address in addresses) != expect_redirect:
+                    result['leaked'][host] = addresses
+            now = time.monotonic()
+            for future in list(pending):
+                host = futures[future]
+                if host in started and now - started[host] > timeout:
+                    result['timed_out'].append(host)
+                    pending.discard(future)
+    finally:
+        pool.shutdown(wait=False)
+    if latencies:
+        result['p50_ms'] = percentile(latencies, 0.50) * 1000
+        result['p99_ms'] = percentile(latencies, 0.99) * 1000
+    result['seconds'] = time.monotonic() - begin
+    return result
+
+
+class ResolverCacheManager:
+    """
+    Runs flush + measurement on a background thread after each commit, so
+    neither the hosts worker nor the UI waits for it. A commit that arrives
+    while one is being measured is merged into the next run.
+    """
+
+    def __init__(self, flushers=None, resolve=system_resolve, expected_ip=REDIRECT_IP,
+                 sample_size=RESOLVER_SAMPLE_SIZE, timeout=TIME_TO_EFFECT_TIMEOUT_S, on_result=None):
+        self._flushers = flushers   # None: detect default_flushers() on first use
+        self.resolve = resolve
+        self.expected_ip = expected_ip
+        self.sample_size = sample_size
+        self.timeout = timeout
+        self.on_result = on_result  # Called on the background thread with each result dict
+        self.results = []           # Most recent last
+        self._lock = threading.Lock()
+        self._pending = None        # (blocked hosts or None, measure?) waiting for the thread
+        self._thread = None
+
+    @property
+    def flushers(self):
+        if self._flushers is None:
+            self._flushers = [flusher for flusher in default_flushers() if flusher.available()]
+            print(f"Resolver caches detected: {', '.join(f.name for f in self._flushers) or 'none'}")
+        return self._flushers
+
+    def after_commit(self, blocked_hosts=(), unblocked_hosts=()):
+        """Flushes the caches, measures the time-to-effect of a block and verifies every changed host. Returns at once."""
+        with self._lock:
+            blocked, unblocked = self._pending or (set(), set())
+            blocked = (blocked - set(unblocked_hosts)) | set(blocked_hosts) # The latest change to a host wins
+            unblocked = (unblocked - set(blocked_hosts)) | set(unblocked_hosts)
+            self._pending = (blocked, unblocked)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="ResolverCache", daemon=True)
+                self._thread.start()
+
+    def wait(self, timeout=None):
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                pending, self._pending = self._pending, None
+                if pending is None:
+                    self._thread = None
+                    return
+            result = self.flush_and_measure(*pending)
+            self.results = self.results[-49:] + [result]
+            if self.on_result:
+                self.on_result(result)
+
+    def flush_and_measure(self, blocked_hosts, unblocked_hosts=()):
+        """
+        Synchronous flush, then measurement and verification side by side;
+        logs a summary and returns {'flushed', 'errors', 'time_to_effect', 'verify_block', 'verify_unblock'}.
+        """
+        flushed, errors = {}, {}
+        for flusher in self.flushers:
+            start = time.monotonic()
+            try:
+                flusher.flush()
+                flushed[flusher.name] = time.monotonic() - start
+            except OSError as e:
+                errors[flusher.name] = str(e)
+                print(f"Could not flush {flusher.name} cache: {e}")
+
+        result = {'flushed': flushed, 'errors': errors}
+
+        def verify():
+            for key, hosts, expect_redirect in (('verify_block', blocked_hosts, True), ('verify_unblock', unblocked_hosts, False)):
+                if hosts:
+                    result[key] = verify_redirects(hosts, expect_redirect, self.resolve, self.expected_ip)
+                    self._log_verification(result[key], "blocked" if expect_redirect else "unblocked")
+
+        # Verification runs alongside the time-to-effect polling, so its report
+        # never waits behind a sampled name that takes up to self.timeout to redirect.
+        verifier = threading.Thread(target=verify, name="RedirectVerify", daemon=True)
+        verifier.start()
+        sample = random.sample(sorted(blocked_hosts), min(self.sample_size, len(blocked_hosts)))
+        time_to_effect = measure_time_to_effect(sample, self.resolve, self.expected_ip, self.timeout) if sample else {}
+        result['time_to_effect'] = time_to_effect
+
+        flush_text = ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in flushed.items()) or "nothing to flush"
+        if time_to_effect:
+            reached = [seconds for seconds in time_to_effect.values() if seconds is not None]
+            late = [name for name, seconds in time_to_effect.items() if seconds is None]
+            effect_text = (f"time-to-effect max {max(reached) * 1000:.0f} ms over {len(reached)} sampled names"
+                           if reached else "no sampled name redirected")
+            if late:
+                effect_text += f"; still resolving normally after {self.timeout:.0f} s: {', '.join(late)}"
+            print(f"Resolver caches flushed ({flush_text}); {effect_text}.")
+        else:
+            print(f"Resolver caches flushed ({flush_text}).")
+        verifier.join()
+        return result
+
+    def _log_verification(self, verification, kind):
+        latency = (f"p50 {verification['p50_ms']:.1f} ms, p99 {verification['p99_ms']:.1f} ms"
+                   if verification['p50_ms'] is not None else "no answers")
+        print(f"Redirect check: {verification['checked']} {kind} hosts in {verification['seconds'] * 1000:.0f} ms ({latency}); "
+              f"{len(verification['leaked'])} leaked, {len(verification['failed'])} unresolved, "
+              f"{len(verification['timed_out'])} timed out.")
+        for host, addresses in sorted(verification['leaked'].items())[:10]:
+            print(f"  Leak: {host} -> {', '.join(addresses)}")
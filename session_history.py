@@ -0,0 +1,305 @@
+"""
+Persistent session history.
+
+Every session start, pause, resume, stop and completion published by the
+engine is recorded as one row of a local SQLite database:
+
+    session_events(id, ts, day, event, session_type, session_name,
+                   sequence_index, planned_seconds, elapsed_seconds)
+
+`day` is the local calendar date of the event (YYYY-MM-DD). Two indexes
+serve the queries: one on day, and a covering one on (session_type, event,
+day, elapsed_seconds) so per-day totals for one session type are answered
+from the index alone, in milliseconds even after years of sessions.
+
+Rollups are kept next to the events and updated in the same transaction
+as each batch, so the statistics never rescan the history:
+
+    daily_rollup(day)    focus seconds, focus sessions completed/stopped and
+    weekly_rollup(week)  focus time lost to stopped sessions (planned minus
+                         done); week is the ISO date of its Monday
+    item_rollup(sequence_index, session_type, session_name)
+                         sessions started/completed/stopped per sequence item
+
+record() only puts a tuple on a queue. A writer thread owns the database
+connection and commits whatever has queued up at most every
+HISTORY_FLUSH_INTERVAL_S seconds in one transaction, so the tick never waits
+for the disk. Queries use their own connection on the calling thread and
+see rows once the writer has committed them (call flush() to force that).
+"""
+import datetime
+import queue
+import threading
+import time
+
+from pomodoro_engine import HISTORY_FILE_PATH
+
+HISTORY_FLUSH_INTERVAL_S = 1.0
+HISTORY_SCHEMA_VERSION = 2
+
+EVENT_STARTED = "started"
+EVENT_PAUSED = "paused"
+EVENT_RESUMED = "resumed"
+EVENT_STOPPED = "stopped"
+EVENT_COMPLETED = "completed"
+ENDED_EVENTS = (EVENT_COMPLETED, EVENT_STOPPED) # Rows whose elapsed_seconds is the time the session ran
+
+_SCHEMA_V1 = """
+CREATE TABLE IF NOT EXISTS session_events (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    day TEXT NOT NULL,
+    event TEXT NOT NULL,
+    session_type TEXT NOT NULL,
+    session_name TEXT NOT NULL,
+    sequence_index INTEGER NOT NULL,
+    planned_seconds INTEGER NOT NULL,
+    elapsed_seconds REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS session_events_day ON session_events(day);
+CREATE INDEX IF NOT EXISTS session_events_type_day ON session_events(session_type, event, day, elapsed_seconds);
+"""
+_SCHEMA_V2 = """
+CREATE TABLE IF NOT EXISTS daily_rollup (
+    day TEXT PRIMARY KEY,
+    focus_seconds REAL NOT NULL,
+    focus_completed INTEGER NOT NULL,
+    focus_stopped INTEGER NOT NULL,
+    lost_seconds REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS weekly_rollup (
+    week TEXT PRIMARY KEY,
+    focus_seconds REAL NOT NULL,
+    focus_completed INTEGER NOT NULL,
+    focus_stopped INTEGER NOT NULL,
+    lost_seconds REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS item_rollup (
+    sequence_index INTEGER NOT NULL,
+    session_type TEXT NOT NULL,
+    session_name TEXT NOT NULL,
+    started INTEGER NOT NULL,
+    completed INTEGER NOT NULL,
+    stopped INTEGER NOT NULL,
+    PRIMARY KEY (sequence_index, session_type, session_name)
+) WITHOUT ROWID;
+"""
+ROLLUP_COLUMNS = ("focus_seconds", "focus_completed", "focus_stopped", "lost_seconds")
+ITEM_ROLLUP_COLUMNS = ("started", "completed", "stopped")
+_INSERT = ("INSERT INTO session_events (ts, day, event, session_type, session_name, sequence_index,"
+           " planned_seconds, elapsed_seconds) VALUES (?, ?, ?, ?, ?, ?, ?, ?)")
+
+
+def _connect(path):
+    import sqlite3 # Deferred: only the writer thread and the statistics queries need it
+    conn = sqlite3.connect(str(path), timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL") # Readers never wait for the writer
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def _ensure_schema(conn):
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version >= HISTORY_SCHEMA_VERSION:
+        return
+    with conn:
+        if version < 1:
+            conn.executescript(_SCHEMA_V1)
+        if version < 2:
+            conn.executescript(_SCHEMA_V2)
+            # One-time backfill of the rollups from the events recorded before they existed.
+            _apply_rollups(conn, conn.execute("SELECT ts, day, event, session_type, session_name, sequence_index,"
+                                              " planned_seconds, elapsed_seconds FROM session_events").fetchall())
+        conn.execute(f"PRAGMA user_version = {HISTORY_SCHEMA_VERSION}")
+
+
+def week_start(day):
+    """Monday of the week containing day (a date)."""
+    return day - datetime.timedelta(days=day.weekday())
+
+
+def _day_range(days, today):
+    today = today or datetime.date.today()
+    return (today - datetime.timedelta(days=days - 1)).isoformat(), today.isoformat()
+
+
+def _apply_rollups(conn, rows):
+    """Adds one batch of event rows to the rollup tables; returns the set of days whose totals changed."""
+    periods = {"daily_rollup": {}, "weekly_rollup": {}}
+    items = {}
+    for _, day, event, session_type, name, index, planned, elapsed in rows:
+        if event not in (EVENT_STARTED, *ENDED_EVENTS):
+            continue
+        counts = items.setdefault((index, session_type, name), [0, 0, 0])
+        counts[(EVENT_STARTED, EVENT_COMPLETED, EVENT_STOPPED).index(event)] += 1
+        if session_type != "Focus" or event == EVENT_STARTED:
+            continue
+        stopped = event == EVENT_STOPPED
+        delta = (elapsed, 0 if stopped else 1, 1 if stopped else 0, max(0.0, planned - elapsed) if stopped else 0.0)
+        week = week_start(datetime.date.fromisoformat(day)).isoformat()
+        for table, key in (("daily_rollup", day), ("weekly_rollup", week)):
+            totals = periods[table].setdefault(key, [0.0, 0, 0, 0.0])
+            for i, value in enumerate(delta):
+                totals[i] += value
+
+    for table, totals in periods.items():
+        key = "day" if table == "daily_rollup" else "week"
+        conn.executemany(
+            f"INSERT INTO {table} ({key}, {', '.join(ROLLUP_COLUMNS)}) VALUES (?, ?, ?, ?, ?)"
+            f" ON CONFLICT({key}) DO UPDATE SET "
+            + ", ".join(f"{column} = {column} + excluded.{column}" for column in ROLLUP_COLUMNS),
+            [(period, *values) for period, values in totals.items()])
+    conn.executemany(
+        "INSERT INTO item_rollup (sequence_index, session_type, session_name, started, completed, stopped)"
+        " VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(sequence_index, session_type, session_name) DO UPDATE SET "
+        + ", ".join(f"{column} = {column} + excluded.{column}" for column in ITEM_ROLLUP_COLUMNS),
+        [(*key, *counts) for key, counts in items.items()])
+    return set(periods["daily_rollup"])
+
+
+class SessionHistory:
+    """
+    Records engine events to the history database. Call attach(engine)
+    once; close() commits what is still queued. Queries may be called from
+    one thread only (the Tk thread in the app). on_commit(days), if set, is
+    called on the writer thread after each batch that changed the totals
+    of those days (ISO date strings).
+    """
+
+    def __init__(self, path=HISTORY_FILE_PATH, flush_interval=HISTORY_FLUSH_INTERVAL_S, on_commit=None):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.on_commit = on_commit
+        self.error = None           # Last write error, if any (also printed)
+        self._queue = queue.SimpleQueue()
+        self._reader = None
+        self._schema_ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="SessionHistoryWriter", daemon=True)
+        self._thread.start()
+
+    # --- Recording ---
+    def attach(self, engine):
+        engine.subscribe("session_started", lambda s: self.record(EVENT_STARTED, s))
+        engine.subscribe("paused", lambda s: self.record(EVENT_PAUSED, s, engine.elapsed_seconds()))
+        engine.subscribe("resumed", lambda s: self.record(EVENT_RESUMED, s, engine.elapsed_seconds()))
+        engine.subscribe("session_stopped", lambda s: self.record(EVENT_STOPPED, s, s.get('elapsed_seconds', 0)))
+        engine.subscribe("session_completed", lambda s: self.record(EVENT_COMPLETED, s, s['total_seconds']))
+
+    def record(self, event, session, elapsed_seconds=0, ts=None):
+        """Queues one event row; never touches the disk."""
+        ts = time.time() if ts is None else ts
+        day = datetime.date.fromtimestamp(ts).isoformat()
+        self._queue.put((ts, day, event, session['type'], session['name'], session['index'],
+                         int(session['total_seconds']), float(elapsed_seconds)))
+
+    def flush(self, timeout=None):
+        """Blocks until everything recorded so far is committed."""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout=10):
+        self.on_commit = None # The owner is going away; do not call back into it from the writer
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+
+    # --- Writer thread ---
+    def _run(self):
+        try:
+            conn = _connect(self.path)
+            _ensure_schema(conn)
+        except Exception as e:
+            self.error = e
+            print(f"Session history unavailable ({self.path}): {e}")
+            conn = None
+        finally:
+            self._schema_ready.set()
+
+        running = True
+        while running:
+            rows, waiters = [], []
+            item = self._queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is None:
+                    running = False
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    rows.append(item)
+                if not running or waiters:
+                    break # Shutting down or someone is waiting: commit now
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            changed_days = None
+            if rows and conn is not None:
+                try:
+                    with conn:
+                        conn.executemany(_INSERT, rows)
+                        changed_days = _apply_rollups(conn, rows)
+                except Exception as e:
+                    self.error = e
+                    print(f"Error writing session history: {e}")
+            on_commit = self.on_commit
+            if changed_days and on_commit is not None:
+                try:
+                    on_commit(changed_days)
+                except Exception as e:
+                    print(f"Session history commit callback failed: {e}")
+            for waiter in waiters:
+                waiter.set()
+        if conn is not None:
+            conn.close()
+
+    # --- Queries ---
+    def _connection(self):
+        if self._reader is None:
+            self._schema_ready.wait()
+            if self.error is not None:
+                raise self.error
+            self._reader = _connect(self.path)
+        return self._reader
+
+    def minutes_per_day(self, session_type, since_day, until_day):
+        """{day: minutes} of stopped and completed sessions of session_type, days as YYYY-MM-DD, inclusive."""
+        rows = self._connection().execute(
+            "SELECT day, SUM(elapsed_seconds) FROM session_events"
+            " WHERE session_type = ? AND event IN (?, ?) AND day BETWEEN ? AND ?"
+            " GROUP BY day", (session_type, *ENDED_EVENTS, since_day, until_day))
+        return {day: seconds / 60.0 for day, seconds in rows}
+
+    def focus_minutes_per_day(self, days=365, today=None):
+        return self.minutes_per_day("Focus", *_day_range(days, today))
+
+    def completed_counts(self, since_day, until_day):
+        """{session_type: sessions completed} between the two days, inclusive."""
+        rows = self._connection().execute(
+            "SELECT session_type, COUNT(*) FROM session_events"
+            " WHERE event = ? AND day BETWEEN ? AND ? GROUP BY session_type",
+            (EVENT_COMPLETED, since_day, until_day))
+        return dict(rows)
+
+    def _period_rollups(self, table, key, since, until):
+        rows = self._connection().execute(
+            f"SELECT {key}, {', '.join(ROLLUP_COLUMNS)} FROM {table} WHERE {key} BETWEEN ? AND ?", (since, until))
+        return {row[0]: dict(zip(ROLLUP_COLUMNS, row[1:])) for row in rows}
+
+    def daily_rollups(self, since_day, until_day):
+        """{day: {focus_seconds, focus_completed, focus_stopped, lost_seconds}} for days with focus sessions."""
+        return self._period_rollups("daily_rollup", "day", since_day, until_day)
+
+    def weekly_rollups(self, since_week, until_week):
+        """Same as daily_rollups, keyed by the ISO date of each week's Monday."""
+        return self._period_rollups("weekly_rollup", "week", since_week, until_week)
+
+    def item_rollups(self):
+        """{(sequence_index, session_type, session_name): {started, completed, stopped}}."""
+        rows = self._connection().execute(
+            f"SELECT sequence_index, session_type, session_name, {', '.join(ITEM_ROLLUP_COLUMNS)} FROM item_rollup")
+        return {tuple(row[:3]): dict(zip(ITEM_ROLLUP_COLUMNS, row[3:])) for row in rows}
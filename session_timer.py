@@ -0,0 +1,64 @@
+"""
+Drift-free countdown for Pomodoro sessions.
+
+The remaining time is always derived from a time.monotonic() deadline, so
+late timer callbacks never add up. Paused time is accumulated and pushes the
+deadline back on resume. The clock is injectable for simulations.
+"""
+import math
+import time
+
+
+class SessionCountdown:
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.total_seconds = 0
+        self.paused_total = 0.0   # Seconds spent paused in the current session
+        self._deadline = None
+        self._paused_at = None
+
+    def start(self, total_seconds):
+        self.total_seconds = total_seconds
+        self.paused_total = 0.0
+        self._paused_at = None
+        self._deadline = self.clock() + total_seconds
+
+    def pause(self):
+        if self._deadline is not None and self._paused_at is None:
+            self._paused_at = self.clock()
+
+    def resume(self):
+        if self._paused_at is None:
+            return
+        paused_for = self.clock() - self._paused_at
+        self.paused_total += paused_for
+        self._deadline += paused_for
+        self._paused_at = None
+
+    @property
+    def deadline(self):
+        """Clock time the session ends at (moves while paused), or None before start()."""
+        return self._deadline
+
+    @property
+    def paused(self):
+        return self._paused_at is not None
+
+    def remaining_exact(self):
+        """Seconds left as a float (frozen while paused)."""
+        if self._deadline is None:
+            return 0.0
+        now = self._paused_at if self._paused_at is not None else self.clock()
+        return max(0.0, self._deadline - now)
+
+    def remaining_seconds(self):
+        """Whole seconds left, rounded up: shows 25:00 until a full second has passed."""
+        return math.ceil(self.remaining_exact())
+
+    def ms_until_next_tick(self):
+        """Delay until the displayed second next changes (plus 1 ms to land just past the boundary)."""
+        remaining = self.remaining_exact()
+        fraction = remaining - math.floor(remaining)
+        if fraction == 0.0:
+            fraction = 1.0 if remaining > 0 else 0.0
+        return int(fraction * 1000) + 1
@@ -0,0 +1,142 @@
+"""
+Settings persistence with dirty tracking, coalesced atomic writes and a
+schema version.
+
+Settings are split by how often they change:
+
+    config  ~/.pomodoro_blocker_settings.json  durations, sequence, blocking backend
+                                               (cold; indented, still editable by hand
+                                               and read by headless mode)
+    state   ~/.pomodoro_blocker_state.json     XP, streak, current session (hot; compact)
+
+update(section, values) compares against what was last written and only
+marks a section dirty if something changed. Dirty sections are written
+together SETTINGS_SAVE_DELAY_MS after the first change, so a burst of
+updates costs one write, and each file is replaced with atomic_write_bytes
+(temp file, fsync, rename): a crash leaves either the old or the new file.
+
+The config file carries "schema_version". load() upgrades older files by
+running the MIGRATIONS in order and writes the result back at once.
+"""
+import json
+
+from hosts_engine import atomic_write_bytes
+from pomodoro_engine import CONFIG_FILE_PATH, STATE_FILE_PATH
+
+SETTINGS_SCHEMA_VERSION = 2
+SETTINGS_SAVE_DELAY_MS = 500
+SECTIONS = ("state", "config") # Flushed in this order, so a migration never loses the moved keys
+STATE_KEYS = ("pomodoro_count", "unlocked_achievements", "current_art_piece_id", "current_art_progress",
+              "last_xp_full_date_str", "current_session")
+
+
+def _migrate_v1(config, state):
+    """v1: one flat file holding everything. Moves XP and streak data into the state file."""
+    for key in STATE_KEYS:
+        if key in config:
+            state.setdefault(key, config.pop(key))
+    return config, state
+
+
+MIGRATIONS = {1: _migrate_v1} # from version -> function(config, state) returning the next version's (config, state)
+
+
+class SettingsStore:
+    """
+    schedule(ms, fn) / cancel(handle) delay the write (root.after and
+    root.after_cancel in the app); without them every change is written at
+    once. on_error(exception) is called when a deferred write fails; the
+    sections stay dirty and are retried on the next change or flush().
+    """
+
+    def __init__(self, config_path=CONFIG_FILE_PATH, state_path=STATE_FILE_PATH, schedule=None, cancel=None,
+                 on_error=None, delay_ms=SETTINGS_SAVE_DELAY_MS):
+        self.paths = {"config": config_path, "state": state_path}
+        self.schedule = schedule
+        self.cancel = cancel
+        self.on_error = on_error
+        self.delay_ms = delay_ms
+        self._saved = {section: None for section in SECTIONS}   # What is on disk, as last read or written
+        self._pending = {}                                      # section -> values not yet written
+        self._flush_handle = None
+
+    def _read(self, section):
+        try:
+            with open(self.paths[section], "r", encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def load(self):
+        """
+        Returns (config, state) dicts, migrated to the current schema; both are
+        None if there is no config file yet. Raises ValueError (including
+        json.JSONDecodeError) for unreadable files. A migrated file that
+        cannot be written back stays dirty and is retried on the next save.
+        """
+        config = self._read("config")
+        state = self._read("state") or {}
+        if config is None:
+            return None, None
+        if not isinstance(config, dict) or not isinstance(state, dict):
+            raise ValueError("settings file does not contain a JSON object")
+        self._saved = {"config": dict(config), "state": dict(state)}
+
+        version = config.pop("schema_version", 1)
+        if version > SETTINGS_SCHEMA_VERSION:
+            print(f"Settings were written by a newer version (schema {version}); unknown keys are kept as they are.")
+        while version < SETTINGS_SCHEMA_VERSION:
+            config, state = MIGRATIONS[version](config, state)
+            version += 1
+            print(f"Settings migrated to schema version {version}.")
+        if self._saved["config"].get("schema_version", 1) < SETTINGS_SCHEMA_VERSION:
+            self.update("state", state)
+            self.update("config", config)
+            try:
+                self.flush()
+            except OSError as e:
+                print(f"Error saving migrated settings: {e}")
+        return config, state
+
+    def update(self, section, values):
+        """Records the section's new values; the file is written later, and only if they changed."""
+        document = dict(values, schema_version=SETTINGS_SCHEMA_VERSION) if section == "config" else dict(values)
+        if document == self._saved[section]:
+            self._pending.pop(section, None)
+            return
+        self._pending[section] = document
+        if self.schedule is None:
+            self.flush()
+        elif self._flush_handle is None:
+            self._flush_handle = self.schedule(self.delay_ms, self._scheduled_flush)
+
+    def _scheduled_flush(self):
+        self._flush_handle = None
+        try:
+            self.flush()
+        except OSError as e:
+            print(f"Error saving settings: {e}")
+            if self.on_error:
+                self.on_error(e)
+
+    def flush(self):
+        """Writes every dirty section now. Raises OSError; unwritten sections stay dirty."""
+        if self._flush_handle is not None and self.cancel:
+            self.cancel(self._flush_handle)
+        self._flush_handle = None
+        for section in SECTIONS:
+            document = self._pending.get(section)
+            if document is None:
+                continue
+            if section == "config":
+                data = json.dumps(document, indent=4)
+            else:
+                data = json.dumps(document, separators=(",", ":"))
+            atomic_write_bytes(self.paths[section], data.encode('utf-8'))
+            self._saved[section] = document
+            del self._pending[section]
+            print(f"Settings saved ({section}).")
+
+    @property
+    def dirty(self):
+        return bool(self._pending)